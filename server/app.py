@@ -1,27 +1,87 @@
 from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
-from routes.user_routes import user_bp
-from routes.article_routes import article_bp
-from routes.survey_routes import survey_bp
-from routes.feed_routes import feed_bp
-from routes.news_routes import news_bp
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
+def create_app(config=None):
+    """
+    Create and configure the Flask app
+    
+    Safe to call in the parent of a preforking server: it loads the
+    read-only caches eagerly but never opens database connections, which
+    each worker opens for itself after the fork.
+    
+    Args:
+        config (dict, optional): Overrides for the settings in config.py
+        
+    Returns:
+        Flask: The configured app
+    """
+    from routes.user_routes import user_bp
+    from routes.article_routes import article_bp
+    from routes.survey_routes import survey_bp
+    from routes.feed_routes import feed_bp
+    from routes.news_routes import news_bp
+    from routes.health_routes import health_bp
+    from routes.admin_routes import admin_bp
+    from services.source_bias_service import SourceBiasService
+    from json_provider import FastJSONProvider
+    from middleware import admission, compression, profiling, capture
+    import metrics
+    import timing
+    import deadline
 
-# Enable CORS for all routes
-CORS(app)
+    # Initialize Flask app
+    app = Flask(__name__)
+    app.config.from_object('config')
+    if config:
+        app.config.from_mapping(config)
 
-# Register blueprints
-app.register_blueprint(user_bp)
-app.register_blueprint(article_bp)
-app.register_blueprint(survey_bp)
-app.register_blueprint(feed_bp)
-app.register_blueprint(news_bp)
+    # Request latency and DB accounting; registered first so that its
+    # after_request hook runs last and times the other hooks too
+    metrics.init_app(app)
+
+    # Opt-in Server-Timing header on the feed endpoints
+    timing.init_app(app)
+
+    # Per-route deadline budgets (statement_timeout, upstream timeouts)
+    deadline.init_app(app)
+
+    # Per-route concurrency limits and load shedding (503 + Retry-After)
+    admission.init_app(app)
+
+    # On-demand cProfile captures (signed header or sampling)
+    profiling.init_app(app)
+
+    # Opt-in traffic capture for replay
+    capture.init_app(app)
+
+    # Fast JSON encoding for every jsonify() response
+    app.json = FastJSONProvider(app)
+
+    # Enable CORS for all routes
+    CORS(app)
+
+    # Negotiated gzip/brotli compression of large payloads
+    compression.init_app(app)
+
+    # Register blueprints
+    app.register_blueprint(user_bp)
+    app.register_blueprint(article_bp)
+    app.register_blueprint(survey_bp)
+    app.register_blueprint(feed_bp)
+    app.register_blueprint(news_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(admin_bp)
+
+    # Warm the read-only caches before any worker is forked
+    if app.config.get('PRELOAD_CACHES'):
+        SourceBiasService.warm()
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app = create_app()
+    app.run(debug=True)
@@ -0,0 +1,4 @@
+from async_app import create_async_app
+
+# ASGI entry point for the async feed routes, e.g. `uvicorn asgi:app --workers 4`
+app = create_async_app()
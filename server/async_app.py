@@ -0,0 +1,189 @@
+"""
+Minimal ASGI app for the async data path
+
+Serves the feed read endpoints from an event loop so that a single process
+can hold thousands of requests in flight while they wait on Postgres. The
+routes keep the paths, parameters and responses of the Flask blueprints;
+everything else stays on the Flask app (wsgi.py), and a reverse proxy sends
+the async paths to this one:
+
+    uvicorn asgi:app --workers 4 --port 5001
+
+Requires the packages in requirements-async.txt and STORAGE_BACKEND=postgres.
+"""
+import logging
+import time
+from urllib.parse import parse_qsl
+from werkzeug.datastructures import MultiDict
+from json_provider import dumps_bytes
+import metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AsyncRequest:
+    """
+    The parts of an HTTP request the async routes use
+
+    `args` is a MultiDict like flask.request.args.
+    """
+    __slots__ = ('method', 'path', 'args', 'headers')
+
+    def __init__(self, scope):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+class AsyncResponse:
+    """
+    Response body (bytes), status and content type
+    """
+    __slots__ = ('body', 'status', 'content_type')
+
+    def __init__(self, body, status=200, content_type='application/json'):
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+
+def json_response(obj, status=200):
+    """
+    Encode an object as a JSON response
+
+    Args:
+        obj: JSON-serializable object
+        status (int): Response status
+
+    Returns:
+        AsyncResponse: The response
+    """
+    return AsyncResponse(dumps_bytes(obj), status)
+
+class AsyncApp:
+    """
+    ASGI callable with exact-path routing, lifespan hooks and the request
+    metrics of the Flask app
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._startup = []
+        self._shutdown = []
+
+    def route(self, path, endpoint, methods=('GET',)):
+        """
+        Register an async handler; it receives an AsyncRequest and returns
+        an AsyncResponse
+
+        Args:
+            path (str): Exact request path
+            endpoint (str): Route label in the metrics
+            methods (tuple): Allowed HTTP methods
+        """
+        def decorator(func):
+            for method in methods:
+                self._routes[(method, path)] = (endpoint, func)
+            return func
+        return decorator
+
+    def on_startup(self, func):
+        self._startup.append(func)
+        return func
+
+    def on_shutdown(self, func):
+        self._shutdown.append(func)
+        return func
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    for func in self._startup:
+                        await func()
+                except Exception as e:
+                    logger.error(f"Async app startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for func in self._shutdown:
+                    try:
+                        await func()
+                    except Exception as e:
+                        logger.error(f"Async app shutdown hook failed: {e}")
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, send):
+        start = time.perf_counter()
+        request = AsyncRequest(scope)
+        endpoint, handler = self._routes.get((request.method, request.path), ('unmatched', None))
+
+        token = metrics.begin_request()
+        try:
+            if handler is None:
+                response = json_response({'error': 'Not found'}, 404)
+            else:
+                response = await handler(request)
+        except Exception as e:
+            logger.exception(f"Unhandled error on {request.method} {request.path}: {e}")
+            response = json_response({'error': 'Internal server error'}, 500)
+        metrics.end_request(token, request.method, endpoint, response.status, time.perf_counter() - start)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status,
+            'headers': [
+                (b'content-type', response.content_type.encode('latin-1')),
+                (b'content-length', str(len(response.body)).encode('latin-1')),
+                # Same policy as CORS(app) on the Flask app
+                (b'access-control-allow-origin', b'*')
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': response.body})
+
+def create_async_app():
+    """
+    Create the ASGI app serving the async feed routes
+
+    Returns:
+        AsyncApp: The app
+    """
+    from config import PRELOAD_CACHES, STORAGE_BACKEND
+    from routes import async_routes
+    from services.source_bias_service import SourceBiasService
+    from services.async_feed_service import ImpressionWriter
+    import async_db
+
+    if STORAGE_BACKEND != 'postgres':
+        raise RuntimeError(f"The async data path needs STORAGE_BACKEND=postgres, not {STORAGE_BACKEND}")
+
+    app = AsyncApp()
+    async_routes.init_app(app)
+
+    @app.route('/metrics', 'metrics')
+    async def metrics_endpoint(request):
+        return AsyncResponse(metrics.render().encode(), content_type='text/plain; version=0.0.4')
+
+    @app.on_startup
+    async def startup():
+        # The pool belongs to the event loop of this worker
+        await async_db.open_async_pool()
+
+    @app.on_shutdown
+    async def shutdown():
+        await ImpressionWriter.drain()
+        await async_db.close_async_pool()
+
+    if PRELOAD_CACHES:
+        SourceBiasService.warm()
+
+    return app
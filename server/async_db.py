@@ -0,0 +1,136 @@
+"""
+Async PostgreSQL access for the async data path (asgi.py)
+
+Uses a psycopg 3 AsyncConnectionPool per process. Requests that find every
+connection busy wait for one without holding a thread, so a process can
+keep thousands of requests in flight while Postgres works.
+"""
+import os
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from config import (
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD,
+    ASYNC_DB_POOL_MIN, ASYNC_DB_POOL_MAX, ASYNC_DB_POOL_TIMEOUT
+)
+from metrics import record_db_connection, record_db_query, record_db_rows
+
+_pool = None
+_pool_pid = None
+
+
+async def open_async_pool(min_size=ASYNC_DB_POOL_MIN, max_size=ASYNC_DB_POOL_MAX, **connect_kwargs):
+    """
+    Open the async connection pool for the current process
+
+    Must run inside the event loop that will use the pool (the ASGI
+    lifespan startup).
+
+    Args:
+        min_size (int): Idle connections kept open
+        max_size (int): Maximum connections checked out at once
+        connect_kwargs: Overrides for the connection settings in config.py
+    """
+    global _pool, _pool_pid
+
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    params = dict(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
+    params.update(connect_kwargs)
+    pool = AsyncConnectionPool(
+        kwargs={key: value for key, value in params.items() if value is not None},
+        min_size=min_size,
+        max_size=max_size,
+        timeout=ASYNC_DB_POOL_TIMEOUT,
+        open=False
+    )
+    await pool.open(wait=True)
+    _pool, _pool_pid = pool, os.getpid()
+    return _pool
+
+
+async def close_async_pool():
+    """
+    Close every connection held by this process' async pool
+    """
+    global _pool, _pool_pid
+
+    if _pool is not None and _pool_pid == os.getpid():
+        await _pool.close()
+    _pool = None
+    _pool_pid = None
+
+
+def async_pool_ready():
+    """
+    Check whether this process has opened its async pool
+    """
+    return _pool is not None and _pool_pid == os.getpid()
+
+
+def _require_pool():
+    if not async_pool_ready():
+        raise RuntimeError("The async connection pool is not open (see open_async_pool)")
+    return _pool
+
+
+async def fetchall(query, params=None, as_dict=False):
+    """
+    Run a query on a pooled connection and fetch every row
+
+    Args:
+        query (str): SQL
+        params (tuple, optional): Query parameters
+        as_dict (bool): Return rows as dictionaries instead of tuples
+
+    Returns:
+        list: Rows
+    """
+    async with _require_pool().connection() as conn:
+        record_db_connection()
+        async with conn.cursor(row_factory=dict_row if as_dict else None) as cursor:
+            record_db_query()
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+    record_db_rows(len(rows))
+    return rows
+
+
+async def fetchone(query, params=None, as_dict=False):
+    """
+    Run a query on a pooled connection and fetch the first row
+
+    Returns:
+        The row, or None
+    """
+    async with _require_pool().connection() as conn:
+        record_db_connection()
+        async with conn.cursor(row_factory=dict_row if as_dict else None) as cursor:
+            record_db_query()
+            await cursor.execute(query, params)
+            row = await cursor.fetchone()
+    if row is not None:
+        record_db_rows(1)
+    return row
+
+
+async def execute(query, params=None):
+    """
+    Run a statement on a pooled connection and commit it
+
+    Returns:
+        int: Number of affected rows
+    """
+    # The pool commits when the block exits without an error
+    async with _require_pool().connection() as conn:
+        record_db_connection()
+        async with conn.cursor() as cursor:
+            record_db_query()
+            await cursor.execute(query, params)
+            return cursor.rowcount
@@ -0,0 +1,124 @@
+"""
+Benchmark of ArticleStore against the list-of-dicts article pool
+
+Reports, for several pool sizes, the memory per article of both
+representations and the ranking throughput (articles scored per second)
+of the former dict path (_score_and_sort, which resolves each article's
+source bias) and of ArticleStore (scan of the typed columns and top-k),
+and checks that both rank the feed the same way. It also reports the time
+to attach a serialized store (SharedArticleStore, as mapped by the
+workers that share the pool) and checks that it ranks the same way.
+
+Run from the server folder:
+    python -m benchmarks.bench_article_store [--sizes 1000 10000 50000] [--limit 10] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from datetime import date
+from benchmarks.synthetic import make_articles
+from services.article_store import ArticleStore, SharedArticleStore
+from services.feed_service import (
+    DEFAULT_SCORE, MIN_CONFIDENCE, _feed_score, _score_and_sort, _stance_table
+)
+from services.source_bias_service import SourceBiasService
+
+def _best_seconds(func, repeat):
+    """
+    Best wall time of func over `repeat` runs, in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _dict_pool_bytes(rows):
+    """
+    Memory of a list of article dicts, shared values counted once
+    """
+    seen = set()
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row)
+        for value in row.values():
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+def _sources(rng):
+    # Known outlets from the bias table and a few it does not list
+    SourceBiasService.load_source_bias_data()
+    known = sorted(SourceBiasService._normalized_to_original.values())
+    return rng.sample(known, min(60, len(known))) + [f"unlisted{i}.example" for i in range(10)]
+
+def run(sizes, limit, repeat, seed=0):
+    rng = random.Random(seed)
+    sources = _sources(rng)
+    flag, user_stance = 'comfort', 0.7
+    table = _stance_table(lambda alignment: _feed_score(flag, alignment), user_stance)
+
+    results = []
+    for size in sizes:
+        rows = make_articles(size, seed=seed, sources=sources)
+        store = ArticleStore(rows)
+        positions = store.select()
+
+        def ranked(store=store):
+            scores = store.scan(positions, table, DEFAULT_SCORE, MIN_CONFIDENCE)
+            return store.rows(ArticleStore.top(positions, scores, limit))
+
+        assert ranked() == _score_and_sort(rows, flag, user_stance)[:limit]
+
+        payload = memoryview(store.to_bytes(date.today()))
+        assert ranked(SharedArticleStore(payload)) == ranked()
+
+        usage = store.memory_usage()
+        dict_seconds = _best_seconds(lambda: _score_and_sort(rows, flag, user_stance), repeat)
+        store_seconds = _best_seconds(ranked, repeat)
+        results.append({
+            'articles': size,
+            'dict_bytes_per_article': _dict_pool_bytes(rows) / size,
+            'store_ranking_bytes_per_article': usage['ranking_bytes_per_article'],
+            'store_display_bytes_per_article': usage['display_bytes_per_article'],
+            'build_ms': _best_seconds(lambda: ArticleStore(rows), repeat) * 1000,
+            'attach_ms': _best_seconds(lambda: SharedArticleStore(payload), repeat) * 1000,
+            'dict_articles_per_s': size / dict_seconds,
+            'store_articles_per_s': size / store_seconds
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--limit', type=int, default=10, help='Articles returned per feed')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    # The per-lookup log lines would dominate the timings
+    logging.getLogger('services.source_bias_service').setLevel(logging.ERROR)
+    # Fuzzy matches are timed and checked on the calling thread
+    SourceBiasService.FUZZY_POOL_WORKERS = 0
+
+    results = run(args.sizes, args.limit, args.repeat)
+
+    print(f"{'articles':>8} {'dict B/art':>10} {'ranking B/art':>13} {'display B/art':>13} "
+          f"{'build ms':>9} {'attach ms':>9} {'dict art/s':>11} {'store art/s':>12}")
+    for row in results:
+        print(f"{row['articles']:>8} {row['dict_bytes_per_article']:>10.0f} "
+              f"{row['store_ranking_bytes_per_article']:>13.1f} {row['store_display_bytes_per_article']:>13.0f} "
+              f"{row['build_ms']:>9.1f} {row['attach_ms']:>9.3f} {row['dict_articles_per_s']:>11.0f} {row['store_articles_per_s']:>12.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Endpoint benchmark: drives the feed endpoints through the Flask app at a
+fixed concurrency and reports throughput, latency percentiles and database
+queries per request
+
+Against a throwaway cluster (needs initdb/pg_ctl):
+    python -m benchmarks.bench_endpoints --initdb --users 100000 --feed-rows 1000000 --json run.json
+
+Against the database configured in .env, already migrated and seeded:
+    python -m benchmarks.bench_endpoints --skip-seed --json run.json
+
+Compare two runs:
+    python -m benchmarks.bench_endpoints --compare base.json run.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import db
+import metrics
+from benchmarks.local_postgres import LocalPostgres
+from benchmarks.seed import seed, bench_email
+
+# (name, route label used in the metrics, request builder)
+ENDPOINTS = {
+    'articles': ('article.get_articles', lambda ctx, rng: (
+        'GET', f"/api/articles?email={ctx.email(rng)}&flag={rng.choice(('comfort', 'balanced', 'challenge'))}&limit=10", None)),
+    'articles_feeds': ('article.get_feeds', lambda ctx, rng: (
+        'GET', f"/api/articles/feeds?email={ctx.email(rng)}&limit=10", None)),
+    'articles_labeled': ('article.get_labeled_articles', lambda ctx, rng: (
+        'GET', f"/api/articles/labeled?email={ctx.email(rng)}&limit=20", None)),
+    'political_profile': ('feed.get_political_profile', lambda ctx, rng: (
+        'GET', f"/api/feed/political-profile?email={ctx.email(rng)}", None)),
+    'likes': ('feed.update_likes', lambda ctx, rng: ctx.like_request(rng)),
+}
+
+class BenchContext:
+    """
+    Request parameters drawn from the seeded data
+    """
+    
+    def __init__(self, users, feed_sample):
+        self.users = users
+        self.feed_sample = feed_sample
+    
+    def email(self, rng):
+        return bench_email(rng.randrange(self.users))
+    
+    def like_request(self, rng):
+        email, article_id, flag = rng.choice(self.feed_sample)
+        body = {'email': email, 'article_id': article_id, 'flag': flag, 'value': rng.choice((-1, 0, 1))}
+        return ('PUT', '/api/feed/likes', body)
+
+def load_context():
+    conn = db.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM userdata WHERE email LIKE 'user%%@bench.local'")
+    users = cursor.fetchone()[0]
+    cursor.execute("SELECT email, article_id, flag FROM feed ORDER BY random() LIMIT 1000")
+    feed_sample = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    if not users or not feed_sample:
+        raise RuntimeError("No benchmark data found; run without --skip-seed")
+    return BenchContext(users, feed_sample)
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_endpoint(app, ctx, name, requests_per_endpoint, concurrency, seed_value):
+    route, build = ENDPOINTS[name]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(requests_per_endpoint))
+    
+    queries_before = metrics.REQUEST_DB_QUERIES.snapshot(route=route)
+    
+    def worker(worker_id):
+        nonlocal errors
+        rng = random.Random(seed_value * 1000 + worker_id)
+        client = app.test_client()
+        local = []
+        local_errors = 0
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            method, path, body = build(ctx, rng)
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            local.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - started
+    
+    queries_after = metrics.REQUEST_DB_QUERIES.snapshot(route=route)
+    counted = queries_after[0] - queries_before[0]
+    
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'concurrency': concurrency,
+        'throughput_rps': len(latencies) / wall if wall else None,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'queries_per_request': (queries_after[1] - queries_before[1]) / counted if counted else None
+    }
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(base_path, run_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(run_path) as f:
+        run = json.load(f)
+    
+    print(f"{'endpoint':<18} {'metric':<20} {'base':>10} {'run':>10} {'change':>8}")
+    for name, result in run['results'].items():
+        before = base['results'].get(name)
+        if not before:
+            continue
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else '-'
+            print(f"{name:<18} {metric:<20} {old:>10.2f} {new:>10.2f} {change:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--initdb', action='store_true', help='Run against a throwaway local cluster')
+    parser.add_argument('--skip-seed', action='store_true', help='Use the data already in the database')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--feed-rows', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--endpoints', nargs='+', default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'RUN'), help='Compare two result files and exit')
+    args = parser.parse_args()
+    
+    if args.compare:
+        compare(*args.compare)
+        return
+    
+    cluster = LocalPostgres().start() if args.initdb else None
+    try:
+        if cluster:
+            db.close_db_pool()
+            db.init_db_pool(maxconn=max(args.concurrency * 2, 4), **cluster.connect_kwargs)
+        
+        from migrate import apply_migrations
+        apply_migrations()
+        if not args.skip_seed:
+            seed(args.users, args.articles, args.feed_rows, args.days, seed=args.seed)
+        
+        from app import create_app
+        app = create_app({'COMPRESS_ENABLED': False})
+        ctx = load_context()
+        
+        results = {}
+        for name in args.endpoints:
+            results[name] = run_endpoint(app, ctx, name, args.requests, args.concurrency, args.seed)
+            r = results[name]
+            print(f"{name:<18} {r['throughput_rps']:>8.1f} req/s  p50 {r['p50_ms']:>7.2f} ms  "
+                  f"p95 {r['p95_ms']:>7.2f} ms  p99 {r['p99_ms']:>7.2f} ms  "
+                  f"queries/req {r['queries_per_request'] or 0:>5.1f}  errors {r['errors']}")
+        
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({
+                    'meta': {
+                        'timestamp': datetime.now().isoformat(),
+                        'git_revision': _git_revision(),
+                        'users': args.users,
+                        'articles': args.articles,
+                        'feed_rows': args.feed_rows,
+                        'requests': args.requests,
+                        'concurrency': args.concurrency,
+                        'seeded': not args.skip_seed
+                    },
+                    'results': results
+                }, f, indent=2)
+    finally:
+        db.close_db_pool()
+        if cluster:
+            cluster.stop()
+
+if __name__ == '__main__':
+    main()
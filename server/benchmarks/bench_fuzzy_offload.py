@@ -0,0 +1,112 @@
+"""
+Benchmark of fuzzy source matching on the request thread vs in the process pool
+
+One thread stands for the feed requests: it resolves batches of sources
+that are all in the bias table and records each batch's latency. Another
+stands for a request full of sources unknown to the table, which need
+fuzzy matching. Both run against a bias table scaled up to --table-size
+outlets, first with FUZZY_POOL_WORKERS = 0 (fuzzy matching holds the GIL
+on the request thread), then with the process pool. The report gives the
+latency percentiles of the feed batches in both modes.
+
+Run from the server folder:
+    python -m benchmarks.bench_fuzzy_offload [--table-size 5000] [--seconds 5] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from benchmarks.bench_source_bias import _typo, scaled_table
+from services.source_bias_service import SourceBiasService
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def run(workers, known, keys, seconds, batch, interval, seed):
+    """
+    Feed batch latencies while another thread resolves unknown sources
+
+    Returns:
+        dict: Feed batch percentiles in ms, and the unknown sources resolved
+    """
+    SourceBiasService.FUZZY_POOL_WORKERS = workers
+    rng = random.Random(seed)
+    stop = threading.Event()
+    unknown_resolved = [0]
+
+    def unknown_sources():
+        counter = 0
+        while not stop.is_set():
+            # Misspelled outlets, never seen before so never cached
+            names = [f"{_typo(rng, rng.choice(keys))}q{counter}x{i}" for i in range(8)]
+            counter += 1
+            SourceBiasService.resolve_many(names)
+            unknown_resolved[0] += len(names)
+
+    if workers:
+        # Start the processes before timing
+        SourceBiasService.resolve_many(['warmupsourcezq'])
+        time.sleep(1)
+
+    thread = threading.Thread(target=unknown_sources)
+    thread.start()
+    latencies = []
+    feed_rng = random.Random(seed + 1)
+    # Batches arrive on a fixed schedule, and their latency counts from the
+    # scheduled arrival: a batch that cannot start in time is late too
+    arrival = time.perf_counter()
+    deadline = arrival + seconds
+    while arrival < deadline:
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        SourceBiasService.resolve_many(feed_rng.sample(known, batch))
+        latencies.append(time.perf_counter() - arrival)
+        arrival += interval
+    stop.set()
+    thread.join()
+
+    return {
+        'workers': workers,
+        'feed_batches': len(latencies),
+        'p50_ms': _percentile(latencies, 0.5) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'unknown_resolved': unknown_resolved[0]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--table-size', type=int, default=5000)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--batch', type=int, default=50, help='Sources per feed batch')
+    parser.add_argument('--interval', type=float, default=0.005, help='Seconds between feed batches')
+    parser.add_argument('--workers', type=int, default=1, help='Processes of the pooled run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    # The per-lookup log lines would dominate the timings
+    logging.getLogger('services.source_bias_service').setLevel(logging.ERROR)
+
+    bias_data, normalized_to_original = scaled_table(args.table_size, random.Random(args.seed))
+    SourceBiasService.install_source_bias_data(bias_data, normalized_to_original)
+    known = list(normalized_to_original.values())
+    keys = [key for key in bias_data if len(key) > 5]
+
+    results = [run(workers, known, keys, args.seconds, args.batch, args.interval, args.seed) for workers in (0, args.workers)]
+
+    print(f"{'workers':>7} {'batches':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'unknown':>8}")
+    for row in results:
+        print(f"{row['workers']:>7} {row['feed_batches']:>8} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+              f"{row['max_ms']:>8.2f} {row['unknown_resolved']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
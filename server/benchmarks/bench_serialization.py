@@ -0,0 +1,86 @@
+"""
+Serialization and compression benchmark for article payloads
+
+Compares Flask's stdlib JSON provider with FastJSONProvider and reports
+bytes on the wire (raw, gzip, brotli) and CPU time per response.
+
+Run from the server folder:
+    python -m benchmarks.bench_serialization [--sizes 20 100 1000] [--json out.json]
+"""
+import argparse
+import gzip
+import json
+import time
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from json_provider import FastJSONProvider, orjson
+from middleware.compression import brotli
+from benchmarks.synthetic import make_articles
+
+def _time_per_call(func, repeat):
+    """
+    Best-of-three average CPU time of func over `repeat` calls, in ms
+    """
+    best = None
+    for _ in range(3):
+        start = time.process_time()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.process_time() - start) / repeat
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def run(sizes, repeat, gzip_level, brotli_quality):
+    app = Flask(__name__)
+    providers = {
+        'stdlib': DefaultJSONProvider(app),
+        'fast': FastJSONProvider(app)
+    }
+    
+    results = []
+    for size in sizes:
+        articles = make_articles(size)
+        for name, provider in providers.items():
+            def encode():
+                return provider.dumps(articles, separators=(',', ':')) if name == 'stdlib' else provider.dumps(articles)
+            body = encode().encode('utf-8')
+            
+            row = {
+                'articles': size,
+                'encoder': name,
+                'serialize_ms': _time_per_call(encode, repeat),
+                'raw_bytes': len(body),
+                'gzip_bytes': len(gzip.compress(body, compresslevel=gzip_level)),
+                'gzip_ms': _time_per_call(lambda: gzip.compress(body, compresslevel=gzip_level), repeat)
+            }
+            if brotli is not None:
+                row['br_bytes'] = len(brotli.compress(body, quality=brotli_quality))
+                row['br_ms'] = _time_per_call(lambda: brotli.compress(body, quality=brotli_quality), repeat)
+            results.append(row)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--gzip-level', type=int, default=6)
+    parser.add_argument('--brotli-quality', type=int, default=4)
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+    
+    results = run(args.sizes, args.repeat, args.gzip_level, args.brotli_quality)
+    
+    print(f"orjson: {'yes' if orjson else 'no'}, brotli: {'yes' if brotli else 'no'}")
+    header = f"{'articles':>8} {'encoder':>7} {'ser ms':>8} {'raw B':>9} {'gzip B':>8} {'gzip ms':>8} {'br B':>8} {'br ms':>7}"
+    print(header)
+    for row in results:
+        print(f"{row['articles']:>8} {row['encoder']:>7} {row['serialize_ms']:>8.3f} {row['raw_bytes']:>9} "
+              f"{row['gzip_bytes']:>8} {row['gzip_ms']:>8.3f} {row.get('br_bytes', '-'):>8} "
+              f"{row['br_ms'] if 'br_ms' in row else float('nan'):>7.3f}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""
+Microbenchmark for the SourceBiasService matching paths
+
+Times normalization, get_source_bias (exact, substring, fuzzy and miss
+lookups), resolve_many and find_closest_source_matches against the shipped bias table and
+synthetic tables scaled up to 50k outlets, tracks memory, and checks every
+answer against a frozen copy of the reference algorithm so that
+optimizations cannot silently change matches.
+
+Run from the server folder:
+    python -m benchmarks.bench_source_bias [--sizes 442 5000 50000] [--queries 25] [--json out.json]
+"""
+import argparse
+import csv
+import difflib
+import json
+import logging
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from services.source_bias_artifact import csv_checksum, read_artifact
+from services.source_bias_service import SourceBiasService
+
+BIASES = ('left', 'left-center', 'center', 'right-center', 'right')
+
+# --- Reference behavior (the original algorithm, kept verbatim) -----------
+
+def reference_normalize(source_name):
+    if not source_name:
+        return ""
+    name = source_name.lower()
+    name = re.sub(r'\.com$|\.org$|\.net$|\.co\.uk$|\.co$|\.news$', '', name)
+    name = re.sub(r'^the\s+', '', name)
+    name = re.sub(r'[^a-z0-9]', '', name)
+    return name
+
+def reference_get_source_bias(bias_data, source):
+    normalized_source = reference_normalize(source)
+    if normalized_source in bias_data:
+        return bias_data[normalized_source]
+    for known_source, bias_info in bias_data.items():
+        if normalized_source in known_source or known_source in normalized_source:
+            return bias_info
+    if len(normalized_source) > 3:
+        matches = difflib.get_close_matches(normalized_source, bias_data.keys(), n=1, cutoff=0.6)
+        if matches:
+            return bias_data[matches[0]]
+    return (None, None)
+
+def reference_find_closest(bias_data, normalized_to_original, source, n=3):
+    normalized_source = reference_normalize(source)
+    if not normalized_source or len(normalized_source) < 3:
+        return []
+    similarity_scores = []
+    for known_source in bias_data.keys():
+        score = difflib.SequenceMatcher(None, normalized_source, known_source).ratio()
+        similarity_scores.append((normalized_to_original.get(known_source, known_source), score))
+    return sorted(similarity_scores, key=lambda x: x[1], reverse=True)[:n]
+
+# --- Synthetic data --------------------------------------------------------
+
+_SYLLABLES = ['ka', 'lo', 'mi', 'ter', 'vex', 'dor', 'pa', 'zun', 'qui', 'bra', 'nel', 'sto', 'gry', 'fen', 'wal']
+_SUFFIXES = ['news', 'times', 'post', 'daily', 'herald', 'wire', 'report', 'journal', 'tribune', 'gazette']
+
+def synthetic_outlet(rng):
+    name = ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return name + rng.choice(_SUFFIXES)
+
+def scaled_table(size, rng):
+    """
+    The shipped bias table padded with synthetic outlets up to `size` rows
+
+    Returns:
+        tuple: (bias_data, normalized_to_original), in insertion order
+    """
+    SourceBiasService.load_source_bias_data(refresh=True)
+    bias_data = dict(SourceBiasService._source_bias_data)
+    normalized_to_original = dict(SourceBiasService._normalized_to_original)
+
+    while len(bias_data) < size:
+        original = synthetic_outlet(rng)
+        normalized = reference_normalize(original)
+        if normalized in bias_data:
+            continue
+        bias_data[normalized] = (rng.choice(BIASES), round(rng.uniform(0.3, 0.95), 4))
+        normalized_to_original[normalized] = original
+    return bias_data, normalized_to_original
+
+def _decorate(rng, name):
+    """
+    Dress a bare outlet name the way news APIs report it
+    """
+    style = rng.randrange(4)
+    if style == 0:
+        return name + '.com'
+    if style == 1:
+        return 'The ' + name.capitalize()
+    if style == 2:
+        return name.upper() + '.org'
+    return name
+
+def _typo(rng, name):
+    position = rng.randrange(len(name))
+    return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+
+def corpus(bias_data, count, rng):
+    """
+    Source names grouped by the matching path the reference takes for them
+
+    Returns:
+        dict: Path -> list of source names
+    """
+    keys = list(bias_data.keys())
+    groups = {'exact': [], 'substring': [], 'fuzzy': [], 'miss': []}
+    attempts = 0
+
+    while any(len(names) < count for names in groups.values()) and attempts < count * 400:
+        attempts += 1
+        kind = rng.choice([path for path, names in groups.items() if len(names) < count])
+        key = rng.choice(keys)
+        if kind == 'exact':
+            candidate = _decorate(rng, key)
+        elif kind == 'substring':
+            candidate = key + rng.choice(['politics', 'live', 'online', 'us'])
+        elif kind == 'fuzzy':
+            candidate = _typo(rng, key) if len(key) > 5 else key + 'x'
+        else:
+            candidate = 'zq' + ''.join(rng.choice('xjqvwz0123456789') for _ in range(rng.randint(6, 12)))
+
+        actual = _classify(bias_data, candidate)
+        if actual in groups and len(groups[actual]) < count:
+            groups[actual].append(candidate)
+    return groups
+
+def _classify(bias_data, source):
+    normalized = reference_normalize(source)
+    if normalized in bias_data:
+        return 'exact'
+    for known_source in bias_data:
+        if normalized in known_source or known_source in normalized:
+            return 'substring'
+    if len(normalized) > 3 and difflib.get_close_matches(normalized, bias_data.keys(), n=1, cutoff=0.6):
+        return 'fuzzy'
+    return 'miss'
+
+# --- Benchmark -------------------------------------------------------------
+
+def _timed(func, items):
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+def run_size(size, queries, closest_queries, rng):
+    bias_data, normalized_to_original = scaled_table(size, rng)
+
+    tracemalloc.start()
+    SourceBiasService.install_source_bias_data(bias_data, normalized_to_original)
+    SourceBiasService.warm()
+    table_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    groups = corpus(bias_data, queries, rng)
+    all_names = [name for names in groups.values() for name in names]
+
+    result = {'table_rows': len(bias_data), 'table_peak_bytes': table_bytes, 'stages': {}, 'mismatches': []}
+
+    result['table_read'] = bench_table_read(bias_data, normalized_to_original)
+    if not result['table_read']['same_table']:
+        result['mismatches'].append({'stage': 'compiled artifact', 'source': None,
+                                     'expected': 'the table read from the CSV', 'actual': 'a different table'})
+
+    _, elapsed = _timed(SourceBiasService._normalize_source_name, all_names)
+    result['stages']['normalize'] = {'calls': len(all_names), 'us_per_call': elapsed / max(len(all_names), 1) * 1e6}
+
+    for path, names in groups.items():
+        if not names:
+            continue
+        answers, elapsed = _timed(SourceBiasService.get_source_bias, names)
+        # Memory is measured in a separate pass: tracing skews the timings
+        tracemalloc.start()
+        SourceBiasService.get_source_bias(names[0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result['stages'][f"get_source_bias:{path}"] = {
+            'calls': len(names), 'us_per_call': elapsed / len(names) * 1e6, 'peak_bytes_per_call': peak
+        }
+        for name, answer in zip(names, answers):
+            expected = reference_get_source_bias(bias_data, name)
+            if tuple(answer) != tuple(expected):
+                result['mismatches'].append({'stage': 'get_source_bias', 'source': name,
+                                             'expected': expected, 'actual': answer})
+
+    closest_names = all_names[:closest_queries]
+    answers, elapsed = _timed(lambda name: SourceBiasService.find_closest_source_matches(name, 3), closest_names)
+    result['stages']['find_closest_source_matches'] = {
+        'calls': len(closest_names), 'us_per_call': elapsed / max(len(closest_names), 1) * 1e6
+    }
+    for name, answer in zip(closest_names, answers):
+        expected = reference_find_closest(bias_data, normalized_to_original, name, 3)
+        if [tuple(match) for match in answer] != [tuple(match) for match in expected]:
+            result['mismatches'].append({'stage': 'find_closest_source_matches', 'source': name,
+                                         'expected': expected, 'actual': answer})
+
+    # A feed-like batch: every name several times, in random order; first
+    # against an empty match cache, then again
+    batch = all_names * 4
+    rng.shuffle(batch)
+    SourceBiasService.install_source_bias_data(bias_data, normalized_to_original)
+    for stage in ('resolve_many', 'resolve_many:cached'):
+        (answers,), elapsed = _timed(SourceBiasService.resolve_many, [batch])
+        result['stages'][stage] = {'calls': len(batch), 'us_per_call': elapsed / max(len(batch), 1) * 1e6}
+        for name in all_names:
+            expected = reference_get_source_bias(bias_data, name)
+            if tuple(answers[name]) != tuple(expected):
+                result['mismatches'].append({'stage': stage, 'source': name,
+                                             'expected': expected, 'actual': answers[name]})
+
+    return result
+
+def bench_cold_load(repeat=5):
+    """
+    Time load_source_bias_data from disk
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        SourceBiasService.load_source_bias_data(refresh=True)
+        timings.append(time.perf_counter() - start)
+    return {'ms_best': min(timings) * 1000, 'rows': len(SourceBiasService._source_bias_data)}
+
+def bench_table_read(bias_data, normalized_to_original, repeat=3):
+    """
+    Time reading a table from its CSV and from its compiled artifact, and
+    check that both give the same table
+    """
+    def best(func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000, result
+
+    csv_path, artifact_path = SourceBiasService.CSV_PATH, SourceBiasService.ARTIFACT_PATH
+    with tempfile.TemporaryDirectory() as directory:
+        SourceBiasService.CSV_PATH = os.path.join(directory, 'source_bias.csv')
+        SourceBiasService.ARTIFACT_PATH = os.path.join(directory, 'source_bias.bin')
+        try:
+            with open(SourceBiasService.CSV_PATH, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['source', 'bias', 'confidence'])
+                for key, (bias, confidence) in bias_data.items():
+                    writer.writerow([normalized_to_original[key], bias, confidence])
+            SourceBiasService.compile_artifact()
+            checksum = csv_checksum(SourceBiasService.CSV_PATH)
+
+            csv_ms, from_csv = best(SourceBiasService._read_csv)
+            artifact_ms, from_artifact = best(lambda: read_artifact(SourceBiasService.ARTIFACT_PATH, checksum))
+            checksum_ms, _ = best(lambda: csv_checksum(SourceBiasService.CSV_PATH))
+        finally:
+            SourceBiasService.CSV_PATH, SourceBiasService.ARTIFACT_PATH = csv_path, artifact_path
+
+    same = (list(from_csv[0].items()) == list(from_artifact[0].items())
+            and from_csv[1] == from_artifact[1])
+    return {'csv_ms': csv_ms, 'artifact_ms': artifact_ms + checksum_ms, 'same_table': same}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[442, 5000, 50000])
+    parser.add_argument('--queries', type=int, default=25, help='Sources per matching path')
+    parser.add_argument('--closest-queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    # The per-lookup log lines would dominate the timings
+    logging.getLogger('services.source_bias_service').setLevel(logging.ERROR)
+    # Fuzzy matches are timed and checked on the calling thread
+    SourceBiasService.FUZZY_POOL_WORKERS = 0
+
+    rng = random.Random(args.seed)
+    report = {'cold_load': bench_cold_load(), 'sizes': {}}
+    print(f"cold load: {report['cold_load']['ms_best']:.2f} ms for {report['cold_load']['rows']} rows")
+
+    for size in args.sizes:
+        result = run_size(size, args.queries, args.closest_queries, rng)
+        report['sizes'][size] = result
+        print(f"\n{result['table_rows']} rows, table peak {result['table_peak_bytes'] / 1024:.0f} KiB")
+        print(f"  read: CSV {result['table_read']['csv_ms']:.2f} ms, "
+              f"compiled {result['table_read']['artifact_ms']:.2f} ms")
+        for stage, timing in result['stages'].items():
+            print(f"  {stage:<32} {timing['calls']:>6} calls {timing['us_per_call']:>12.1f} us/call")
+        print(f"  mismatches vs reference: {len(result['mismatches'])}")
+
+    # Leave the service with the shipped table
+    SourceBiasService.load_source_bias_data(refresh=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if any(result['mismatches'] for result in report['sizes'].values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
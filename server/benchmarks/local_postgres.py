@@ -0,0 +1,73 @@
+"""
+Throwaway PostgreSQL cluster for benchmarks, created with initdb
+
+No container is needed, only the PostgreSQL server binaries (initdb,
+pg_ctl) on PATH or reported by pg_config.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import psycopg2
+
+def _find_binary(name):
+    path = shutil.which(name)
+    if path:
+        return path
+    try:
+        bindir = subprocess.check_output(['pg_config', '--bindir'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        bindir = None
+    if bindir and os.path.exists(os.path.join(bindir, name)):
+        return os.path.join(bindir, name)
+    raise RuntimeError(f"{name} not found; install the PostgreSQL server binaries")
+
+class LocalPostgres:
+    """
+    A private PostgreSQL cluster listening on a Unix socket in a temp folder
+    
+    Use as a context manager; the cluster is stopped and deleted on exit.
+    """
+    
+    def __init__(self, port=55432, dbname='publicripple_bench', user='bench'):
+        self.port = port
+        self.dbname = dbname
+        self.user = user
+        self.root = None
+    
+    @property
+    def connect_kwargs(self):
+        return dict(host=self.root, port=self.port, dbname=self.dbname, user=self.user, password=None)
+    
+    def start(self):
+        self.root = tempfile.mkdtemp(prefix='publicripple-pg-')
+        data_dir = os.path.join(self.root, 'data')
+        
+        subprocess.run([_find_binary('initdb'), '-D', data_dir, '-U', self.user,
+                        '--auth=trust', '-E', 'UTF8', '--no-sync'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([_find_binary('pg_ctl'), '-D', data_dir, '-w', '-l', os.path.join(self.root, 'log'),
+                        '-o', f"-p {self.port} -k {self.root} -c listen_addresses='' -c fsync=off",
+                        'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        
+        conn = psycopg2.connect(host=self.root, port=self.port, dbname='postgres', user=self.user)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'CREATE DATABASE "{self.dbname}"')
+        conn.close()
+        return self
+    
+    def stop(self):
+        if self.root is None:
+            return
+        subprocess.run([_find_binary('pg_ctl'), '-D', os.path.join(self.root, 'data'), '-m', 'fast', 'stop'],
+                       check=False, stdout=subprocess.DEVNULL)
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,236 @@
+"""
+Replay captured traffic against a running instance
+
+Reads the capture-*.jsonl files written by middleware/capture.py, replays
+them in timestamp order at the original pacing (or `--speed` times faster;
+0 means as fast as possible) and reports the latency distribution and error
+rate per route.
+
+Hashed PII tokens are mapped to stable synthetic values (h:1234... becomes
+replay-1234...@replay.local), so the same captured user is the same replay
+user. `--seed-users` creates those users (and survey answers) first, with
+the password that replaces the passwords left out of the capture.
+
+Replay a capture against a build and save the results:
+    python -m benchmarks.replay captures/ --target http://localhost:5000 --json candidate.json
+
+Compare two builds:
+    python -m benchmarks.replay --compare baseline.json candidate.json
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from config import CAPTURE_SECRET_FIELDS
+from middleware.capture import HASH_PREFIX
+
+# Password of the replay users, sent where the capture left one out
+REPLAY_PASSWORD = 'replay'
+
+def load_capture(paths):
+    """
+    Load capture records from files or folders, sorted by start time
+
+    Args:
+        paths (list): capture-*.jsonl files or folders containing them
+
+    Returns:
+        list: Records
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, 'capture-*.jsonl')))
+        else:
+            files.append(path)
+
+    records = []
+    for name in files:
+        with open(name, encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return sorted(records, key=lambda record: record['t'])
+
+def _unhash(value, key=None):
+    if key in CAPTURE_SECRET_FIELDS and value is None:
+        return REPLAY_PASSWORD
+    if isinstance(value, str) and value.startswith(HASH_PREFIX):
+        return f"replay-{value[len(HASH_PREFIX):]}@replay.local"
+    if isinstance(value, dict):
+        return {key: _unhash(item, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unhash(item) for item in value]
+    return value
+
+def _replay_users(records):
+    users = set()
+    for record in records:
+        for key, value in record['q']:
+            if key == 'email':
+                users.add(_unhash(value))
+        body = record.get('b')
+        if isinstance(body, dict) and 'email' in body:
+            users.add(_unhash(body['email']))
+    return sorted(users)
+
+def seed_users(target, records, session):
+    """
+    Create the replay users (with survey answers) on the target
+    """
+    rng = random.Random(0)
+    for email in _replay_users(records):
+        session.post(f"{target}/api/user", json={'email': email, 'password': REPLAY_PASSWORD})
+        answers = {f'q{i}': rng.random() < 0.5 for i in range(1, 6)}
+        session.post(f"{target}/api/survey", json={'email': email, **answers})
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(samples):
+    """
+    Latency distribution and error rate per route
+
+    Args:
+        samples (list): (route, latency seconds, status or None) tuples
+
+    Returns:
+        dict: Route -> summary
+    """
+    by_route = {}
+    for route, latency, status in samples:
+        by_route.setdefault(route, []).append((latency, status))
+
+    summary = {}
+    for route, values in sorted(by_route.items()):
+        latencies = sorted(latency for latency, _ in values)
+        errors = sum(1 for _, status in values if status is None or status >= 500)
+        summary[route] = {
+            'requests': len(values),
+            'error_rate': errors / len(values),
+            'p50_ms': _percentile(latencies, 50) * 1000,
+            'p90_ms': _percentile(latencies, 90) * 1000,
+            'p99_ms': _percentile(latencies, 99) * 1000,
+            'max_ms': latencies[-1] * 1000
+        }
+    return summary
+
+def replay(records, target, speed=1.0, concurrency=32, timeout=30):
+    """
+    Send the records to the target, keeping their relative timing
+
+    Args:
+        records (list): Capture records sorted by time
+        target (str): Base URL of the instance
+        speed (float): Time compression factor; 0 sends as fast as possible
+        concurrency (int): Maximum requests in flight
+        timeout (float): Per-request timeout in seconds
+
+    Returns:
+        list: (route, latency seconds, status or None) tuples
+    """
+    samples = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(record):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        route = f"{record['m']} {record['p']}"
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                record['m'], target + record['p'],
+                params=[(key, _unhash(value, key)) for key, value in record['q']],
+                json=_unhash(record['b']) if record.get('b') is not None else None,
+                timeout=timeout
+            )
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        with lock:
+            samples.append((route, time.perf_counter() - start, status))
+
+    if not records:
+        return samples
+
+    first = records[0]['t']
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            if speed > 0:
+                delay = (record['t'] - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, record)
+    return samples
+
+def compare(base_path, run_path):
+    with open(base_path) as f:
+        base = json.load(f)['routes']
+    with open(run_path) as f:
+        run = json.load(f)['routes']
+
+    print(f"{'route':<40} {'metric':<11} {'base':>10} {'run':>10} {'change':>8}")
+    for route in sorted(set(base) | set(run)):
+        if route not in base or route not in run:
+            print(f"{route:<40} only in {'run' if route in run else 'base'}")
+            continue
+        for metric in ('p50_ms', 'p90_ms', 'p99_ms', 'error_rate'):
+            old, new = base[route][metric], run[route][metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else '-'
+            print(f"{route:<40} {metric:<11} {old:>10.3f} {new:>10.3f} {change:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('capture', nargs='*', help='Capture files or folders')
+    parser.add_argument('--target', default='http://localhost:5000')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 = original pacing, 2 = twice as fast, 0 = no pacing')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed-users', action='store_true', help='Create the replay users on the target first')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'RUN'), help='Compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.capture:
+        parser.error('a capture file or folder is required')
+
+    records = load_capture(args.capture)
+    target = args.target.rstrip('/')
+    if args.seed_users:
+        seed_users(target, records, requests.Session())
+
+    started = time.perf_counter()
+    samples = replay(records, target, args.speed, args.concurrency)
+    wall = time.perf_counter() - started
+
+    routes = summarize(samples)
+    errors = sum(1 for _, _, status in samples if status is None or status >= 500)
+    print(f"{len(samples)} requests in {wall:.1f}s, error rate {errors / max(len(samples), 1):.2%}")
+    for route, summary in routes.items():
+        print(f"  {route:<40} n={summary['requests']:<6} p50 {summary['p50_ms']:>8.2f} ms  "
+              f"p90 {summary['p90_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms  "
+              f"errors {summary['error_rate']:.2%}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'target': target,
+                'speed': args.speed,
+                'requests': len(samples),
+                'wall_seconds': wall,
+                'routes': routes
+            }, f, indent=2)
+
+if __name__ == '__main__':
+    main()
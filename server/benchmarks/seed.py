@@ -0,0 +1,148 @@
+"""
+Fill the database with synthetic users, surveys, articles and feed history
+
+Run from the server folder against the database configured in .env:
+    python -m benchmarks.seed --users 100000 --articles 20000 --feed-rows 1000000
+"""
+import argparse
+import io
+import logging
+import random
+from datetime import datetime, timedelta
+from db import get_db_connection
+from services.source_bias_service import SourceBiasService
+from benchmarks.synthetic import make_article
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COPY_BATCH = 100000
+
+def bench_email(index):
+    return f"user{index}@bench.local"
+
+def article_sources(rng, unknown_share=0.2, unknown_count=200):
+    """
+    Source names as they come from the news API: mostly outlets known to the
+    bias table (exact hits once normalized) plus unknown local outlets
+    """
+    SourceBiasService.load_source_bias_data()
+    known = [f"{name}.com" for name in SourceBiasService._normalized_to_original.values()]
+    unknown = [f"localnews{i}.com" for i in range(unknown_count)]
+    weight = int(len(known) * unknown_share / (1 - unknown_share)) or 1
+    return known + rng.sample(unknown, min(weight, len(unknown)))
+
+def _csv_field(value):
+    if value is None:
+        return ''
+    text = value.isoformat() if isinstance(value, datetime) else str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+def _copy_rows(cursor, table, columns, rows):
+    """
+    COPY rows into a table in batches
+    """
+    buffer = io.StringIO()
+    count = 0
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    for row in rows:
+        buffer.write(','.join(_csv_field(value) for value in row))
+        buffer.write('\n')
+        count += 1
+        if count % COPY_BATCH == 0:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer = io.StringIO()
+    if buffer.tell():
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    return count
+
+def seed(users=1000, articles=2000, feed_rows=10000, days=7, survey_share=0.8, seed=0):
+    """
+    Generate and load the synthetic data set
+    
+    Article dates are spread over the last `days` days, so roughly
+    1/days of them are "today's" articles served by the feed endpoints.
+    
+    Args:
+        users (int): Number of users
+        articles (int): Number of articles
+        feed_rows (int): Number of feed impressions, about a third of them liked or disliked
+        days (int): Age spread of the articles
+        survey_share (float): Share of users who answered the survey
+        seed (int): Random seed
+        
+    Returns:
+        dict: Row counts per table
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    sources = article_sources(rng)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    counts = {}
+    counts['userdata'] = _copy_rows(cursor, 'userdata', ('email', 'password'),
+                                    ((bench_email(i), 'bench') for i in range(users)))
+    counts['survey_responses'] = _copy_rows(
+        cursor, 'survey_responses', ('email', 'q1', 'q2', 'q3', 'q4', 'q5'),
+        ((bench_email(i), *(rng.random() < 0.5 for _ in range(5)))
+         for i in range(users) if rng.random() < survey_share)
+    )
+    
+    article_rows = []
+    for _ in range(articles):
+        article = make_article(rng, sources, now)
+        article['date_added'] = now - timedelta(seconds=rng.randint(0, days * 86400 - 1))
+        # Keep some of today's articles so the feed endpoints have work to do
+        if article['date_added'].date() != now.date() and rng.random() < 1 / days:
+            article['date_added'] = now.replace(hour=0, minute=0, second=1)
+        article_rows.append(article)
+    
+    columns = ('id', 'headline', 'url', 'source', 'abstract', 'article_date', 'date_added', 'image_url', 'category')
+    counts['articles'] = _copy_rows(cursor, 'articles', columns,
+                                    (tuple(article[column] for column in columns) for article in article_rows))
+    
+    article_ids = [article['id'] for article in article_rows]
+    per_user = max(1, feed_rows // max(users, 1))
+    
+    def feed_generator():
+        produced = 0
+        for i in range(users):
+            email = bench_email(i)
+            for article_id in rng.sample(article_ids, min(per_user, len(article_ids))):
+                if produced >= feed_rows:
+                    return
+                flag = rng.choice(('comfort', 'balanced', 'challenge', 'all'))
+                likes = rng.choice((-1, 0, 0, 0, 1, 1))
+                yield (email, article_id, flag, now - timedelta(seconds=rng.randint(0, days * 86400)), likes)
+                produced += 1
+    
+    counts['feed'] = _copy_rows(cursor, 'feed', ('email', 'article_id', 'flag', 'access_date', 'likes'),
+                                feed_generator())
+    
+    conn.commit()
+    cursor.execute("ANALYZE")
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    logger.info(f"Seeded {counts}")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--feed-rows', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    seed(args.users, args.articles, args.feed_rows, args.days, seed=args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+CATEGORIES = ['general', 'politics', 'business', 'tech', 'science', 'health', 'sports', 'entertainment']
+
+_WORDS = (
+    'senate vote budget court ruling election campaign policy economy market '
+    'climate energy report governor border trade deal inflation rates jobs '
+    'health care reform debate bill house leaders state federal new plan says '
+    'officials week amid after over first amid latest crisis talks global'
+).split()
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+def make_article(rng, sources, now=None):
+    """
+    Build one article row shaped like the `articles` table
+    
+    Args:
+        rng (random.Random): Random source
+        sources (list): Source names to draw from
+        now (datetime, optional): Reference time for the dates
+        
+    Returns:
+        dict: Article row
+    """
+    now = now or datetime.now()
+    article_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    source = rng.choice(sources)
+    published = now - timedelta(minutes=rng.randint(0, 24 * 60))
+    
+    return {
+        'id': article_id,
+        'headline': _sentence(rng, rng.randint(6, 14)),
+        'url': f"https://{source}/news/{article_id}",
+        'source': source,
+        'abstract': _sentence(rng, rng.randint(30, 60)) + '.',
+        'article_date': published,
+        'date_added': now - timedelta(minutes=rng.randint(0, 60)),
+        'image_url': f"https://cdn.{source}/img/{article_id}.jpg",
+        'category': rng.choice(CATEGORIES)
+    }
+
+def make_articles(count, seed=0, sources=None):
+    """
+    Build a list of synthetic article rows
+    
+    Args:
+        count (int): Number of articles
+        seed (int): Random seed, for reproducible runs
+        sources (list, optional): Source names to draw from
+        
+    Returns:
+        list: Article rows
+    """
+    rng = random.Random(seed)
+    sources = sources or [f"outlet{i}.com" for i in range(50)]
+    now = datetime.now()
+    return [make_article(rng, sources, now) for _ in range(count)]
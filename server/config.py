@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 import logging
 
@@ -17,6 +18,143 @@ DB_NAME = os.getenv('DB_NAME')
 DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 
+# Connection pool sizing (per worker process)
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+# Seconds a call waits for a free connection when its request has no deadline
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+
+# Threads per process for running a feed request's independent reads in
+# parallel (see executor.py), and how long a request waits for them
+FEED_EXECUTOR_WORKERS = int(os.getenv('FEED_EXECUTOR_WORKERS', DB_POOL_MAX))
+FEED_READ_TIMEOUT = float(os.getenv('FEED_READ_TIMEOUT', 10))
+
+# Processes per worker for fuzzy source matching (see fuzzy_pool.py; 0
+# matches on the request thread), matches queued at most, and how long a
+# request waits for them before answering without (the answer is cached
+# for the next requests once it arrives)
+FUZZY_POOL_WORKERS = int(os.getenv('FUZZY_POOL_WORKERS', 1))
+FUZZY_POOL_MAX_PENDING = int(os.getenv('FUZZY_POOL_MAX_PENDING', 64))
+FUZZY_MATCH_TIMEOUT = float(os.getenv('FUZZY_MATCH_TIMEOUT', 0.05))
+
+# Async data path (asgi.py): connections per process, how long a request may
+# wait for one, and the background impression writes allowed at once / queued
+ASYNC_DB_POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', 2))
+ASYNC_DB_POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', 20))
+ASYNC_DB_POOL_TIMEOUT = float(os.getenv('ASYNC_DB_POOL_TIMEOUT', 30))
+ASYNC_IMPRESSION_CONCURRENCY = int(os.getenv('ASYNC_IMPRESSION_CONCURRENCY', 4))
+ASYNC_IMPRESSION_MAX_PENDING = int(os.getenv('ASYNC_IMPRESSION_MAX_PENDING', 10000))
+
+# Storage backend behind DatabaseHandler: 'postgres' or 'sqlite'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'postgres').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'publicripple.db'))
+
+# Local article catalog (see storage/catalog.py): a SQLite copy of the
+# recent articles on each node, synced incrementally from PostgreSQL, that
+# serves the article reads of DatabaseHandler. Reads fall back to
+# PostgreSQL when the catalog has not synced for
+# ARTICLE_CATALOG_MAX_STALENESS seconds or has no matching rows.
+ARTICLE_CATALOG_ENABLED = os.getenv('ARTICLE_CATALOG_ENABLED', 'false').lower() == 'true'
+ARTICLE_CATALOG_PATH = os.getenv('ARTICLE_CATALOG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'article_catalog.db'))
+ARTICLE_CATALOG_SYNC_INTERVAL = float(os.getenv('ARTICLE_CATALOG_SYNC_INTERVAL', 5))
+ARTICLE_CATALOG_MAX_STALENESS = float(os.getenv('ARTICLE_CATALOG_MAX_STALENESS', 60))
+ARTICLE_CATALOG_OVERLAP = float(os.getenv('ARTICLE_CATALOG_OVERLAP', 60))
+ARTICLE_CATALOG_RETENTION_DAYS = float(os.getenv('ARTICLE_CATALOG_RETENTION_DAYS', 2))
+ARTICLE_CATALOG_RECONCILE_INTERVAL = float(os.getenv('ARTICLE_CATALOG_RECONCILE_INTERVAL', 300))
+ARTICLE_CATALOG_BATCH_SIZE = int(os.getenv('ARTICLE_CATALOG_BATCH_SIZE', 1000))
+
+# Seconds a worker reuses its pool of today's articles (see
+# services/article_store.py) before reading it again; 0 reads it on every request
+ARTICLE_STORE_TTL = float(os.getenv('ARTICLE_STORE_TTL', 5))
+
+# Cross-worker snapshots (see shared_snapshot.py): the source bias table
+# and the pool of today's articles are published once per node in
+# memory-mapped files under SHARED_CACHE_DIR and attached read-only by every
+# worker, which looks for a newer version every SHARED_CACHE_CHECK_INTERVAL seconds.
+# The files go in a publicripple-<uid> directory of SHARED_CACHE_DIR that only
+# the server's user can open (mode 0700); sharing is off when it is not
+SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', 'true').lower() == 'true'
+SHARED_CACHE_DIR = os.getenv('SHARED_CACHE_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir())
+SHARED_CACHE_CHECK_INTERVAL = float(os.getenv('SHARED_CACHE_CHECK_INTERVAL', 1))
+
+# Load the source bias table and resolver indexes when the app is created
+# instead of on the first request (lets a preforking server share them)
+PRELOAD_CACHES = os.getenv('PRELOAD_CACHES', 'true').lower() == 'true'
+
+# Response compression (gzip, or brotli when installed)
+COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+
+# Number of pre-encoded article JSON fragments kept per worker
+ARTICLE_FRAGMENT_CACHE_SIZE = int(os.getenv('ARTICLE_FRAGMENT_CACHE_SIZE', 5000))
+
+# Per-route request deadlines in seconds (see deadline.py), as
+# "endpoint=seconds" pairs; REQUEST_DEADLINE_DEFAULT covers the other routes
+# (0 = no deadline)
+REQUEST_DEADLINES = {
+    endpoint.strip(): float(seconds)
+    for endpoint, seconds in (
+        pair.split('=', 1) for pair in os.getenv(
+            'REQUEST_DEADLINES',
+            'article.get_articles=2,article.get_feeds=2,article.get_labeled_articles=2,feed.get_political_profile=2,'
+            'news.get_news=5,article.refresh_articles=20'
+        ).split(',') if '=' in pair
+    )
+}
+REQUEST_DEADLINE_DEFAULT = float(os.getenv('REQUEST_DEADLINE_DEFAULT', 0))
+NEWS_API_TIMEOUT = float(os.getenv('NEWS_API_TIMEOUT', 10))
+
+# Admission control (see middleware/admission.py): per-route concurrency,
+# wait queue length and wait time by priority class
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+ADMISSION_TARGET_WAIT = float(os.getenv('ADMISSION_TARGET_WAIT', 0.1))
+ADMISSION_FEED_ENDPOINTS = (
+    'article.get_articles', 'article.get_feeds', 'article.get_labeled_articles',
+    'feed.get_political_profile', 'feed.update_likes'
+)
+ADMISSION_BULK_ENDPOINTS = ('article.refresh_articles', 'news.get_news')
+ADMISSION_EXEMPT_ENDPOINTS = (
+    'metrics', 'health.liveness', 'health.readiness',
+    'admin.get_profiles', 'admin.download_profile'
+)
+ADMISSION_FEED_CONCURRENCY = int(os.getenv('ADMISSION_FEED_CONCURRENCY', DB_POOL_MAX))
+ADMISSION_FEED_QUEUE = int(os.getenv('ADMISSION_FEED_QUEUE', 32))
+ADMISSION_FEED_MAX_WAIT = float(os.getenv('ADMISSION_FEED_MAX_WAIT', 1.0))
+ADMISSION_BULK_CONCURRENCY = int(os.getenv('ADMISSION_BULK_CONCURRENCY', 1))
+ADMISSION_BULK_QUEUE = int(os.getenv('ADMISSION_BULK_QUEUE', 0))
+ADMISSION_BULK_MAX_WAIT = float(os.getenv('ADMISSION_BULK_MAX_WAIT', 0))
+ADMISSION_DEFAULT_CONCURRENCY = int(os.getenv('ADMISSION_DEFAULT_CONCURRENCY', DB_POOL_MAX))
+ADMISSION_DEFAULT_QUEUE = int(os.getenv('ADMISSION_DEFAULT_QUEUE', 16))
+ADMISSION_DEFAULT_MAX_WAIT = float(os.getenv('ADMISSION_DEFAULT_MAX_WAIT', 0.5))
+
+# Opt-in Server-Timing breakdown header on the feed endpoints
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+SERVER_TIMING_ENDPOINTS = tuple(
+    endpoint.strip() for endpoint in os.getenv(
+        'SERVER_TIMING_ENDPOINTS',
+        'article.get_articles,article.get_feeds,article.get_labeled_articles,feed.get_political_profile'
+    ).split(',') if endpoint.strip()
+)
+
+# On-demand request profiling: requests signed with PROFILE_SECRET, or a
+# random PROFILE_SAMPLE_RATE share of requests, are profiled with cProfile
+PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR')
+PROFILE_MAX_CAPTURES = int(os.getenv('PROFILE_MAX_CAPTURES', 50))
+
+# Opt-in traffic capture for replay (see middleware/capture.py)
+CAPTURE_ENABLED = os.getenv('CAPTURE_ENABLED', 'false').lower() == 'true'
+CAPTURE_DIR = os.getenv('CAPTURE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'captures'))
+CAPTURE_SALT = os.getenv('CAPTURE_SALT')
+CAPTURE_PII_FIELDS = ('email',)
+CAPTURE_SECRET_FIELDS = ('password',)
+
+# Token required by the /api/admin routes (disabled when not set)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
 # API keys
 PUBLIC_NEWS_API_KEY = os.getenv('PUBLIC_NEWS_API_KEY')
 
@@ -27,4 +165,7 @@ logger.info(f"DB_PORT: {'Set' if DB_PORT else 'Not set'}")
 logger.info(f"DB_NAME: {'Set' if DB_NAME else 'Not set'}")
 logger.info(f"DB_USER: {'Set' if DB_USER else 'Not set'}")
 logger.info(f"DB_PASSWORD: {'Set (value hidden)' if DB_PASSWORD else 'Not set'}")
+logger.info(f"STORAGE_BACKEND: {STORAGE_BACKEND}")
+logger.info(f"ARTICLE_CATALOG_ENABLED: {ARTICLE_CATALOG_ENABLED}")
+logger.info(f"ADMIN_TOKEN: {'Set (value hidden)' if ADMIN_TOKEN else 'Not set'}")
 logger.info(f"PUBLIC_NEWS_API_KEY: {'Set (value hidden)' if PUBLIC_NEWS_API_KEY else 'Not set'}")
\ No newline at end of file
@@ -1,17 +1,225 @@
+import os
+import threading
 import psycopg2
 import psycopg2.extras
-from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, PUBLIC_NEWS_API_KEY
+import psycopg2.pool
+from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT
+from metrics import record_db_connection, record_db_query, record_db_rows
+import deadline
+
+# Per-process connection pool. It is opened lazily (or explicitly through
+# init_db_pool) in the process that uses it, so a pool created before a
+# fork is never shared with the children.
+_pool = None
+_pool_pid = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+def _raise_if_deadline(error):
+    """
+    Report a statement cancelled by the request deadline as DeadlineExceeded
+    """
+    if deadline.remaining() is not None:
+        deadline.record_exceeded('db')
+        raise deadline.DeadlineExceeded('db') from error
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that accounts queries and fetched rows in the metrics
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            record_db_rows(1)
+            yield row
+
+    def execute(self, query, vars=None):
+        record_db_query()
+        try:
+            return self._cursor.execute(query, vars)
+        except psycopg2.extensions.QueryCanceledError as e:
+            _raise_if_deadline(e)
+            raise
+
+    def executemany(self, query, vars_list):
+        record_db_query()
+        try:
+            return self._cursor.executemany(query, vars_list)
+        except psycopg2.extensions.QueryCanceledError as e:
+            _raise_if_deadline(e)
+            raise
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            record_db_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        record_db_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        record_db_rows(len(rows))
+        return rows
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pooled psycopg2 connection.
+
+    Callers keep using the plain connection API; close() hands the
+    connection back to the pool instead of closing the socket. As a
+    context manager it is handed back on exit, rolling back what was not
+    committed, so that an exception never keeps it (and its pool slot)
+    out of the pool:
+
+        with get_db_connection() as conn:
+            ...
+    """
+
+    def __init__(self, pool, slots, conn):
+        self._pool = pool
+        self._slots = slots
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            if not conn.closed and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            # Broken connection, let the pool discard it
+            self._pool.putconn(conn, close=True)
+        else:
+            self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+
+def init_db_pool(minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, **connect_kwargs):
+    """
+    Open the connection pool for the current process.
+
+    Under a preforking server this must run in each worker after the fork
+    (see gunicorn.conf.py). A pool inherited from the parent is dropped
+    without closing it, since its sockets still belong to the parent.
+
+    Args:
+        minconn (int): Idle connections kept open
+        maxconn (int): Maximum connections checked out at once
+        connect_kwargs: Overrides for the connection settings in config.py
+    """
+    global _pool, _pool_pid, _pool_slots
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+
+        params = dict(
+            host=DB_HOST,
+            port=DB_PORT,
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        params.update(connect_kwargs)
+        _pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **params)
+        # ThreadedConnectionPool raises instead of blocking when exhausted
+        _pool_slots = threading.BoundedSemaphore(maxconn)
+        _pool_pid = os.getpid()
+        return _pool
+
+
+def close_db_pool():
+    """
+    Close every connection held by this process' pool
+    """
+    global _pool, _pool_pid, _pool_slots
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _pool_pid = None
+        _pool_slots = None
+
+
+def db_pool_ready():
+    """
+    Check whether this process has opened its own connection pool
+    """
+    return _pool is not None and _pool_pid == os.getpid()
+
 
 def get_db_connection():
     """
     Create and return a connection to the PostgreSQL database
+
+    Inside a request with a deadline, waiting for a free connection and
+    the connection's transaction are bounded by the remaining budget (see
+    deadline.py); otherwise the wait is bounded by DB_POOL_TIMEOUT.
+
+    Raises:
+        DeadlineExceeded: The request deadline ran out first
+        psycopg2.pool.PoolError: No connection freed up within DB_POOL_TIMEOUT
     """
-    # print(PUBLIC_NEWS_API_KEY)
-    conn = psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
-    )
-    return conn
\ No newline at end of file
+    pool = init_db_pool() if not db_pool_ready() else _pool
+    slots = _pool_slots
+
+    # Wait for a free connection no longer than the request deadline allows
+    wait = deadline.remaining()
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT if wait is None else max(0, min(wait, DB_POOL_TIMEOUT))):
+        if wait is None or wait > DB_POOL_TIMEOUT:
+            raise psycopg2.pool.PoolError(f"No free database connection after {DB_POOL_TIMEOUT:g}s")
+        deadline.record_exceeded('db')
+        raise deadline.DeadlineExceeded('db', "Request deadline exceeded waiting for a database connection")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        slots.release()
+        raise
+    record_db_connection()
+    connection = PooledConnection(pool, slots, conn)
+
+    # Bound every statement of this transaction by what is left of the budget
+    left = deadline.remaining()
+    if left is not None:
+        if left <= 0:
+            connection.close()
+            deadline.record_exceeded('db')
+            raise deadline.DeadlineExceeded('db')
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET LOCAL statement_timeout = %s", (max(1, int(left * 1000)),))
+            cursor.close()
+        except BaseException:
+            # A broken connection: hand it back before the caller holds it
+            connection.close()
+            raise
+
+    return connection
@@ -0,0 +1,139 @@
+"""
+Per-request deadline budgets
+
+Each route listed in REQUEST_DEADLINES (or every route, when
+REQUEST_DEADLINE_DEFAULT is set) gets a time budget when the request
+starts. Work done for the request reads what is left of it:
+
+- get_db_connection() applies it as `SET LOCAL statement_timeout`, so a
+  slow query is cancelled by Postgres instead of holding the worker
+- NewsAPI uses it as the HTTP timeout
+- feed_service falls back to an unpersonalized feed and skips impression
+  logging when the budget runs out
+
+The deadline lives in a context variable, so the parallel reads of a
+request (executor.py) see it too.
+"""
+import contextvars
+import time
+from flask import current_app, g, jsonify, request
+from metrics import Counter
+
+DEADLINE_EXCEEDED = Counter(
+    'request_deadline_exceeded', 'Work cut short or skipped because the request deadline ran out',
+    ('route', 'stage')
+)
+
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The request's deadline ran out before the work could finish
+    """
+
+    def __init__(self, stage, message=None):
+        super().__init__(message or f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+class _Deadline:
+    __slots__ = ('expires', 'route')
+
+    def __init__(self, expires, route):
+        self.expires = expires
+        self.route = route
+
+def remaining():
+    """
+    Seconds left in the current request's budget
+
+    Returns:
+        float: Seconds (0 once expired), or None without a deadline
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline.expires - time.monotonic())
+
+def expired():
+    """
+    Check whether the current request's deadline has run out
+    """
+    left = remaining()
+    return left is not None and left <= 0
+
+def timeout(default):
+    """
+    Timeout for a blocking call: the remaining budget, capped by a default
+
+    Args:
+        default (float): Timeout to use without a deadline, or None
+
+    Returns:
+        float: Seconds, or None for no timeout
+    """
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(left, default)
+
+def record_exceeded(stage):
+    """
+    Count a stage cut short or skipped by the deadline
+
+    Args:
+        stage (str): e.g. 'db', 'news_api', 'profile' or 'impressions'
+    """
+    deadline = _deadline.get()
+    DEADLINE_EXCEEDED.inc(route=deadline.route if deadline is not None else 'none', stage=stage)
+
+def check(stage):
+    """
+    Raise DeadlineExceeded (and count it) if the deadline has run out
+
+    Args:
+        stage (str): Stage about to start
+    """
+    if expired():
+        record_exceeded(stage)
+        raise DeadlineExceeded(stage)
+
+def start(seconds, route):
+    """
+    Start a deadline in the current context
+
+    Args:
+        seconds (float): Budget
+        route (str): Route label for the metrics
+
+    Returns:
+        Token: Pass to reset
+    """
+    return _deadline.set(_Deadline(time.monotonic() + seconds, route))
+
+def reset(token):
+    _deadline.reset(token)
+
+def _before_request():
+    budgets = current_app.config.get('REQUEST_DEADLINES', {})
+    seconds = budgets.get(request.endpoint, current_app.config.get('REQUEST_DEADLINE_DEFAULT'))
+    if seconds:
+        g._deadline_token = start(seconds, request.endpoint)
+
+def _teardown_request(exc):
+    token = g.pop('_deadline_token', None)
+    if token is not None:
+        reset(token)
+
+def _deadline_exceeded(e):
+    return jsonify({'error': 'Request deadline exceeded'}), 504
+
+def init_app(app):
+    """
+    Register the deadline hooks and turn DeadlineExceeded into a 504
+
+    Args:
+        app (Flask): The app
+    """
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    app.register_error_handler(DeadlineExceeded, _deadline_exceeded)
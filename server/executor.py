@@ -0,0 +1,108 @@
+"""
+Bounded thread pool for running a request's independent reads in parallel
+
+    articles, survey = run_parallel(
+        lambda: DatabaseHandler.get_today_articles(categories),
+        lambda: DatabaseHandler.get_survey_responses(email)
+    )
+
+The pool is sized to the database connection pool (FEED_EXECUTOR_WORKERS
+defaults to DB_POOL_MAX), since almost every task holds a connection. The
+calling thread runs the first task itself, so a request always makes
+progress even when every pool thread is busy. Tasks run in a copy of the
+caller's context, so their queries are accounted to the request.
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from config import FEED_EXECUTOR_WORKERS
+
+# Per-process pool, created lazily so that no thread crosses a fork
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor, _executor_pid
+
+    if _executor is not None and _executor_pid == os.getpid():
+        return _executor
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=FEED_EXECUTOR_WORKERS, thread_name_prefix='feed-read')
+            _executor_pid = os.getpid()
+        return _executor
+
+def run_parallel(*calls, timeout=None, return_exceptions=False):
+    """
+    Run zero-argument callables concurrently and return their results
+
+    Args:
+        calls: Callables to run
+        timeout (float, optional): Seconds to wait for the tasks on the pool
+        return_exceptions (bool): Put errors (and a TimeoutError for tasks
+            that did not finish in time) in the results instead of raising
+
+    Returns:
+        list: Results, in the order of the calls
+
+    Raises:
+        TimeoutError: If the pool tasks did not finish in time. They keep
+            running in the background, but their results are discarded.
+        Exception: The first error raised by any call; the tasks that have
+            not started yet are cancelled.
+    """
+    if len(calls) <= 1 and not return_exceptions:
+        return [call() for call in calls]
+
+    executor = _get_executor()
+    futures = [executor.submit(contextvars.copy_context().run, call) for call in calls[1:]]
+
+    try:
+        first = calls[0]()
+    except Exception as e:
+        if not return_exceptions:
+            for future in futures:
+                future.cancel()
+            raise
+        first = e
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+    if return_exceptions:
+        done, pending = wait(futures, timeout=timeout)
+        for future in pending:
+            future.cancel()
+        return [first] + [
+            (future.exception() or future.result()) if future in done
+            else TimeoutError(f"Parallel read did not finish within {timeout}s")
+            for future in futures
+        ]
+
+    done, pending = wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+    for future in done:
+        if future.exception() is not None:
+            for other in pending:
+                other.cancel()
+            raise future.exception()
+    if pending:
+        for future in pending:
+            future.cancel()
+        raise TimeoutError(f"{len(pending)} of {len(calls)} parallel reads did not finish within {timeout}s")
+
+    return [first] + [future.result() for future in futures]
+
+def shutdown_executor():
+    """
+    Stop this process' pool threads (for tests and benchmarks)
+    """
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        _executor_pid = None
@@ -0,0 +1,97 @@
+"""
+Process pool for fuzzy source matching
+
+difflib matching is pure-Python CPU work: run on a request thread it holds
+the GIL and stalls every other thread of the worker. FuzzyPool runs it in
+separate processes instead, each holding a copy of the table's keys:
+
+    pool = FuzzyPool(bias_data.keys())
+    future = pool.submit('nytimez')   # None when the pool is saturated
+    best_key = future.result(timeout=0.05)
+
+At most `max_pending` matches are queued or running; past that submit()
+returns None and the caller answers without fuzzy matching. A name already
+being matched shares the running match. The processes are spawned, not
+forked, so that no request thread or database connection is copied into
+them.
+"""
+import difflib
+import multiprocessing
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+# Keys of the table, in the pool processes
+_keys = None
+
+def _init(keys):
+    global _keys
+    _keys = keys
+
+def _closest(name):
+    matches = difflib.get_close_matches(name, _keys, n=1, cutoff=0.6)
+    return matches[0] if matches else None
+
+class FuzzyPool:
+    """
+    Processes matching names against one table's keys
+    """
+
+    def __init__(self, keys, workers=1, max_pending=64):
+        """
+        Args:
+            keys (iterable): Normalized names of the table, in table order
+            workers (int): Processes
+            max_pending (int): Matches queued or running at most
+        """
+        self.max_pending = max_pending
+        self.broken = False
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init,
+            initargs=(list(keys),)
+        )
+
+    def submit(self, name):
+        """
+        Find the key closest to a name, as difflib.get_close_matches(name,
+        keys, n=1, cutoff=0.6) does
+
+        Args:
+            name (str): Normalized name
+
+        Returns:
+            Future: Of the closest key, or None if no key is close enough;
+                    None instead of a future when the pool is saturated
+        """
+        with self._lock:
+            future = self._pending.get(name)
+            if future is not None:
+                return future
+            if len(self._pending) >= self.max_pending:
+                return None
+            try:
+                future = self._executor.submit(_closest, name)
+            except RuntimeError:
+                # Shut down, or broken by a process that died
+                self.broken = True
+                return None
+            self._pending[name] = future
+        future.add_done_callback(lambda done: self._done(name, done))
+        return future
+
+    def _done(self, name, future):
+        with self._lock:
+            self._pending.pop(name, None)
+        if not future.cancelled() and isinstance(future.exception(), BrokenExecutor):
+            # A process died: the pool takes no more work
+            self.broken = True
+
+    def shutdown(self):
+        """
+        Stop the processes once the running matches complete; queued
+        matches are cancelled
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
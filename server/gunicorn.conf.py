@@ -0,0 +1,27 @@
+import gc
+import os
+
+# Load the app (and its caches) once in the master, then fork the workers
+wsgi_app = 'wsgi:app'
+preload_app = True
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+# More threads than the admission controller lets run at once, so that
+# excess requests queue (and get shed) in the app rather than unseen in
+# the accept backlog (see middleware/admission.py)
+threads = int(os.getenv('WORKER_THREADS', 16))
+
+def when_ready(server):
+    # Everything allocated so far (bias table, indexes, imported modules) is
+    # moved out of the collector's reach so that GC passes in the workers do
+    # not touch those objects and un-share their copy-on-write pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    # Database connections must never cross a fork: each worker opens its own
+    from db import init_db_pool
+    try:
+        init_db_pool()
+    except Exception as e:
+        # The pool is opened again lazily and /api/health/ready stays red until then
+        server.log.warning(f"Worker {worker.pid} could not open the database pool: {e}")
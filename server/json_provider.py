@@ -0,0 +1,90 @@
+import json
+import uuid
+import decimal
+import dataclasses
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    # Optional dependency: fall back to the stdlib encoder
+    orjson = None
+
+def _default(obj):
+    """
+    Serialize the types the encoders do not handle natively
+    
+    Dates are written as ISO 8601 by both encoders so the payload does not
+    depend on whether orjson is installed.
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        """
+        Serialize an object to compact UTF-8 JSON bytes
+        
+        Args:
+            obj: The data to serialize
+            
+        Returns:
+            bytes: Encoded JSON
+        """
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps_bytes(obj):
+        """
+        Serialize an object to compact UTF-8 JSON bytes
+        
+        Args:
+            obj: The data to serialize
+            
+        Returns:
+            bytes: Encoded JSON
+        """
+        return json.dumps(obj, default=_default, ensure_ascii=False,
+                          separators=(',', ':')).encode('utf-8')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson when it is installed
+    
+    Datetimes, dates and UUIDs are serialized natively (ISO 8601 instead of
+    Flask's RFC 822 dates) and keys are not sorted.
+    """
+    
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+    
+    def dumps(self, obj, **kwargs):
+        # Custom encoder arguments (indent, cls, ...) need the stdlib encoder
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Pretty printing in debug mode goes through the stdlib encoder
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,331 @@
+"""
+Minimal Prometheus metrics for the Flask app
+
+Metrics live in the worker process that records them, so under a
+preforking server each scrape of /metrics reports one worker; scrape every
+worker (or run a single-worker deployment per target) to get the totals.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from flask import Response, g, request
+
+_lock = threading.Lock()
+_registry = []
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labelvalues, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labelvalues, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+class Counter(_Metric):
+    """
+    Monotonically increasing counter
+    """
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with _lock:
+            items = sorted(self._values.items())
+        return [('_total', key, None, value) for key, value in items]
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, or be read from a callback at scrape time
+
+    The callback returns a dict of label-value tuples -> value.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        if self._callback is not None:
+            values = self._callback()
+        else:
+            with _lock:
+                values = dict(self._values)
+        return [('', key, None, value) for key, value in sorted(values.items())]
+
+class Histogram(_Metric):
+    """
+    Cumulative histogram with fixed buckets
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels):
+        """
+        Get the number and sum of observations for one label set
+
+        Returns:
+            tuple: (count, sum)
+        """
+        with _lock:
+            state = self._values.get(self._key(labels))
+            return (state[2], state[1]) if state is not None else (0, 0.0)
+
+    def _samples(self):
+        with _lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', key, ('le', _format_value(bound)), cumulative))
+            samples.append(('_sum', key, None, total))
+            samples.append(('_count', key, None, count))
+        return samples
+
+def render():
+    """
+    Render every registered metric in the Prometheus text format
+
+    Returns:
+        str: Exposition text
+    """
+    with _lock:
+        metrics = list(_registry)
+    return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+# Request-level metrics
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    ('method', 'route', 'status')
+)
+REQUEST_DB_CONNECTIONS = Histogram(
+    'http_request_db_connections', 'Database connections checked out per request',
+    ('route',), buckets=COUNT_BUCKETS
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries executed per request',
+    ('route',), buckets=COUNT_BUCKETS
+)
+REQUEST_DB_ROWS = Histogram(
+    'http_request_db_rows', 'Database rows fetched per request',
+    ('route',), buckets=COUNT_BUCKETS
+)
+
+# Process-wide database metrics
+DB_CONNECTIONS = Counter('db_connections', 'Database connections checked out')
+DB_QUERIES = Counter('db_queries', 'Database queries executed')
+DB_ROWS = Counter('db_rows_fetched', 'Database rows fetched')
+
+# Background feed impression writes of the async data path
+IMPRESSION_WRITES = Counter(
+    'feed_impression_writes', 'Background feed impression batches by result',
+    ('result',)
+)
+
+# Source bias resolution by the matching path taken
+SOURCE_BIAS_RESOLUTIONS = Counter(
+    'source_bias_resolutions', 'Source bias lookups by matching path',
+    ('path',)
+)
+SOURCE_BIAS_RESOLUTION_LATENCY = Histogram(
+    'source_bias_resolution_duration_seconds', 'Source bias lookup latency by matching path',
+    ('path',), buckets=(0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+)
+# Fuzzy matches offloaded to the process pool (fuzzy_pool.py): answered in
+# time, deferred to later requests, or rejected (pool saturated)
+SOURCE_BIAS_FUZZY_OFFLOADS = Counter(
+    'source_bias_fuzzy_offloads', 'Fuzzy source matches sent to the process pool by outcome',
+    ('outcome',)
+)
+
+# Feed article pool (services/article_store.py); scanned articles over scan
+# seconds is the ranking throughput
+ARTICLE_STORE_ARTICLES = Gauge('article_store_articles', 'Articles in the feed article pool')
+ARTICLE_STORE_BYTES_PER_ARTICLE = Gauge(
+    'article_store_bytes_per_article', 'Memory per article of the feed article pool by part',
+    ('part',)
+)
+ARTICLE_STORE_SCANNED = Counter('article_store_scanned_articles', 'Articles scanned by feed ranking')
+ARTICLE_STORE_SCAN_SECONDS = Counter('article_store_scan_seconds', 'Time spent scanning the feed article pool')
+
+class RequestStats:
+    """
+    Database work done on behalf of the current request
+    """
+    __slots__ = ('connections', 'queries', 'rows', 'lock')
+
+    def __init__(self):
+        self.connections = 0
+        self.queries = 0
+        self.rows = 0
+        # Parallel reads of one request (executor.py) update it from several threads
+        self.lock = threading.Lock()
+
+# Held in a context variable rather than flask.g so that work done on
+# helper threads (with a copied context) is still accounted to the request
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+def current_request_stats():
+    """
+    Get the database accounting of the current request
+
+    Returns:
+        RequestStats: Stats object, or None outside of a request
+    """
+    return _request_stats.get()
+
+def record_db_connection():
+    DB_CONNECTIONS.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        with stats.lock:
+            stats.connections += 1
+
+def record_db_query():
+    DB_QUERIES.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        with stats.lock:
+            stats.queries += 1
+
+def record_db_rows(count):
+    if not count:
+        return
+    DB_ROWS.inc(count)
+    stats = _request_stats.get()
+    if stats is not None:
+        with stats.lock:
+            stats.rows += count
+
+def begin_request():
+    """
+    Start the database accounting of a request in the current context
+
+    Returns:
+        Token: Pass to end_request
+    """
+    return _request_stats.set(RequestStats())
+
+def end_request(token, method, route, status, elapsed):
+    """
+    Record the latency and database work of a finished request
+
+    Args:
+        token (Token): Returned by begin_request, or None
+        method (str): HTTP method
+        route (str): Route label
+        status (int): Response status
+        elapsed (float): Latency in seconds
+    """
+    REQUEST_LATENCY.observe(elapsed, method=method, route=route, status=status)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        REQUEST_DB_CONNECTIONS.observe(stats.connections, route=route)
+        REQUEST_DB_QUERIES.observe(stats.queries, route=route)
+        REQUEST_DB_ROWS.observe(stats.rows, route=route)
+    if token is not None:
+        _request_stats.reset(token)
+
+def _route_label():
+    return request.endpoint or 'unmatched'
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+    g._metrics_token = begin_request()
+
+def _after_request(response):
+    start = g.pop('_metrics_start', None)
+    token = g.pop('_metrics_token', None)
+    if start is None:
+        return response
+
+    end_request(token, request.method, _route_label(), response.status_code, time.perf_counter() - start)
+    return response
+
+def metrics_endpoint():
+    """
+    Expose the metrics of this worker in the Prometheus text format
+    """
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    """
+    Register the request hooks and the /metrics endpoint
+
+    Register this before other after_request hooks so that it runs last
+    and the latency includes them.
+
+    Args:
+        app (Flask): The app to instrument
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
@@ -0,0 +1,217 @@
+"""
+Admission control and load shedding in front of the blueprints
+
+Every route gets its own limiter: at most `concurrency` requests run at
+once, and a bounded number wait for a slot. When Postgres slows down the
+queue length limit shrinks (AIMD: halved when a request waited longer than
+ADMISSION_TARGET_WAIT, at most once per interval; grown by about one slot
+per `limit` fast admissions), so excess requests get an immediate 503 with
+Retry-After instead of all of them timing out.
+
+Routes belong to a priority class. Feed reads (ADMISSION_FEED_ENDPOINTS)
+get the bigger limits; bulk calls (ADMISSION_BULK_ENDPOINTS, e.g. the News
+API refresh) are shed first: they are rejected while any feed request is
+waiting. Health, metrics and admin routes are never limited.
+
+The limits only bite if a worker has more threads than the route
+concurrency (see WORKER_THREADS in gunicorn.conf.py): requests beyond the
+thread count wait in the server's accept queue, out of reach of this module.
+"""
+import logging
+import math
+import threading
+import time
+from flask import current_app, g, jsonify, request
+from metrics import Counter, Gauge, Histogram
+import deadline
+
+logger = logging.getLogger(__name__)
+
+FEED = 'feed'
+BULK = 'bulk'
+DEFAULT = 'default'
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+class RouteLimiter:
+    """
+    Concurrency limit plus an adaptive wait queue for one route
+    """
+
+    def __init__(self, route, priority, concurrency, queue_max, max_wait, target_wait):
+        self.route = route
+        self.priority = priority
+        self.concurrency = max(1, concurrency)
+        self.queue_max = max(0, queue_max)
+        self.queue_limit = float(self.queue_max)
+        self.max_wait = max_wait
+        self.target_wait = target_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, max_wait):
+        """
+        Take a slot, waiting up to `max_wait` seconds for one
+
+        Returns:
+            tuple: (admitted, reason for a rejection, seconds waited)
+        """
+        with self._cond:
+            if self.in_flight < self.concurrency and self.waiting == 0:
+                self.in_flight += 1
+                return True, None, 0.0
+
+            if self.waiting >= int(self.queue_limit) or max_wait <= 0:
+                return False, 'queue_full', 0.0
+
+            start = time.monotonic()
+            self.waiting += 1
+            try:
+                while self.in_flight >= self.concurrency:
+                    left = max_wait - (time.monotonic() - start)
+                    if left <= 0:
+                        self._decrease()
+                        return False, 'timeout', time.monotonic() - start
+                    self._cond.wait(left)
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+
+            waited = time.monotonic() - start
+            if waited > self.target_wait:
+                self._decrease()
+            else:
+                self._increase()
+            return True, None, waited
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def _decrease(self):
+        # Multiplicative decrease, once per target interval so that one
+        # burst of slow requests does not collapse the queue to nothing
+        now = time.monotonic()
+        if now - self._last_decrease >= self.target_wait:
+            self.queue_limit = max(1.0, self.queue_limit / 2)
+            self._last_decrease = now
+
+    def _increase(self):
+        # Additive increase: about one slot per `queue_limit` fast admissions
+        if self.queue_limit < self.queue_max:
+            self.queue_limit = min(float(self.queue_max), self.queue_limit + 1 / max(self.queue_limit, 1.0))
+
+def _snapshot(attribute):
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {(limiter.route, limiter.priority): getattr(limiter, attribute) for limiter in limiters}
+
+ADMISSION_IN_FLIGHT = Gauge(
+    'admission_in_flight', 'Requests running per route',
+    ('route', 'priority'), callback=lambda: _snapshot('in_flight')
+)
+ADMISSION_WAITING = Gauge(
+    'admission_waiting', 'Requests waiting for a slot per route',
+    ('route', 'priority'), callback=lambda: _snapshot('waiting')
+)
+ADMISSION_QUEUE_LIMIT = Gauge(
+    'admission_queue_limit', 'Current adaptive wait queue limit per route',
+    ('route', 'priority'), callback=lambda: _snapshot('queue_limit')
+)
+ADMISSION_CONCURRENCY = Gauge(
+    'admission_concurrency_limit', 'Concurrency limit per route',
+    ('route', 'priority'), callback=lambda: _snapshot('concurrency')
+)
+ADMISSION_REJECTED = Counter(
+    'admission_rejected', 'Requests shed by the admission controller',
+    ('route', 'priority', 'reason')
+)
+ADMISSION_WAIT = Histogram(
+    'admission_wait_seconds', 'Time admitted requests waited for a slot',
+    ('priority',), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+def _priority(config, endpoint):
+    if endpoint in config.get('ADMISSION_FEED_ENDPOINTS', ()):
+        return FEED
+    if endpoint in config.get('ADMISSION_BULK_ENDPOINTS', ()):
+        return BULK
+    return DEFAULT
+
+def _limiter(endpoint):
+    limiter = _limiters.get(endpoint)
+    if limiter is not None:
+        return limiter
+
+    config = current_app.config
+    priority = _priority(config, endpoint)
+    prefix = f"ADMISSION_{priority.upper()}_"
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            limiter = _limiters[endpoint] = RouteLimiter(
+                endpoint, priority,
+                concurrency=config[prefix + 'CONCURRENCY'],
+                queue_max=config[prefix + 'QUEUE'],
+                max_wait=config[prefix + 'MAX_WAIT'],
+                target_wait=config['ADMISSION_TARGET_WAIT']
+            )
+    return limiter
+
+def _feed_backlog():
+    with _limiters_lock:
+        return any(limiter.waiting for limiter in _limiters.values() if limiter.priority == FEED)
+
+def _reject(limiter, reason):
+    ADMISSION_REJECTED.inc(route=limiter.route, priority=limiter.priority, reason=reason)
+    # Suggest coming back after roughly one queue drain
+    retry_after = max(1, math.ceil(limiter.max_wait))
+    response = jsonify({'error': 'Server busy, retry later'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def _before_request():
+    endpoint = request.endpoint
+    if endpoint is None or endpoint in current_app.config.get('ADMISSION_EXEMPT_ENDPOINTS', ()):
+        return None
+
+    limiter = _limiter(endpoint)
+
+    # Bulk work yields to queued feed reads
+    if limiter.priority == BULK and _feed_backlog():
+        return _reject(limiter, 'priority')
+
+    # Never queue past the request deadline
+    max_wait = deadline.timeout(limiter.max_wait)
+    admitted, reason, waited = limiter.acquire(max_wait)
+    if not admitted:
+        return _reject(limiter, reason)
+
+    ADMISSION_WAIT.observe(waited, priority=limiter.priority)
+    g._admission_limiter = limiter
+    return None
+
+def _teardown_request(exc):
+    limiter = g.pop('_admission_limiter', None)
+    if limiter is not None:
+        limiter.release()
+
+def init_app(app):
+    """
+    Register the admission hooks if ADMISSION_ENABLED is set
+
+    Register this early (after the metrics and deadline hooks) so that
+    rejected requests do no other work.
+
+    Args:
+        app (Flask): The app to protect
+    """
+    if not app.config.get('ADMISSION_ENABLED'):
+        return
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
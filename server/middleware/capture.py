@@ -0,0 +1,137 @@
+"""
+Opt-in traffic capture for replay
+
+Each request is appended as one compact JSON line to a per-worker file in
+CAPTURE_DIR. Values of the fields listed in CAPTURE_PII_FIELDS (query
+string or JSON body) are replaced by a hash keyed with CAPTURE_SALT, so the
+same user maps to the same token across the capture without the address
+being stored; capture stays off while no salt is set. Values of the fields
+listed in CAPTURE_SECRET_FIELDS (passwords) are not recorded at all: they
+are written as null.
+
+Record layout:
+    {"t": start epoch, "m": method, "p": path, "q": [[key, value], ...],
+     "b": JSON body or null, "s": status, "d": duration ms}
+
+Replay with `python -m benchmarks.replay`.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+HASH_PREFIX = 'h:'
+
+# Routes that are never captured
+EXCLUDED_PREFIXES = ('/metrics', '/api/admin', '/api/health')
+
+_files = {}
+_files_lock = threading.Lock()
+
+def hash_value(salt, value):
+    """
+    Replace a PII value with a stable keyed hash token
+    
+    Args:
+        salt (str): CAPTURE_SALT
+        value: The value to hide
+        
+    Returns:
+        str: 'h:' followed by 16 hex characters
+    """
+    digest = hmac.new(salt.encode(), str(value).encode(), hashlib.sha256).hexdigest()
+    return HASH_PREFIX + digest[:16]
+
+def _scrub_field(key, value, pii_fields, secret_fields, salt):
+    if key in secret_fields:
+        return None
+    if key in pii_fields and value is not None:
+        return hash_value(salt, value)
+    return _scrub(value, pii_fields, secret_fields, salt)
+
+def _scrub(value, pii_fields, secret_fields, salt):
+    if isinstance(value, dict):
+        return {
+            key: _scrub_field(key, item, pii_fields, secret_fields, salt)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_scrub(item, pii_fields, secret_fields, salt) for item in value]
+    return value
+
+def _capture_file(directory):
+    """
+    Get this worker's capture file and its write lock
+    """
+    # One file per worker process: appends never interleave across processes
+    pid = os.getpid()
+    with _files_lock:
+        entry = _files.get(pid)
+        if entry is None:
+            os.makedirs(directory, exist_ok=True)
+            handle = open(os.path.join(directory, f"capture-{pid}.jsonl"), 'a', encoding='utf-8', buffering=1)
+            entry = _files[pid] = (handle, threading.Lock())
+    return entry
+
+def _before_request():
+    g._capture_start = time.time()
+
+def _after_request(response):
+    start = g.pop('_capture_start', None)
+    if start is None or request.path.startswith(EXCLUDED_PREFIXES):
+        return response
+    
+    config = current_app.config
+    pii_fields = set(config.get('CAPTURE_PII_FIELDS', ('email',)))
+    secret_fields = set(config.get('CAPTURE_SECRET_FIELDS', ('password',)))
+    salt = config['CAPTURE_SALT']
+    
+    query = [
+        [key, _scrub_field(key, value, pii_fields, secret_fields, salt)]
+        for key, value in request.args.items(multi=True)
+    ]
+    body = request.get_json(silent=True) if request.is_json else None
+    
+    record = {
+        't': round(start, 6),
+        'm': request.method,
+        'p': request.path,
+        'q': query,
+        'b': _scrub(body, pii_fields, secret_fields, salt),
+        's': response.status_code,
+        'd': round((time.time() - start) * 1000, 3)
+    }
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    
+    try:
+        handle, lock = _capture_file(config['CAPTURE_DIR'])
+        with lock:
+            handle.write(line)
+    except OSError as e:
+        logger.error(f"Could not write traffic capture: {e}")
+    
+    return response
+
+def init_app(app):
+    """
+    Register the capture hooks if CAPTURE_ENABLED is set
+    
+    Without CAPTURE_SALT the hashes of the PII values could be reversed by
+    trying candidate values, so nothing is captured.
+    
+    Args:
+        app (Flask): The app to instrument
+    """
+    if not app.config.get('CAPTURE_ENABLED'):
+        return
+    if not app.config.get('CAPTURE_SALT'):
+        logger.error("CAPTURE_ENABLED is set but CAPTURE_SALT is not; traffic capture stays off")
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,72 @@
+import gzip
+import logging
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    # Optional dependency: only gzip is offered without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+def init_app(app):
+    """
+    Compress eligible responses according to the client's Accept-Encoding
+    
+    Args:
+        app (Flask): The app to register the hook on
+    """
+    app.after_request(compress_response)
+
+def _choose_encoding():
+    """
+    Pick the best encoding the client accepts, preferring brotli
+    
+    Returns:
+        str: 'br', 'gzip' or None
+    """
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def compress_response(response):
+    """
+    Compress the response body if it is large enough to be worth it
+    
+    Args:
+        response (Response): The outgoing response
+        
+    Returns:
+        Response: The (possibly compressed) response
+    """
+    config = current_app.config
+    
+    if not config.get('COMPRESS_ENABLED', True):
+        return response
+    
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in config.get('COMPRESS_MIMETYPES', ('application/json',))):
+        return response
+    
+    # The body depends on the request's Accept-Encoding from here on
+    response.vary.add('Accept-Encoding')
+    
+    if (response.content_length or 0) < config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    
+    encoding = _choose_encoding()
+    if not encoding:
+        return response
+    
+    data = response.get_data()
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+    else:
+        compressed = gzip.compress(data, compresslevel=config.get('COMPRESS_GZIP_LEVEL', 6))
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    
+    return response
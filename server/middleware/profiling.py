@@ -0,0 +1,170 @@
+"""
+On-demand request profiling
+
+A request is profiled with cProfile when it carries a valid admin-signed
+X-Profile header, or when it is picked by PROFILE_SAMPLE_RATE. Profiles are
+written as pstats files to a bounded ring buffer in PROFILE_DIR and can be
+listed and downloaded through /api/admin/profiles.
+
+Mint a header value for a path (valid for 5 minutes) with:
+    python -m middleware.profiling /api/articles
+"""
+import cProfile
+import hashlib
+import hmac
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SUFFIX = '.prof'
+
+def sign_profile_request(secret, path, ttl=300):
+    """
+    Build an X-Profile header value authorizing one path until it expires
+    
+    Args:
+        secret (str): PROFILE_SECRET shared with the server
+        path (str): Request path to profile, e.g. '/api/articles'
+        ttl (int): Validity in seconds
+        
+    Returns:
+        str: Header value of the form '<expires>:<signature>'
+    """
+    expires = int(time.time()) + ttl
+    signature = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}:{signature}"
+
+def _valid_signature(secret, value, path):
+    try:
+        expires, signature = value.split(':', 1)
+        if int(expires) < time.time():
+            return False
+    except ValueError:
+        return False
+    expected = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    # Compared as bytes: compare_digest rejects non-ASCII strings
+    return hmac.compare_digest(expected.encode(), signature.encode())
+
+def profile_dir(app=None):
+    """
+    Directory holding the captured profiles
+    """
+    app = app or current_app
+    return app.config.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'publicripple-profiles')
+
+def list_captures(directory):
+    """
+    List the captured profiles, newest first
+    
+    Args:
+        directory (str): Profile directory
+        
+    Returns:
+        list: Dictionaries with name, size and created (epoch seconds)
+    """
+    try:
+        entries = [entry for entry in os.scandir(directory)
+                   if entry.is_file() and entry.name.endswith(PROFILE_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    
+    captures = [
+        {'name': entry.name, 'size': entry.stat().st_size, 'created': entry.stat().st_mtime}
+        for entry in entries
+    ]
+    return sorted(captures, key=lambda capture: capture['created'], reverse=True)
+
+def _store_capture(profiler, elapsed):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    
+    endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+    name = (f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{os.urandom(3).hex()}"
+            f"-{endpoint}-{int(elapsed * 1000)}ms{PROFILE_SUFFIX}")
+    
+    # Write then rename so a listing never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    profiler.dump_stats(tmp_path)
+    os.replace(tmp_path, os.path.join(directory, name))
+    
+    # Keep only the newest captures
+    max_captures = current_app.config.get('PROFILE_MAX_CAPTURES', 50)
+    for capture in list_captures(directory)[max_captures:]:
+        try:
+            os.remove(os.path.join(directory, capture['name']))
+        except FileNotFoundError:
+            pass
+    
+    return name
+
+def _should_profile():
+    config = current_app.config
+    
+    header = request.headers.get(PROFILE_HEADER)
+    if header is not None:
+        secret = config.get('PROFILE_SECRET')
+        if secret and _valid_signature(secret, header, request.path):
+            return True
+        logger.warning(f"Rejected {PROFILE_HEADER} header for {request.path}")
+        return False
+    
+    rate = config.get('PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+def _before_request():
+    if not _should_profile():
+        return
+    g._profiler = cProfile.Profile()
+    g._profile_start = time.perf_counter()
+    g._profiler.enable()
+
+def _after_request(response):
+    profiler = g.pop('_profiler', None)
+    if profiler is None:
+        return response
+    
+    profiler.disable()
+    elapsed = time.perf_counter() - g.pop('_profile_start')
+    try:
+        name = _store_capture(profiler, elapsed)
+        response.headers['X-Profile-Capture'] = name
+    except OSError as e:
+        logger.error(f"Could not store request profile: {e}")
+    
+    return response
+
+def _teardown_request(exc):
+    # Never leave a profiler running if the request failed before after_request
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+def init_app(app):
+    """
+    Register the profiling hooks when profiling can be triggered at all
+    
+    Without PROFILE_SECRET and with PROFILE_SAMPLE_RATE at 0 no hook is
+    installed, leaving the request path untouched.
+    
+    Args:
+        app (Flask): The app to instrument
+    """
+    if not app.config.get('PROFILE_SECRET') and not app.config.get('PROFILE_SAMPLE_RATE'):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+if __name__ == '__main__':
+    from config import PROFILE_SECRET
+    if len(sys.argv) != 2 or not PROFILE_SECRET:
+        sys.exit("usage: python -m middleware.profiling <path>  (requires PROFILE_SECRET)")
+    print(f"{PROFILE_HEADER}: {sign_profile_request(PROFILE_SECRET, sys.argv[1])}")
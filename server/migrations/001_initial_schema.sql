@@ -0,0 +1,39 @@
+-- Reference schema for the tables used by DatabaseHandler
+CREATE TABLE IF NOT EXISTS userdata (
+    email TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS survey_responses (
+    email TEXT PRIMARY KEY REFERENCES userdata (email),
+    q1 BOOLEAN,
+    q2 BOOLEAN,
+    q3 BOOLEAN,
+    q4 BOOLEAN,
+    q5 BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    headline TEXT,
+    url TEXT,
+    source TEXT,
+    abstract TEXT,
+    article_date TIMESTAMP,
+    date_added TIMESTAMP NOT NULL DEFAULT NOW(),
+    image_url TEXT,
+    category TEXT
+);
+
+-- get_today_articles / get_recent_articles filter on DATE(date_added)
+CREATE INDEX IF NOT EXISTS articles_date_added_day_idx ON articles ((DATE(date_added)), date_added DESC);
+
+CREATE TABLE IF NOT EXISTS feed (
+    email TEXT NOT NULL REFERENCES userdata (email),
+    article_id TEXT NOT NULL REFERENCES articles (id),
+    flag TEXT NOT NULL,
+    access_date TIMESTAMP NOT NULL DEFAULT NOW(),
+    likes INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS feed_email_idx ON feed (email, article_id);
@@ -0,0 +1,18 @@
+-- One feed row per (email, article_id, flag), so that impressions can be
+-- written with INSERT ... ON CONFLICT DO NOTHING instead of SELECT + INSERT.
+-- Duplicates left by concurrent requests are removed first, keeping the row
+-- that carries a like or dislike, then the most recent one.
+DELETE FROM feed f
+USING (
+    SELECT ctid, row_number() OVER (
+        PARTITION BY email, article_id, flag
+        ORDER BY (likes <> 0) DESC, access_date DESC
+    ) AS rn
+    FROM feed
+) d
+WHERE f.ctid = d.ctid AND d.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS feed_email_article_flag_key ON feed (email, article_id, flag);
+
+-- Covered by the unique index's (email, article_id) prefix
+DROP INDEX IF EXISTS feed_email_idx;
@@ -0,0 +1,38 @@
+import hmac
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, abort
+from middleware.profiling import profile_dir, list_captures, PROFILE_SUFFIX
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+@admin_bp.before_request
+def require_admin_token():
+    """
+    Only allow requests carrying the configured ADMIN_TOKEN
+    """
+    token = current_app.config.get('ADMIN_TOKEN')
+    supplied = request.headers.get('X-Admin-Token', '')
+    
+    # Admin routes are disabled unless a token is configured
+    if not token:
+        abort(404)
+    # Compared as bytes: compare_digest rejects non-ASCII strings
+    if not hmac.compare_digest(token.encode(), supplied.encode()):
+        return jsonify({'error': 'Admin token required'}), 403
+
+@admin_bp.route('/profiles', methods=['GET'])
+def get_profiles():
+    """
+    List the captured request profiles, newest first
+    """
+    return jsonify(list_captures(profile_dir())), 200
+
+@admin_bp.route('/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    """
+    Download one captured profile (a pstats file)
+    """
+    if not name.endswith(PROFILE_SUFFIX):
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    return send_from_directory(profile_dir(), name, as_attachment=True,
+                               mimetype='application/octet-stream')
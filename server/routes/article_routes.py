@@ -1,10 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from services.database_handler import DatabaseHandler
-from services.feed_service import get_personalized_feed
+from services.feed_service import (
+    FEED_TYPES, get_personalized_feed, get_personalized_feeds, log_impressions, log_feed_impressions
+)
+from services.article_fragment_cache import ArticleFragmentCache
+from timing import span
 import logging
 
 article_bp = Blueprint('article', __name__, url_prefix='/api/articles')
 
+def articles_response(articles):
+    """
+    Build a JSON response from article rows using the pre-encoded fragments
+    
+    Args:
+        articles (list): Article dictionaries
+        
+    Returns:
+        Response: JSON array response
+    """
+    with span('serialize'):
+        body = ArticleFragmentCache.encode_articles(articles)
+    
+    return current_app.response_class(body, mimetype='application/json')
+
 @article_bp.route('', methods=['GET'])
 def get_articles():
     """
@@ -19,7 +38,7 @@ def get_articles():
     email = request.args.get('email')
     flag = request.args.get('flag', 'standard')
     categories = request.args.getlist('categories')
-    limit = request.args.get('limit', 10)
+    limit = request.args.get('limit', default=10, type=int)
     
     if not email:
         return jsonify({'error': 'Email is required'}), 400
@@ -29,20 +48,68 @@ def get_articles():
         return jsonify({'error': 'User not found'}), 404
     
     # Then get personalized feed based on flag
-    sorted_articles = get_personalized_feed(email, flag, categories if categories else None)
+    try:
+        sorted_articles = get_personalized_feed(email, flag, categories if categories else None, limit)
+    except TimeoutError as e:
+        logging.warning(f"Feed reads timed out for {flag} feed: {e}")
+        return jsonify({'error': 'Timed out loading the feed'}), 504
     # Log the number of articles being processed
     logging.info(f"Processing {len(sorted_articles)} articles for storage in feed")
 
     # print(sorted_articles)
     sorted_articles = sorted_articles[:limit]
     # Store all articles in feed first (without duplicates)
-    for article in sorted_articles:
-        result = DatabaseHandler.insert_feed_without_duplicate(email, flag, article['id'])
-        logging.info(f"Inserted article {article['id']} into feed: {result}")
+    log_impressions(email, flag, sorted_articles)
 
     
-    return jsonify(sorted_articles), 200
+    return articles_response(sorted_articles), 200
+
 
+@article_bp.route('/feeds', methods=['GET'])
+def get_feeds():
+    """
+    Get the comfort, balanced and challenge feeds together, ranked from one
+    article pool and one political profile
+    
+    Query parameters:
+    - email: User email (required)
+    - categories: List of categories to filter by (optional)
+    - limit: Articles per feed (optional, default 10)
+    - comfort_limit, balanced_limit, challenge_limit: Articles in that feed
+      (optional, default limit)
+    
+    Returns:
+        JSON object: Feed type -> articles, as /api/articles?flag=<type> returns them
+    """
+    email = request.args.get('email')
+    categories = request.args.getlist('categories')
+    limit = request.args.get('limit', default=10, type=int)
+    limits = {flag: request.args.get(f'{flag}_limit', default=limit, type=int) for flag in FEED_TYPES}
+    
+    if not email:
+        return jsonify({'error': 'Email is required'}), 400
+    
+    # Check if user exists
+    if not DatabaseHandler.email_exists(email):
+        return jsonify({'error': 'User not found'}), 404
+    
+    try:
+        feeds = get_personalized_feeds(email, limits, categories if categories else None)
+    except TimeoutError as e:
+        logging.warning(f"Feed reads timed out for the feeds page: {e}")
+        return jsonify({'error': 'Timed out loading the feed'}), 504
+    feeds = {flag: articles[:limits[flag]] for flag, articles in feeds.items()}
+    
+    # Store the three feeds' articles in one batch
+    log_feed_impressions(email, feeds)
+    
+    with span('serialize'):
+        body = b'{' + b','.join(
+            b'"' + flag.encode() + b'":' + ArticleFragmentCache.encode_articles(articles)
+            for flag, articles in feeds.items()
+        ) + b'}'
+    
+    return current_app.response_class(body, mimetype='application/json'), 200
 
 @article_bp.route('/refresh', methods=['POST'])
 def refresh_articles():
@@ -86,6 +153,10 @@ def get_labeled_articles():
         return jsonify({'error': 'User not found'}), 404
     
     # Get labeled articles
-    articles = get_labeled_articles(email, limit, categories if categories else None)
+    try:
+        articles = get_labeled_articles(email, limit, categories if categories else None)
+    except TimeoutError as e:
+        logging.warning(f"Labeled feed reads timed out: {e}")
+        return jsonify({'error': 'Timed out loading the feed'}), 504
     
-    return jsonify(articles), 200
\ No newline at end of file
+    return articles_response(articles), 200
\ No newline at end of file
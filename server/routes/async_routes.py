@@ -0,0 +1,126 @@
+"""
+Async versions of the feed read routes (see async_app.py)
+
+Paths, parameters and responses match the Flask routes of the same names
+in article_routes.py, feed_routes.py and health_routes.py.
+"""
+import logging
+from async_app import AsyncResponse, json_response
+from services.article_fragment_cache import ArticleFragmentCache
+from services.async_database_handler import AsyncDatabaseHandler
+from services.async_feed_service import (
+    ImpressionWriter, get_labeled_articles, get_personalized_feed, get_political_profile
+)
+from services.source_bias_service import SourceBiasService
+import async_db
+
+def articles_response(articles):
+    """
+    Build a JSON response from article rows using the pre-encoded fragments
+    """
+    return AsyncResponse(ArticleFragmentCache.encode_articles(articles))
+
+async def get_articles(request):
+    """
+    Get articles from today, optionally filtered by categories
+    and personalized based on the feed type flag
+
+    The user is checked before the feed reads, so an unknown email costs
+    one query; impressions are written in the background after the response.
+    """
+    email = request.args.get('email')
+    flag = request.args.get('flag', 'standard')
+    categories = request.args.getlist('categories')
+    limit = request.args.get('limit', default=10, type=int)
+
+    if not email:
+        return json_response({'error': 'Email is required'}, 400)
+
+    if not await AsyncDatabaseHandler.email_exists(email):
+        return json_response({'error': 'User not found'}, 404)
+
+    sorted_articles = await get_personalized_feed(email, flag, categories if categories else None, limit)
+    sorted_articles = sorted_articles[:limit]
+    ImpressionWriter.submit(email, flag, [article['id'] for article in sorted_articles])
+
+    return articles_response(sorted_articles)
+
+async def get_labeled(request):
+    """
+    Get articles from today with comfort/balanced/challenge labels
+    """
+    email = request.args.get('email')
+    limit = request.args.get('limit', default=20, type=int)
+    categories = request.args.getlist('categories')
+
+    if not email:
+        return json_response({'error': 'Email is required'}, 400)
+
+    if not await AsyncDatabaseHandler.email_exists(email):
+        return json_response({'error': 'User not found'}, 404)
+
+    articles = await get_labeled_articles(email, limit, categories if categories else None)
+
+    ImpressionWriter.submit(email, "all", [article['id'] for article in articles])
+
+    return articles_response(articles)
+
+async def political_profile(request):
+    """
+    Get a user's political profile based on their liked articles and survey responses
+    """
+    email = request.args.get('email')
+
+    if not email:
+        return json_response({'error': 'Email is required'}, 400)
+
+    if not await AsyncDatabaseHandler.email_exists(email):
+        return json_response({'error': 'User not found'}, 404)
+
+    profile = await get_political_profile(email)
+
+    if not profile:
+        return json_response({'message': 'Not enough data to determine political profile'})
+
+    return json_response(profile)
+
+async def liveness(request):
+    """
+    Liveness probe: the worker is up and serving requests
+    """
+    return json_response({'status': 'ok'})
+
+async def readiness(request):
+    """
+    Readiness probe: the source bias data is loaded and the async pool is
+    open and answering queries
+    """
+    checks = {
+        'source_bias': SourceBiasService.is_warm(),
+        'db_pool': async_db.async_pool_ready(),
+        'db': False
+    }
+
+    try:
+        await async_db.fetchone("SELECT 1")
+        checks['db'] = True
+    except Exception as e:
+        logging.warning(f"Readiness check could not reach the database: {e}")
+
+    if all(checks.values()):
+        return json_response({'status': 'ready', 'checks': checks})
+
+    return json_response({'status': 'warming', 'checks': checks}, 503)
+
+def init_app(app):
+    """
+    Register the async routes, labeled with the Flask endpoint names
+
+    Args:
+        app (AsyncApp): The app
+    """
+    app.route('/api/articles', 'article.get_articles')(get_articles)
+    app.route('/api/articles/labeled', 'article.get_labeled_articles')(get_labeled)
+    app.route('/api/feed/political-profile', 'feed.get_political_profile')(political_profile)
+    app.route('/api/health/live', 'health.liveness')(liveness)
+    app.route('/api/health/ready', 'health.readiness')(readiness)
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from services.database_handler import DatabaseHandler
 from services.source_bias_service import SourceBiasService
+from storage import UPDATED
+from timing import span
 
 feed_bp = Blueprint('feed', __name__, url_prefix='/api/feed')
 
@@ -29,10 +31,10 @@ def update_likes():
     
     result = DatabaseHandler.update_likes(email, article_id, flag, value)
     
-    if result:
+    if result == UPDATED:
         return jsonify({'message': 'Likes updated successfully'}), 200
     else:
-        return jsonify({'error': 'Failed to update likes'}), 500
+        return jsonify({'error': 'Feed item not found'}), 404
 
 @feed_bp.route('/political-profile', methods=['GET'])
 def get_political_profile():
@@ -52,15 +54,20 @@ def get_political_profile():
         return jsonify({'error': 'User not found'}), 404
     
     # Get survey responses
-    survey_responses = DatabaseHandler.get_survey_responses(email)
+    with span('db'):
+        survey_responses = DatabaseHandler.get_survey_responses(email)
     
     # Get combined political profile
-    profile = SourceBiasService.get_combined_political_profile(email, survey_responses)
+    with span('profile'):
+        profile = SourceBiasService.get_combined_political_profile(email, survey_responses)
     
     if not profile:
         return jsonify({'message': 'Not enough data to determine political profile'}), 200
     
-    return jsonify(profile), 200
+    with span('serialize'):
+        response = jsonify(profile)
+    
+    return response, 200
 
 @feed_bp.route('/source-matching', methods=['GET'])
 def test_source_matching():
@@ -81,18 +88,22 @@ def test_source_matching():
     matches = SourceBiasService.find_closest_source_matches(source, n)
     
     # Get direct bias info
-    bias, confidence = SourceBiasService.get_source_bias(source)
+    bias, confidence = SourceBiasService.resolve_many([source])[source]
+    
+    # One normalization per distinct name
+    normalized = {name: SourceBiasService._normalize_source_name(name)
+                  for name in dict.fromkeys([source] + [match[0] for match in matches])}
     
     result = {
         'source': source,
-        'normalized': SourceBiasService._normalize_source_name(source),
+        'normalized': normalized[source],
         'bias': bias,
         'confidence': confidence,
         'matches': [
             {
                 'source': match[0],
                 'similarity': match[1],
-                'normalized': SourceBiasService._normalize_source_name(match[0])
+                'normalized': normalized[match[0]]
             }
             for match in matches
         ]
@@ -0,0 +1,42 @@
+from flask import Blueprint, jsonify
+from db import get_db_connection, db_pool_ready
+from services.source_bias_service import SourceBiasService
+import logging
+
+health_bp = Blueprint('health', __name__, url_prefix='/api/health')
+
+@health_bp.route('/live', methods=['GET'])
+def liveness():
+    """
+    Liveness probe: the worker is up and serving requests
+    """
+    return jsonify({'status': 'ok'}), 200
+
+@health_bp.route('/ready', methods=['GET'])
+def readiness():
+    """
+    Readiness probe: only reports ready once this worker is warm,
+    i.e. the source bias data is loaded and the database pool is open
+    and answering queries
+    """
+    checks = {
+        'source_bias': SourceBiasService.is_warm(),
+        'db_pool': db_pool_ready(),
+        'db': False
+    }
+    
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+        checks['db'] = True
+        checks['db_pool'] = db_pool_ready()
+    except Exception as e:
+        logging.warning(f"Readiness check could not reach the database: {e}")
+    
+    if all(checks.values()):
+        return jsonify({'status': 'ready', 'checks': checks}), 200
+    
+    return jsonify({'status': 'warming', 'checks': checks}), 503
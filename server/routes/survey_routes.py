@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from services.database_handler import DatabaseHandler
+from storage import INSERTED, UPDATED, NO_USER
 
 survey_bp = Blueprint('survey', __name__, url_prefix='/api/survey')
 
@@ -65,14 +66,13 @@ def add_survey_responses():
     q4 = data['q4']
     q5 = data['q5']
     
-    # Check if user exists
-    if not DatabaseHandler.email_exists(email):
-        return jsonify({'error': 'User not found'}), 404
-    
+    # One statement: the foreign key tells us when the user does not exist
     result = DatabaseHandler.insert_survey_responses(email, q1, q2, q3, q4, q5)
     
-    if result:
+    if result == INSERTED:
         return jsonify({'message': 'Survey responses added successfully'}), 201
+    elif result == NO_USER:
+        return jsonify({'error': 'User not found'}), 404
     else:
         return jsonify({'error': 'Survey responses already exist for this user'}), 409
 
@@ -103,13 +103,11 @@ def update_survey_responses():
     q4 = data['q4']
     q5 = data['q5']
     
-    # Check if user exists
-    if not DatabaseHandler.email_exists(email):
-        return jsonify({'error': 'User not found'}), 404
-    
     result = DatabaseHandler.update_survey_responses(email, q1, q2, q3, q4, q5)
     
-    if result:
+    if result == UPDATED:
         return jsonify({'message': 'Survey responses updated successfully'}), 200
+    elif result == NO_USER:
+        return jsonify({'error': 'User not found'}), 404
     else:
         return jsonify({'error': 'No survey responses found for this user'}), 404
\ No newline at end of file
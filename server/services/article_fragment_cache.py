@@ -0,0 +1,136 @@
+import threading
+import logging
+from collections import OrderedDict
+from config import ARTICLE_FRAGMENT_CACHE_SIZE
+from json_provider import dumps_bytes
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ArticleFragmentCache:
+    """
+    Bounded LRU of pre-encoded article JSON
+    
+    Article rows are immutable once ingested, so each one is encoded once
+    and the bytes are spliced into every feed response that contains it.
+    Entries are keyed by article id and row version (the `row_version`
+    column selected by DatabaseHandler), so a row updated by another
+    worker is re-encoded rather than served stale.
+    """
+    
+    # Column carrying the row version; never sent to clients
+    VERSION_FIELD = 'row_version'
+    
+    # Per-user fields added after the fragment is built
+    PER_USER_FIELDS = ('type', 'flag')
+    
+    _fragments = OrderedDict()
+    _lock = threading.Lock()
+    _max_entries = ARTICLE_FRAGMENT_CACHE_SIZE
+    
+    @staticmethod
+    def _encode_shared(article):
+        """
+        Encode the fields of an article shared by every user
+        
+        Args:
+            article (dict): Article row
+            
+        Returns:
+            bytes: JSON object without version or per-user fields
+        """
+        skip = (ArticleFragmentCache.VERSION_FIELD,) + ArticleFragmentCache.PER_USER_FIELDS
+        return dumps_bytes({key: value for key, value in article.items() if key not in skip})
+    
+    @staticmethod
+    def get_fragment(article):
+        """
+        Get the encoded shared fields of an article, encoding it on a miss
+        
+        Args:
+            article (dict): Article row
+            
+        Returns:
+            bytes: JSON object without version or per-user fields
+        """
+        article_id = article.get('id')
+        version = article.get(ArticleFragmentCache.VERSION_FIELD)
+        
+        # Rows without a version cannot be safely cached
+        if article_id is None or version is None:
+            return ArticleFragmentCache._encode_shared(article)
+        
+        cache = ArticleFragmentCache._fragments
+        with ArticleFragmentCache._lock:
+            entry = cache.get(article_id)
+            if entry is not None and entry[0] == version:
+                cache.move_to_end(article_id)
+                return entry[1]
+        
+        fragment = ArticleFragmentCache._encode_shared(article)
+        
+        with ArticleFragmentCache._lock:
+            cache[article_id] = (version, fragment)
+            cache.move_to_end(article_id)
+            while len(cache) > ArticleFragmentCache._max_entries:
+                cache.popitem(last=False)
+        
+        return fragment
+    
+    @staticmethod
+    def encode_article(article):
+        """
+        Encode one article, splicing its per-user fields into the cached fragment
+        
+        Args:
+            article (dict): Article row, possibly with 'type' or 'flag'
+            
+        Returns:
+            bytes: JSON object
+        """
+        fragment = ArticleFragmentCache.get_fragment(article)
+        
+        extras = [
+            dumps_bytes(key) + b':' + dumps_bytes(article[key])
+            for key in ArticleFragmentCache.PER_USER_FIELDS
+            if key in article
+        ]
+        if not extras:
+            return fragment
+        
+        separator = b'' if fragment == b'{}' else b','
+        return fragment[:-1] + separator + b','.join(extras) + b'}'
+    
+    @staticmethod
+    def encode_articles(articles):
+        """
+        Encode a list of articles as a JSON array
+        
+        Args:
+            articles (list): Article rows
+            
+        Returns:
+            bytes: JSON array
+        """
+        return b'[' + b','.join(ArticleFragmentCache.encode_article(article) for article in articles) + b']'
+    
+    @staticmethod
+    def invalidate(article_ids):
+        """
+        Drop the cached fragments of the given articles
+        
+        Args:
+            article_ids (iterable): Article IDs
+        """
+        with ArticleFragmentCache._lock:
+            for article_id in article_ids:
+                ArticleFragmentCache._fragments.pop(article_id, None)
+    
+    @staticmethod
+    def clear():
+        """
+        Drop every cached fragment
+        """
+        with ArticleFragmentCache._lock:
+            ArticleFragmentCache._fragments.clear()
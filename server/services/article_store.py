@@ -0,0 +1,530 @@
+import heapq
+import logging
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from config import (
+    ARTICLE_STORE_TTL, DB_HOST, DB_PORT, DB_NAME,
+    SHARED_CACHE_ENABLED, SHARED_CACHE_CHECK_INTERVAL
+)
+from metrics import (
+    ARTICLE_STORE_ARTICLES, ARTICLE_STORE_BYTES_PER_ARTICLE,
+    ARTICLE_STORE_SCANNED, ARTICLE_STORE_SCAN_SECONDS
+)
+from services.database_handler import DatabaseHandler
+from services.source_bias_service import SourceBiasService
+from shared_snapshot import SharedSnapshot, available as shared_snapshots_available, snapshot_path
+from storage import get_backend
+
+logger = logging.getLogger(__name__)
+
+# Length of the metadata that starts a serialized store
+_META_LENGTH = struct.Struct('<Q')
+
+def _aligned(offset):
+    # Every column starts on an 8-byte boundary
+    return (offset + 7) & ~7
+
+# Serialized values: a type tag, then the value's fields (see _encode_values)
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _DATE, _DATETIME, _DATETIME_TZ = range(9)
+_CONSTANTS = {_NONE: None, _FALSE: False, _TRUE: True}
+_TAG = struct.Struct('<B')
+_STR_LENGTH = struct.Struct('<BI')
+
+@lru_cache(maxsize=None)
+def _timezone(seconds):
+    return timezone(timedelta(seconds=seconds))
+
+# Tag -> (fields, value built from the unpacked fields)
+_FIXED = {
+    _INT: (struct.Struct('<Bq'), lambda fields: fields[0]),
+    _FLOAT: (struct.Struct('<Bd'), lambda fields: fields[0]),
+    _DATE: (struct.Struct('<BHBB'), lambda fields: date(*fields)),
+    _DATETIME: (struct.Struct('<BHBBBBBI'), lambda fields: datetime(*fields)),
+    _DATETIME_TZ: (struct.Struct('<BHBBBBBIi'),
+                   lambda fields: datetime(*fields[:7], tzinfo=_timezone(fields[7])))
+}
+
+def _encode_values(values):
+    """
+    Serialize a sequence of article values (None, bool, int, float, str,
+    date or datetime), for _decode_values
+
+    Returns:
+        bytes: The serialized values
+    """
+    parts = []
+    for value in values:
+        if value is None or value is True or value is False:
+            parts.append(_TAG.pack(_NONE if value is None else _TRUE if value else _FALSE))
+        elif isinstance(value, str):
+            encoded = value.encode('utf-8')
+            parts += [_STR_LENGTH.pack(_STR, len(encoded)), encoded]
+        elif isinstance(value, int):
+            parts.append(_FIXED[_INT][0].pack(_INT, value))
+        elif isinstance(value, float):
+            parts.append(_FIXED[_FLOAT][0].pack(_FLOAT, value))
+        elif isinstance(value, datetime):
+            fields = (value.year, value.month, value.day, value.hour, value.minute, value.second, value.microsecond)
+            offset = value.utcoffset()
+            if offset is None:
+                parts.append(_FIXED[_DATETIME][0].pack(_DATETIME, *fields))
+            else:
+                parts.append(_FIXED[_DATETIME_TZ][0].pack(_DATETIME_TZ, *fields, int(offset.total_seconds())))
+        elif isinstance(value, date):
+            parts.append(_FIXED[_DATE][0].pack(_DATE, value.year, value.month, value.day))
+        else:
+            raise TypeError(f"Cannot serialize a {type(value).__name__} article value")
+    return b''.join(parts)
+
+def _decode_values(buffer):
+    """
+    Deserialize values written by _encode_values
+
+    Args:
+        buffer (memoryview): The serialized values
+
+    Returns:
+        tuple: The values
+    """
+    values = []
+    offset, end = 0, len(buffer)
+    while offset < end:
+        tag = buffer[offset]
+        if tag == _STR:
+            (_, length) = _STR_LENGTH.unpack_from(buffer, offset)
+            offset += _STR_LENGTH.size
+            values.append(str(buffer[offset:offset + length], 'utf-8'))
+            offset += length
+        elif tag in _CONSTANTS:
+            values.append(_CONSTANTS[tag])
+            offset += 1
+        else:
+            layout, build = _FIXED[tag]
+            values.append(build(layout.unpack_from(buffer, offset)[1:]))
+            offset += layout.size
+    return tuple(values)
+
+class ArticleStore:
+    """
+    Column-oriented pool of articles for feed ranking
+
+    Ranking reads a few numbers per article, so these are kept in typed
+    arrays indexed by the article's position in the pool:
+
+    - stance: numeric stance of the article's source (BIAS_VALUES)
+    - confidence: confidence of that bias, 0 when the source is unknown
+    - date_added: seconds since the epoch
+    - category: code of the article's category in `categories` (0 = none)
+
+    `ids` and `index` map positions to article ids and back. The display
+    fields (headline, abstract, URLs...) stay in one list per column, and
+    article dicts are only built by rows() for the articles returned.
+    """
+
+    def __init__(self, articles, resolve=SourceBiasService.resolve_many):
+        """
+        Args:
+            articles (list): Article dictionaries, all with the same fields
+            resolve (callable): Source names -> dict of source name ->
+                                (bias, confidence); called once per store
+        """
+        self.fields = tuple(articles[0]) if articles else ('id',)
+        self._columns = {field: [article[field] for article in articles] for field in self.fields}
+        self.ids = self._columns['id']
+        self.index = {article_id: position for position, article_id in enumerate(self.ids)}
+
+        self.stance = array('b')
+        self.confidence = array('d')
+        self.date_added = array('d')
+        self.category = array('H')
+        self.categories = {None: 0}
+
+        biases = {}
+        for source, (bias, confidence) in resolve(article.get('source', '') for article in articles).items():
+            if bias:
+                biases[source] = (SourceBiasService.BIAS_VALUES.get(bias, 0), confidence or 0.0)
+            else:
+                biases[source] = (0, 0.0)
+
+        for article in articles:
+            stance, confidence = biases[article.get('source', '')]
+            self.stance.append(stance)
+            self.confidence.append(confidence)
+
+            added = article.get('date_added')
+            self.date_added.append(added.timestamp() if added is not None else 0.0)
+
+            category = article.get('category')
+            code = self.categories.get(category)
+            if code is None:
+                code = self.categories[category] = len(self.categories)
+            self.category.append(code)
+
+    def __len__(self):
+        return len(self.stance)
+
+    def select(self, categories=None):
+        """
+        Positions of the articles in any of the given categories
+
+        Args:
+            categories (list, optional): Categories to keep; all articles when empty
+
+        Returns:
+            list: Positions, in pool order
+        """
+        if not categories:
+            return list(range(len(self)))
+
+        wanted = bytearray(len(self.categories))
+        for category in categories:
+            code = self.categories.get(category)
+            if code:
+                wanted[code] = 1
+        category = self.category
+        return [position for position in range(len(category)) if wanted[category[position]]]
+
+    def scan(self, positions, table, default, min_confidence):
+        """
+        Map each article's source stance through a per-stance table
+
+        Args:
+            positions (list): Articles to scan
+            table (dict): Stance -> value
+            default: Value for articles whose source bias is unknown or
+                     below min_confidence
+            min_confidence (float): Smallest confidence that uses the table
+
+        Returns:
+            list: One value per position
+        """
+        start = time.perf_counter()
+        stance, confidence = self.stance, self.confidence
+        values = [
+            table[stance[position]] if confidence[position] >= min_confidence else default
+            for position in positions
+        ]
+        ARTICLE_STORE_SCANNED.inc(len(positions))
+        ARTICLE_STORE_SCAN_SECONDS.inc(time.perf_counter() - start)
+        return values
+
+    @staticmethod
+    def top(positions, values, k=None):
+        """
+        Positions ordered by value, highest first, ties in pool order
+
+        Args:
+            positions (list): Articles
+            values (list): One sort value per position
+            k (int, optional): Only the first k; all when None
+
+        Returns:
+            list: Positions
+        """
+        order = range(len(positions))
+        if k is None:
+            order = sorted(order, key=values.__getitem__, reverse=True)
+        else:
+            order = heapq.nlargest(k, order, key=values.__getitem__)
+        return [positions[i] for i in order]
+
+    def most_recent(self, positions, k):
+        """
+        The k most recently added articles, newest first
+
+        Args:
+            positions (list): Articles
+            k (int): Number of articles
+
+        Returns:
+            list: Positions
+        """
+        date_added = self.date_added
+        return ArticleStore.top(positions, [date_added[position] for position in positions], k)
+
+    def rows(self, positions):
+        """
+        Build the article dictionaries of some articles
+
+        Args:
+            positions (list): Articles
+
+        Returns:
+            list: Article dictionaries, as they were given to the store
+        """
+        columns = [(field, self._columns[field]) for field in self.fields]
+        return [{field: column[position] for field, column in columns} for position in positions]
+
+    def memory_usage(self):
+        """
+        Memory held by the store
+
+        Returns:
+            dict: Bytes held by the ranking columns (arrays and id index)
+                  and by the display columns (lists and the values they
+                  hold, shared values counted once), and per article
+        """
+        ranking = sys.getsizeof(self.index) + sum(
+            column.itemsize * len(column)
+            for column in (self.stance, self.confidence, self.date_added, self.category)
+        )
+
+        seen = set()
+        display = 0
+        for column in self._columns.values():
+            display += sys.getsizeof(column)
+            for value in column:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    display += sys.getsizeof(value)
+
+        count = max(len(self.ids), 1)
+        return {
+            'articles': len(self.ids),
+            'ranking_bytes': ranking,
+            'display_bytes': display,
+            'ranking_bytes_per_article': ranking / count,
+            'display_bytes_per_article': display / count
+        }
+
+    def to_bytes(self, day):
+        """
+        Serialize the store, to be mapped by SharedArticleStore
+        
+        Layout: metadata length, metadata (article count, day, length of
+        the ids, fields, categories in code order), then the confidence,
+        date_added, row offset, category and stance columns as raw arrays,
+        each 8-byte aligned, the ids, and the display values of each
+        article. Values are written by _encode_values.
+        
+        Args:
+            day (date): Day of the articles
+            
+        Returns:
+            bytes: The serialized store
+        """
+        rows = [
+            _encode_values(values)
+            for values in zip(*(self._columns[field] for field in self.fields))
+        ] if len(self) else []
+        offsets = array('Q', [0])
+        for row in rows:
+            offsets.append(offsets[-1] + len(row))
+        ids = _encode_values(self.ids)
+        
+        meta = _encode_values((len(self), day, len(ids), len(self.fields), *self.fields, *self.categories))
+        
+        parts = [_META_LENGTH.pack(len(meta)), meta]
+        size = _META_LENGTH.size + len(meta)
+        for column in (self.confidence, self.date_added, offsets, self.category, self.stance):
+            padding = _aligned(size) - size
+            data = column.tobytes()
+            parts += [b'\0' * padding, data]
+            size += padding + len(data)
+        parts += [b'\0' * (_aligned(size) - size), ids] + rows
+        return b''.join(parts)
+
+class SharedArticleStore(ArticleStore):
+    """
+    ArticleStore read in place from a buffer written by ArticleStore.to_bytes
+    
+    The ranking columns are views of the buffer, so attaching only decodes
+    the metadata whatever the number of articles; rows() decodes only the
+    articles it returns, and the id index is built on first use.
+    """
+    
+    def __init__(self, payload):
+        """
+        Args:
+            payload (memoryview): Serialized store, e.g. a read-only mapping
+        """
+        (length,) = _META_LENGTH.unpack_from(payload)
+        meta = _decode_values(payload[_META_LENGTH.size:_META_LENGTH.size + length])
+        count, self.day, ids_length, field_count = meta[:4]
+        self.fields = meta[4:4 + field_count]
+        self.categories = {category: code for code, category in enumerate(meta[4 + field_count:])}
+        
+        offset = _META_LENGTH.size + length
+        columns = []
+        for typecode, items in (('d', count), ('d', count), ('Q', count + 1), ('H', count), ('b', count)):
+            offset = _aligned(offset)
+            size = array(typecode).itemsize * items
+            columns.append(payload[offset:offset + size].cast(typecode))
+            offset += size
+        self.confidence, self.date_added, self._offsets, self.category, self.stance = columns
+        offset = _aligned(offset)
+        self._encoded_ids = payload[offset:offset + ids_length]
+        self._rows = payload[offset + ids_length:]
+        self._size = len(payload)
+        self._ids = None
+        self._index = None
+    
+    def _row(self, position):
+        return _decode_values(self._rows[self._offsets[position]:self._offsets[position + 1]])
+    
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = list(_decode_values(self._encoded_ids))
+        return self._ids
+    
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {article_id: position for position, article_id in enumerate(self.ids)}
+        return self._index
+    
+    def rows(self, positions):
+        fields = self.fields
+        return [dict(zip(fields, self._row(position))) for position in positions]
+    
+    def memory_usage(self):
+        """
+        Memory mapped by the store, shared by the workers of the node
+        
+        Returns:
+            dict: Same keys as ArticleStore.memory_usage; the display bytes
+                  are the serialized ids and rows
+        """
+        display = len(self._encoded_ids) + len(self._rows)
+        ranking = self._size - display
+        count = max(len(self), 1)
+        return {
+            'articles': len(self),
+            'ranking_bytes': ranking,
+            'display_bytes': display,
+            'ranking_bytes_per_article': ranking / count,
+            'display_bytes_per_article': display / count
+        }
+
+class ArticlePool:
+    """
+    ArticleStore of today's articles, shared by the workers of the node
+    
+    Built from DatabaseHandler.get_today_articles and reused for
+    ARTICLE_STORE_TTL seconds; after that one thread rebuilds it while the
+    others keep using the previous store. A new day, or articles ingested
+    by this worker, make the next request rebuild it. Sources are resolved
+    by SourceBiasService.resolve_many, which caches the ones that are not
+    in the bias table.
+    
+    With SHARED_CACHE_ENABLED the store is published as a snapshot (see
+    shared_snapshot.py): one worker of the node builds it, and the others
+    map it as a SharedArticleStore instead of building their own.
+    """
+    
+    _store = None
+    _day = None
+    _built_at = 0.0
+    _invalidated_at = 0.0
+    _lock = threading.Lock()
+    _snapshots = {}
+    _sharing_failed = False
+    
+    @staticmethod
+    def _usable(today):
+        return ArticlePool._store is not None and ArticlePool._day == today
+    
+    @staticmethod
+    def _shared_snapshot():
+        """
+        Snapshot of the store for the configured backend, or None when the
+        store is not shared
+        """
+        if not SHARED_CACHE_ENABLED or not shared_snapshots_available() or ArticlePool._sharing_failed:
+            return None
+        
+        backend = get_backend()
+        if backend.name == 'postgres':
+            key = f"postgres:{DB_HOST}:{DB_PORT}/{DB_NAME}"
+        else:
+            key = f"{backend.name}:{getattr(backend, 'path', '')}"
+        
+        snapshot = ArticlePool._snapshots.get(key)
+        if snapshot is None:
+            snapshot = ArticlePool._snapshots.setdefault(key, SharedSnapshot(
+                snapshot_path('articles', key), SharedArticleStore, check_interval=SHARED_CACHE_CHECK_INTERVAL
+            ))
+        return snapshot
+    
+    @staticmethod
+    def get():
+        """
+        Get the store of today's articles, building it when needed
+        
+        Returns:
+            ArticleStore: Today's articles
+        """
+        today = date.today()
+        snapshot = ArticlePool._shared_snapshot()
+        if snapshot is not None:
+            try:
+                return ArticlePool._get_shared(snapshot, today)
+            except OSError as e:
+                # This worker keeps its own store from now on
+                logger.warning(f"Could not share the article pool with the other workers: {e}")
+                ArticlePool._sharing_failed = True
+        
+        usable = ArticlePool._usable(today)
+        if usable and time.monotonic() - ArticlePool._built_at < ARTICLE_STORE_TTL:
+            return ArticlePool._store
+        
+        # Without a store for today every thread waits for the build
+        if not ArticlePool._lock.acquire(blocking=not usable):
+            return ArticlePool._store
+        try:
+            if not ArticlePool._usable(today) or time.monotonic() - ArticlePool._built_at >= ARTICLE_STORE_TTL:
+                ArticlePool._install(ArticlePool._build(), today)
+            return ArticlePool._store
+        finally:
+            ArticlePool._lock.release()
+    
+    @staticmethod
+    def _get_shared(snapshot, today):
+        def fresh(store, published_at):
+            return (store is not None and store.day == today
+                    and published_at > ArticlePool._invalidated_at
+                    and time.time() - published_at < ARTICLE_STORE_TTL)
+        
+        store, published_at = snapshot.get()
+        if not fresh(store, published_at):
+            usable = store is not None and store.day == today
+            # One worker of the node builds; without a store for today the
+            # others wait for it
+            with snapshot.build_lock(blocking=not usable) as locked:
+                if locked:
+                    snapshot.refresh()
+                    store, published_at = snapshot.get()
+                    if not fresh(store, published_at):
+                        snapshot.publish(ArticlePool._build().to_bytes(today))
+                        store, _ = snapshot.get()
+        
+        if store is not ArticlePool._store:
+            ArticlePool._install(store, today)
+        return store
+    
+    @staticmethod
+    def _build():
+        return ArticleStore(DatabaseHandler.get_today_articles())
+    
+    @staticmethod
+    def _install(store, today):
+        ArticlePool._store, ArticlePool._day, ArticlePool._built_at = store, today, time.monotonic()
+        
+        usage = store.memory_usage()
+        ARTICLE_STORE_ARTICLES.set(usage['articles'])
+        ARTICLE_STORE_BYTES_PER_ARTICLE.set(usage['ranking_bytes_per_article'], part='ranking')
+        ARTICLE_STORE_BYTES_PER_ARTICLE.set(usage['display_bytes_per_article'], part='display')
+    
+    @staticmethod
+    def invalidate():
+        """
+        Rebuild the store on its next use
+        """
+        ArticlePool._built_at = float('-inf')
+        ArticlePool._invalidated_at = time.time()
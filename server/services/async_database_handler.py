@@ -0,0 +1,89 @@
+import async_db
+from storage.postgres import (
+    EMAIL_EXISTS, SURVEY_RESPONSES, LIKED_SOURCES, DISLIKED_SOURCES,
+    INSERT_FEED_BATCH, feed_batch_params
+)
+
+class AsyncDatabaseHandler:
+    """
+    Async versions of the DatabaseHandler reads and writes used by the feed
+    endpoints
+
+    PostgreSQL only: the statements are those of storage/postgres.py, run on
+    the async pool in async_db.py. Articles are not read here: the async
+    routes rank the worker's ArticlePool like the Flask ones.
+    """
+    @staticmethod
+    async def email_exists(email):
+        """
+        Check if an email exists in the userdata table
+
+        Args:
+            email (str): Email to check
+
+        Returns:
+            bool: True if email exists, False otherwise
+        """
+        row = await async_db.fetchone(EMAIL_EXISTS, (email,))
+        return row is not None
+
+    @staticmethod
+    async def get_survey_responses(email):
+        """
+        Get survey responses for a specific email
+
+        Unlike DatabaseHandler.get_survey_responses this does not check that
+        the user exists: the routes check it first.
+
+        Args:
+            email (str): Email to get survey responses for
+
+        Returns:
+            tuple: Survey responses, or None if there are none
+        """
+        return await async_db.fetchone(SURVEY_RESPONSES, (email,))
+
+    @staticmethod
+    async def get_liked_sources_by_email(email):
+        """
+        Get sources liked by a user
+
+        Args:
+            email (str): User email
+
+        Returns:
+            dict: Source name -> count of likes
+        """
+        rows = await async_db.fetchall(LIKED_SOURCES, (email,))
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    async def get_disliked_sources_by_email(email):
+        """
+        Get sources disliked by a user
+
+        Args:
+            email (str): User email
+
+        Returns:
+            dict: Source name -> count of dislikes
+        """
+        rows = await async_db.fetchall(DISLIKED_SOURCES, (email,))
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    async def insert_feed_batch_without_duplicate(email, impressions):
+        """
+        Insert several impressions into the feed in one statement, skipping
+        the ones already there
+
+        Args:
+            email (str): User email
+            impressions (list): (article ID, flag) tuples
+
+        Returns:
+            int: Number of rows inserted
+        """
+        if not impressions:
+            return 0
+        return await async_db.execute(INSERT_FEED_BATCH, feed_batch_params(email, impressions))
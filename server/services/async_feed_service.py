@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from config import ASYNC_IMPRESSION_CONCURRENCY, ASYNC_IMPRESSION_MAX_PENDING
+from metrics import IMPRESSION_WRITES
+from services.async_database_handler import AsyncDatabaseHandler
+from services.article_store import ArticlePool
+from services.feed_service import FEED_TYPES, _label_recent, _profile_from_inputs, _rank_feed
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ImpressionWriter:
+    """
+    Fire-and-forget feed impression writes
+
+    Each request's impressions are written as one batch in a background
+    task, so the response does not wait for them. At most
+    ASYNC_IMPRESSION_CONCURRENCY batches hold a connection at once; beyond
+    ASYNC_IMPRESSION_MAX_PENDING queued batches new ones are dropped (and
+    counted) rather than letting memory grow without bound.
+    """
+    _tasks = set()
+    _slots = None
+
+    @staticmethod
+    def submit(email, flag, article_ids):
+        """
+        Queue the impressions of one response
+
+        Args:
+            email (str): User email
+            flag (str): Feed flag
+            article_ids (list): Article IDs shown to the user
+        """
+        if not article_ids:
+            return
+        if len(ImpressionWriter._tasks) >= ASYNC_IMPRESSION_MAX_PENDING:
+            IMPRESSION_WRITES.inc(result='dropped')
+            logger.warning(f"Dropped {len(article_ids)} impressions: {len(ImpressionWriter._tasks)} batches pending")
+            return
+
+        task = asyncio.get_running_loop().create_task(ImpressionWriter._write(email, flag, list(article_ids)))
+        ImpressionWriter._tasks.add(task)
+        task.add_done_callback(ImpressionWriter._tasks.discard)
+
+    @staticmethod
+    async def _write(email, flag, article_ids):
+        if ImpressionWriter._slots is None:
+            ImpressionWriter._slots = asyncio.Semaphore(ASYNC_IMPRESSION_CONCURRENCY)
+
+        async with ImpressionWriter._slots:
+            try:
+                await AsyncDatabaseHandler.insert_feed_batch_without_duplicate(
+                    email, [(article_id, flag) for article_id in article_ids]
+                )
+            except Exception as e:
+                IMPRESSION_WRITES.inc(result='error')
+                logger.error(f"Error writing impressions for {len(article_ids)} articles: {e}")
+            else:
+                IMPRESSION_WRITES.inc(result='ok')
+
+    @staticmethod
+    def pending():
+        """
+        Number of impression batches queued or being written
+        """
+        return len(ImpressionWriter._tasks)
+
+    @staticmethod
+    async def drain(timeout=10):
+        """
+        Wait for the queued impressions to be written (on shutdown)
+
+        Args:
+            timeout (float): Seconds to wait before giving up
+        """
+        if not ImpressionWriter._tasks:
+            return
+        done, pending = await asyncio.wait(list(ImpressionWriter._tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"{len(pending)} impression batches not written at shutdown")
+
+async def _profile_inputs(email):
+    """
+    Survey responses and liked and disliked sources, read concurrently
+
+    Returns:
+        tuple: (survey_responses, liked_sources, disliked_sources)
+    """
+    return tuple(await asyncio.gather(
+        AsyncDatabaseHandler.get_survey_responses(email),
+        AsyncDatabaseHandler.get_liked_sources_by_email(email),
+        AsyncDatabaseHandler.get_disliked_sources_by_email(email)
+    ))
+
+async def get_political_profile(email):
+    """
+    Get a user's combined political profile from survey responses and likes
+
+    The profile is computed in a worker thread: it resolves the biases of
+    the liked sources, which can wait on the fuzzy matching pool.
+
+    Args:
+        email (str): User email
+
+    Returns:
+        dict: Combined political profile, or None
+    """
+    return await asyncio.to_thread(_profile_from_inputs, *await _profile_inputs(email))
+
+async def get_personalized_feed(email, flag, categories=None, limit=None):
+    """
+    Async version of feed_service.get_personalized_feed
+
+    Today's articles come from the worker's ArticlePool (in a worker
+    thread, as it may rebuild the pool), read concurrently with the survey
+    responses and the liked and disliked sources. They are ranked by the
+    same code as the Flask route, in a worker thread too since ranking
+    resolves source biases.
+
+    Args:
+        email (str): User email
+        flag (str): Feed type - 'comfort', 'balanced', or 'challenge'
+        categories (list, optional): List of categories to filter articles by
+        limit (int, optional): Only return the first `limit` articles
+
+    Returns:
+        list: List of article dictionaries sorted according to the feed type
+    """
+    k = limit if limit is not None and limit >= 0 else None
+
+    if flag not in FEED_TYPES:
+        # Without a valid flag the feed is not personalized
+        store, inputs = await asyncio.to_thread(ArticlePool.get), None
+    else:
+        store, inputs = await asyncio.gather(asyncio.to_thread(ArticlePool.get), _profile_inputs(email))
+
+    return await asyncio.to_thread(_rank_feed, store, flag, categories, inputs, k)
+
+async def get_labeled_articles(email, limit=20, categories=None):
+    """
+    Async version of feed_service.get_labeled_articles
+
+    Reads like get_personalized_feed, and labels with the same code as the
+    Flask route. The caller queues the impressions on the ImpressionWriter.
+
+    Args:
+        email (str): User email
+        limit (int): Maximum number of articles to return
+        categories (list, optional): List of categories to filter by
+
+    Returns:
+        list: List of article dictionaries with added 'type' field
+    """
+    store, inputs = await asyncio.gather(asyncio.to_thread(ArticlePool.get), _profile_inputs(email))
+    return await asyncio.to_thread(_label_recent, store, limit, categories, inputs)
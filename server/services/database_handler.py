@@ -1,11 +1,14 @@
-import psycopg2
-import psycopg2.extras
-from datetime import datetime
-from db import get_db_connection
+from storage import get_backend
+from storage.catalog import get_catalog
+from services.article_fragment_cache import ArticleFragmentCache
 
 class DatabaseHandler:
     """
     Handles all database operations
+    
+    Every operation is delegated to the storage backend selected by
+    STORAGE_BACKEND (see storage/). Article reads are served by the node's
+    local article catalog when it is enabled (see storage/catalog.py).
     """
     @staticmethod
     def email_exists(email):
@@ -18,16 +21,7 @@ class DatabaseHandler:
         Returns:
             bool: True if email exists, False otherwise
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT 1 FROM userdata WHERE email = %s", (email,))
-        result = cursor.fetchone() is not None
-        
-        cursor.close()
-        conn.close()
-        
-        return result
+        return get_backend().email_exists(email)
     
     @staticmethod
     def get_survey_responses(email):
@@ -40,19 +34,7 @@ class DatabaseHandler:
         Returns:
             tuple: Survey responses or False if email doesn't exist
         """
-        if not DatabaseHandler.email_exists(email):
-            return False
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM survey_responses WHERE email = %s", (email,))
-        result = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
-        
-        return result
+        return get_backend().get_survey_responses(email)
     
     @staticmethod
     def insert_articles(articles):
@@ -65,38 +47,22 @@ class DatabaseHandler:
         Returns:
             bool: True if insert was successful
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        result = get_backend().insert_articles(articles)
         
-        for article in articles:
-            cursor.execute(
-                """
-                INSERT INTO articles (id, headline, url, source, abstract, article_date, date_added, image_url)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO UPDATE SET
-                    headline = EXCLUDED.headline,
-                    url = EXCLUDED.url,
-                    source = EXCLUDED.source,
-                    abstract = EXCLUDED.abstract,
-                    article_date = EXCLUDED.article_date
-                """,
-                (
-                    article['id'],
-                    article['headline'],
-                    article['url'],
-                    article['source'],
-                    article['abstract'],
-                    article['article_date'],
-                    datetime.now(),
-                    article['image_url']
-                )
-            )
+        # Updated rows must be re-encoded on their next read
+        ArticleFragmentCache.invalidate(article['id'] for article in articles)
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Imported here: the article pool is built through DatabaseHandler
+        from services.article_store import ArticlePool
+        ArticlePool.invalidate()
         
-        return True
+        # This node serves the new articles right away; the others pick
+        # them up on their next sync
+        catalog = get_catalog()
+        if catalog is not None:
+            catalog.sync(force=True)
+        
+        return result
     
     @staticmethod
     def insert_feed(email, flag, article_id):
@@ -111,22 +77,7 @@ class DatabaseHandler:
         Returns:
             bool: True if insert was successful
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            INSERT INTO feed (email, article_id, flag, access_date, likes)
-            VALUES (%s, %s, %s, %s, 0)
-            """,
-            (email, flag, article_id, datetime.now())
-        )
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return True
+        return get_backend().insert_feed(email, flag, article_id)
     
     @staticmethod
     def update_likes(email, article_id, flag, value):
@@ -140,27 +91,9 @@ class DatabaseHandler:
             value (str): New likes value
             
         Returns:
-            bool: True if update was successful
+            str: UPDATED, or NOT_FOUND if the article is not in the user's feed
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            UPDATE feed
-            SET likes = %s
-            WHERE email = %s
-            AND flag = %s
-            AND article_id = %s
-            """,
-            (value, email, flag, article_id)
-        )
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return True
+        return get_backend().update_likes(email, article_id, flag, value)
     
     @staticmethod
     def add_user(email, password):
@@ -174,29 +107,7 @@ class DatabaseHandler:
         Returns:
             bool: True if user was added, False if email already exists
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(
-                """
-                INSERT INTO userdata (email, password)
-                VALUES (%s, %s)
-                """,
-                (email, password)
-            )
-            
-            conn.commit()
-            result = True
-        except psycopg2.IntegrityError:
-            # Email already exists
-            conn.rollback()
-            result = False
-        
-        cursor.close()
-        conn.close()
-        
-        return result
+        return get_backend().add_user(email, password)
     
     @staticmethod
     def insert_survey_responses(email, q1, q2, q3, q4, q5):
@@ -208,31 +119,9 @@ class DatabaseHandler:
             q1-q5 (bool): Survey responses
             
         Returns:
-            bool: True if insert was successful, False if responses already exist
+            str: INSERTED, UNCHANGED if responses already exist, or NO_USER
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(
-                """
-                INSERT INTO survey_responses (email, q1, q2, q3, q4, q5)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                (email, q1, q2, q3, q4, q5)
-            )
-            
-            conn.commit()
-            result = True
-        except psycopg2.IntegrityError:
-            # Email already exists in survey responses
-            conn.rollback()
-            result = False
-        
-        cursor.close()
-        conn.close()
-        
-        return result
+        return get_backend().insert_survey_responses(email, q1, q2, q3, q4, q5)
     
     @staticmethod
     def update_survey_responses(email, q1, q2, q3, q4, q5):
@@ -244,27 +133,23 @@ class DatabaseHandler:
             q1-q5 (bool): Survey responses
             
         Returns:
-            bool: True if update was successful, False if no responses exist
+            str: UPDATED, NOT_FOUND if no responses exist, or NO_USER
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            UPDATE survey_responses
-            SET q1 = %s, q2 = %s, q3 = %s, q4 = %s, q5 = %s
-            WHERE email = %s
-            """,
-            (q1, q2, q3, q4, q5, email)
-        )
-        
-        rows_updated = cursor.rowcount
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        return get_backend().update_survey_responses(email, q1, q2, q3, q4, q5)
+    
+    @staticmethod
+    def upsert_survey_responses(email, q1, q2, q3, q4, q5):
+        """
+        Insert or replace survey responses for a user, in one statement
         
-        return rows_updated > 0
+        Args:
+            email (str): User email
+            q1-q5 (bool): Survey responses
+            
+        Returns:
+            str: INSERTED, UPDATED, or NO_USER
+        """
+        return get_backend().upsert_survey_responses(email, q1, q2, q3, q4, q5)
     
     @staticmethod
     def get_today_articles(categories=None):
@@ -275,35 +160,16 @@ class DatabaseHandler:
             categories (list, optional): List of categories to filter by
             
         Returns:
-            list: List of article dictionaries
-        """
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        today = datetime.now().date()
-        
-        if categories:
-            # Assuming articles table has a 'category' column
-            placeholders = ', '.join(['%s'] * len(categories))
-            query = f"""
-                SELECT * FROM articles 
-                WHERE DATE(date_added) = %s 
-                AND category IN ({placeholders})
-            """
-            params = [today] + categories
-        else:
-            query = "SELECT * FROM articles WHERE DATE(date_added) = %s"
-            params = [today]
-            
-        cursor.execute(query, params)
-        result = [dict(row) for row in cursor.fetchall()]
-        
-        cursor.close()
-        conn.close()
-        
-        return result
-# Add these new functions to the DatabaseHandler class
-
+            list: List of article dictionaries, including the row_version
+                  used by ArticleFragmentCache
+        """
+        catalog = get_catalog()
+        if catalog is not None:
+            articles = catalog.get_today_articles(categories)
+            if articles is not None:
+                return articles
+        return get_backend().get_today_articles(categories)
+    
     @staticmethod
     def get_liked_sources_by_email(email):
         """
@@ -315,25 +181,8 @@ class DatabaseHandler:
         Returns:
             dict: Source name -> count of likes
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get sources from articles liked by the user
-        cursor.execute("""
-            SELECT a.source, COUNT(*) as like_count
-            FROM feed f
-            JOIN articles a ON f.article_id = a.id
-            WHERE f.email = %s AND f.likes > 0
-            GROUP BY a.source
-            ORDER BY like_count DESC
-        """, (email,))
-        
-        sources = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        cursor.close()
-        conn.close()
-        
-        return sources
+        return get_backend().get_liked_sources_by_email(email)
+    
     @staticmethod
     def get_disliked_sources_by_email(email):
         """
@@ -345,26 +194,8 @@ class DatabaseHandler:
         Returns:
             dict: Source name -> count of likes
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get sources from articles liked by the user
-        cursor.execute("""
-            SELECT a.source, COUNT(*) as like_count
-            FROM feed f
-            JOIN articles a ON f.article_id = a.id
-            WHERE f.email = %s AND f.likes < 0
-            GROUP BY a.source
-            ORDER BY like_count DESC
-        """, (email,))
-        
-        sources = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        cursor.close()
-        conn.close()
-        
-        return sources
-        
+        return get_backend().get_disliked_sources_by_email(email)
+    
     @staticmethod
     def insert_feed_without_duplicate(email, flag, article_id):
         """
@@ -376,45 +207,25 @@ class DatabaseHandler:
             article_id (str): Article ID
             
         Returns:
-            bool: Success status
+            str: INSERTED, or UNCHANGED if the article is already in the
+                 feed; False if the insert failed
+        """
+        return get_backend().insert_feed_without_duplicate(email, flag, article_id)
+    
+    @staticmethod
+    def insert_feed_batch_without_duplicate(email, impressions):
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        Insert several impressions into the feed table in one statement,
+        skipping the ones already there
         
-        try:
-            # Check if this email-article_id combination already exists
-            cursor.execute(
-                "SELECT 1 FROM feed WHERE email = %s AND article_id = %s AND flag = %s",
-                (email, article_id, flag)
-            )
-            
-            if cursor.fetchone():
-                # Already exists, skip insertion
-                cursor.close()
-                conn.close()
-                return True
-            
-            # print(email, article_id, flag)
-            # Insert new record
-            cursor.execute(
-                """
-                INSERT INTO feed (email, article_id, flag, access_date, likes)
-                VALUES (%s, %s, %s, %s, 0)
-                """,
-                (email, article_id, flag, datetime.now(),)
-            )
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True
+        Args:
+            email (str): User email
+            impressions (list): (article ID, flag) tuples
             
-        except Exception as e:
-            # Log the error
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return False
+        Returns:
+            int: Number of rows inserted; False if the insert failed
+        """
+        return get_backend().insert_feed_batch_without_duplicate(email, impressions)
     
     @staticmethod
     def get_recent_articles(limit=20, categories=None):
@@ -426,37 +237,12 @@ class DatabaseHandler:
             categories (list, optional): List of categories to filter by
             
         Returns:
-            list: List of article dictionaries
-        """
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        today = datetime.now().date()
-        
-        if categories:
-            # Assuming articles table has a 'category' column
-            placeholders = ', '.join(['%s'] * len(categories))
-            query = f"""
-                SELECT * FROM articles 
-                WHERE DATE(date_added) = %s 
-                AND category IN ({placeholders})
-                ORDER BY date_added DESC
-                LIMIT %s
-            """
-            params = [today] + categories + [limit]
-        else:
-            query = """
-                SELECT * FROM articles 
-                WHERE DATE(date_added) = %s
-                ORDER BY date_added DESC
-                LIMIT %s
-            """
-            params = [today, limit]
-            
-        cursor.execute(query, params)
-        result = [dict(row) for row in cursor.fetchall()]
-        
-        cursor.close()
-        conn.close()
-        
-        return result
\ No newline at end of file
+            list: List of article dictionaries, including the row_version
+                  used by ArticleFragmentCache
+        """
+        catalog = get_catalog()
+        if catalog is not None:
+            articles = catalog.get_recent_articles(limit, categories)
+            if articles is not None:
+                return articles
+        return get_backend().get_recent_articles(limit, categories)
@@ -1,151 +1,405 @@
 import logging
 from services.database_handler import DatabaseHandler
+from services.article_store import ArticlePool, ArticleStore
 from services.source_bias_service import SourceBiasService
+from config import FEED_READ_TIMEOUT
+from executor import run_parallel
+from timing import span
+import deadline
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_personalized_feed(email, flag, categories=None):
+FEED_TYPES = ('comfort', 'balanced', 'challenge')
+
+# Smallest source bias confidence that personalizes an article
+MIN_CONFIDENCE = 0.5
+
+# Score and label of the articles whose source bias is unknown
+DEFAULT_SCORE = 0.5
+DEFAULT_TYPE = 'balanced'
+
+def _alignment(user_stance, source_stance):
     """
-    Get a personalized feed of articles based on user preferences, 
-    political stance, and the feed type flag
+    Alignment between the user's stance and a source's, from 1 (perfect
+    alignment) to 0 (maximum opposition)
+    """
+    # Calculate distance between user and source stance (-4 to +4 range)
+    stance_distance = user_stance - source_stance
+    
+    # Normalize to 0-1 alignment score
+    return 1 - abs(stance_distance) / 4
+
+def _feed_score(flag, alignment):
+    """
+    Score of an article with the given alignment for a feed type
+    """
+    if flag == 'comfort':
+        # For comfort feed, higher alignment is better
+        return alignment
+    elif flag == 'challenge':
+        # For challenge feed, lower alignment is better
+        return 1 - alignment
+    else:  # balanced
+        # For balanced feed, middling alignment is better (prioritize varied views)
+        return 1 - abs(0.5 - alignment)
+
+def _article_type(alignment):
+    """
+    Label of an article with the given alignment
+    """
+    if alignment > 0.7:  # High alignment
+        return "comfort"
+    elif alignment < 0.3:  # Low alignment
+        return "challenge"
+    else:  # Medium alignment
+        return "balanced"
+
+def _stance_table(value_of_alignment, user_stance):
+    """
+    Value of every source stance for the user, for ArticleStore.scan
+    """
+    return {
+        source_stance: value_of_alignment(_alignment(user_stance, source_stance))
+        for source_stance in set(SourceBiasService.BIAS_VALUES.values())
+    }
+
+def _score_and_sort(articles, flag, user_stance):
+    """
+    Score articles against the user's stance and sort them for the feed type
     
     Args:
-        email (str): User email
+        articles (list): List of article dictionaries
         flag (str): Feed type - 'comfort', 'balanced', or 'challenge'
-        categories (list, optional): List of categories to filter articles by
+        user_stance (float): User's numeric stance (-2 to +2)
     
     Returns:
-        list: List of article dictionaries sorted according to the feed type
+        list: Articles sorted by score, best first
     """
-    # Get today's articles, optionally filtered by categories
-    articles = DatabaseHandler.get_today_articles(categories)
-    
-    # If no articles or no valid flag, return the default articles
-    if not articles or flag not in ['comfort', 'balanced', 'challenge']:
-        return articles
-    
-    # Get the user's survey responses
-    survey_responses = DatabaseHandler.get_survey_responses(email)
-    
-    # Get combined political profile using both survey and likes
-    user_profile = SourceBiasService.get_combined_political_profile(email, survey_responses)
-    
-    # If we couldn't determine a profile, return default articles
-    if not user_profile:
-        return articles
-    
-    # Get the user's numeric stance
-    user_stance = user_profile['numeric_stance']
-    
-    # Score and sort articles based on feed type and user stance
     scored_articles = []
+    biases = SourceBiasService.resolve_many(article.get('source', '') for article in articles)
     
     for article in articles:
-        source = article.get('source', '')
-        source_bias, confidence = SourceBiasService.get_source_bias(source)
+        source_bias, confidence = biases[article.get('source', '')]
         
         # Default score - used if we can't determine bias
-        score = 0.5
+        score = DEFAULT_SCORE
         
         # If we have source bias with good confidence
-        if source_bias and confidence >= 0.5:
+        if source_bias and confidence >= MIN_CONFIDENCE:
             # Get numeric value for the source bias
             source_stance = SourceBiasService.BIAS_VALUES.get(source_bias, 0)
-            
-            # Calculate distance between user and source stance (-4 to +4 range)
-            stance_distance = user_stance - source_stance
-            
-            # Normalize to 0-1 alignment score
-            # 1 = perfect alignment, 0 = maximum opposition
-            alignment = 1 - abs(stance_distance) / 4
-            
-            if flag == 'comfort':
-                # For comfort feed, higher alignment is better
-                score = alignment
-            elif flag == 'challenge':
-                # For challenge feed, lower alignment is better
-                score = 1 - alignment
-            else:  # balanced
-                # For balanced feed, middling alignment is better (prioritize varied views)
-                score = 1 - abs(0.5 - alignment)
+            score = _feed_score(flag, _alignment(user_stance, source_stance))
         
         scored_articles.append((article, score))
     
     # Sort by score (descending)
-    sorted_articles = [article for article, score in 
-                       sorted(scored_articles, key=lambda x: x[1], reverse=True)]
+    return [article for article, score in 
+            sorted(scored_articles, key=lambda x: x[1], reverse=True)]
+
+def _profile_from_inputs(survey_responses, liked_sources, disliked_sources):
+    """
+    Combined political profile from already fetched survey responses and
+    liked and disliked sources
+    
+    Returns:
+        dict: Combined political profile, or None
+    """
+    likes_profile = SourceBiasService.political_profile_from_sources(liked_sources, disliked_sources)
+    
+    survey_profile = None
+    if survey_responses:
+        survey_profile = SourceBiasService.get_political_stance_from_survey(survey_responses)
+    
+    return SourceBiasService.combine_political_profiles(likes_profile, survey_profile)
+
+def _read_in_parallel(email, articles_query):
+    """
+    Fetch the article pool and the profile inputs concurrently
+    
+    The profile inputs are optional: if they cannot be read within the
+    request deadline (or FEED_READ_TIMEOUT) the feed falls back to the
+    unpersonalized order.
+    
+    Args:
+        email (str): User email
+        articles_query (callable): Fetches the article pool
+    
+    Returns:
+        tuple: (articles, (survey_responses, liked_sources, disliked_sources)),
+               with None instead of the inputs when they timed out
+    """
+    results = run_parallel(
+        articles_query,
+        lambda: DatabaseHandler.get_survey_responses(email),
+        lambda: DatabaseHandler.get_liked_sources_by_email(email),
+        lambda: DatabaseHandler.get_disliked_sources_by_email(email),
+        timeout=deadline.timeout(FEED_READ_TIMEOUT),
+        return_exceptions=True
+    )
+    
+    articles, inputs = results[0], results[1:]
+    if isinstance(articles, Exception):
+        raise articles
+    
+    errors = [result for result in inputs if isinstance(result, Exception)]
+    if errors:
+        # Only running out of time is expected; anything else is a bug
+        unexpected = [error for error in errors if not isinstance(error, TimeoutError)]
+        if unexpected:
+            raise unexpected[0]
+        deadline.record_exceeded('profile')
+        logger.warning(f"Profile reads timed out, serving the unpersonalized feed: {errors[0]}")
+        return articles, None
+    
+    return articles, inputs
+
+def _profile_in_time(inputs):
+    """
+    Combined political profile, unless the inputs or the time are missing
+    """
+    if inputs is None:
+        return None
+    if deadline.expired():
+        deadline.record_exceeded('profile')
+        return None
+    return _profile_from_inputs(*inputs)
+
+def log_impressions(email, flag, articles):
+    """
+    Store the articles shown to the user in the feed table (without
+    duplicates), unless the request deadline has run out
+    
+    Args:
+        email (str): User email
+        flag (str): Feed flag
+        articles (list): Article dictionaries shown to the user
+    """
+    with span('impressions'):
+        for article in articles:
+            if deadline.expired():
+                # Serving the response matters more than the impressions
+                deadline.record_exceeded('impressions')
+                logger.warning(f"Skipped logging impressions for {flag} feed: request deadline exceeded")
+                return
+            result = DatabaseHandler.insert_feed_without_duplicate(email, flag, article['id'])
+            logger.info(f"Inserted article {article['id']} into feed: {result}")
+
+def log_feed_impressions(email, feeds):
+    """
+    Store the articles of several feeds shown to the user in the feed
+    table in one statement (without duplicates), unless the request
+    deadline has run out
+    
+    Args:
+        email (str): User email
+        feeds (dict): Feed flag -> article dictionaries shown to the user
+    """
+    with span('impressions'):
+        if deadline.expired():
+            deadline.record_exceeded('impressions')
+            logger.warning(f"Skipped logging impressions for {', '.join(feeds)} feeds: request deadline exceeded")
+            return
+        impressions = [(article['id'], flag) for flag, articles in feeds.items() for article in articles]
+        result = DatabaseHandler.insert_feed_batch_without_duplicate(email, impressions)
+        logger.info(f"Inserted {result} of {len(impressions)} impressions into the {', '.join(feeds)} feeds")
+
+def _rank_feed(store, flag, categories, inputs, k):
+    """
+    Rank the pool for a feed type (get_personalized_feed, and the async
+    data path)
+    
+    Args:
+        store (ArticleStore): Today's articles
+        flag (str): Feed type; not personalized unless one of FEED_TYPES
+        categories (list): Categories to keep; all when empty
+        inputs (tuple): (survey_responses, liked_sources, disliked_sources),
+                        or None when they could not be read
+        k (int): Only the first k articles; all when None
+    
+    Returns:
+        list: Article dictionaries sorted according to the feed type
+    """
+    positions = store.select(categories)
+    
+    # If no articles, return them as they are
+    if not positions:
+        return []
+    
+    # Get combined political profile using both survey and likes
+    user_profile = None
+    if flag in FEED_TYPES:
+        with span('profile'):
+            user_profile = _profile_in_time(inputs)
+    
+    # If we couldn't determine a profile, return default articles
+    if not user_profile:
+        return store.rows(positions[:k])
+    
+    # Get the user's numeric stance
+    user_stance = user_profile['numeric_stance']
+    
+    # Score and sort articles based on feed type and user stance
+    with span('score'):
+        table = _stance_table(lambda alignment: _feed_score(flag, alignment), user_stance)
+        scores = store.scan(positions, table, DEFAULT_SCORE, MIN_CONFIDENCE)
+        sorted_articles = store.rows(ArticleStore.top(positions, scores, k))
     
     return sorted_articles
 
-def get_labeled_articles(email, limit=20, categories=None):
+def get_personalized_feed(email, flag, categories=None, limit=None):
     """
-    Get recent articles with comfort/balanced/challenge labels based on 
-    user preferences from both survey and liked articles
+    Get a personalized feed of articles based on user preferences, 
+    political stance, and the feed type flag
+    
+    The article pool and the profile inputs are read in parallel. When
+    the profile cannot be computed within the request deadline, the
+    articles come back unpersonalized. Articles are ranked in the
+    worker's ArticleStore, and only the returned ones are built as dicts.
     
     Args:
         email (str): User email
-        limit (int): Maximum number of articles to return
-        categories (list, optional): List of categories to filter by
+        flag (str): Feed type - 'comfort', 'balanced', or 'challenge'
+        categories (list, optional): List of categories to filter articles by
+        limit (int, optional): Only return the first `limit` articles
+    
+    Returns:
+        list: List of article dictionaries sorted according to the feed type
+    
+    Raises:
+        DeadlineExceeded: If the article query runs out of time
+    """
+    k = limit if limit is not None and limit >= 0 else None
+    
+    with span('db'):
+        if flag not in FEED_TYPES:
+            # Without a valid flag the feed is not personalized
+            store, inputs = ArticlePool.get(), None
+        else:
+            # Get today's articles together with the survey responses and
+            # liked and disliked sources
+            store, inputs = _read_in_parallel(email, ArticlePool.get)
+    
+    return _rank_feed(store, flag, categories, inputs, k)
+
+def get_personalized_feeds(email, limits, categories=None):
+    """
+    Get the comfort, balanced and challenge feeds of a user in one pass
+    
+    Same rankings as get_personalized_feed for each flag, from one read
+    of the article pool and the profile inputs: a single scan of the
+    pool scores every article for the three feeds at once.
+    
+    Args:
+        email (str): User email
+        limits (dict): Feed type -> only return the first `limit` articles
+                       (None or negative for all)
+        categories (list, optional): List of categories to filter articles by
+    
+    Returns:
+        dict: Feed type -> list of article dictionaries, in FEED_TYPES order
+    
+    Raises:
+        DeadlineExceeded: If the article query runs out of time
+    """
+    ks = {flag: limit if limit is not None and limit >= 0 else None for flag, limit in limits.items()}
+    
+    with span('db'):
+        store, inputs = _read_in_parallel(email, ArticlePool.get)
+    positions = store.select(categories)
+    
+    if not positions:
+        return {flag: [] for flag in FEED_TYPES}
+    
+    with span('profile'):
+        user_profile = _profile_in_time(inputs)
+    
+    # If we couldn't determine a profile, every feed is the default order
+    if not user_profile:
+        return {flag: store.rows(positions[:ks[flag]]) for flag in FEED_TYPES}
+    
+    user_stance = user_profile['numeric_stance']
+    
+    with span('score'):
+        # Stance -> the scores of the three feeds
+        tables = [_stance_table(lambda alignment, flag=flag: _feed_score(flag, alignment), user_stance)
+                  for flag in FEED_TYPES]
+        table = {stance: tuple(flag_table[stance] for flag_table in tables) for stance in tables[0]}
+        scores = store.scan(positions, table, (DEFAULT_SCORE,) * len(FEED_TYPES), MIN_CONFIDENCE)
         
+        feeds = {}
+        for i, flag in enumerate(FEED_TYPES):
+            values = [score[i] for score in scores]
+            feeds[flag] = store.rows(ArticleStore.top(positions, values, ks[flag]))
+    
+    return feeds
+
+def _label_recent(store, limit, categories, inputs):
+    """
+    Label the most recent articles of the pool (get_labeled_articles, and
+    the async data path)
+    
+    Args:
+        store (ArticleStore): Today's articles
+        limit (int): Maximum number of articles to return
+        categories (list): Categories to keep; all when empty
+        inputs (tuple): (survey_responses, liked_sources, disliked_sources),
+                        or None when they could not be read
+    
     Returns:
-        list: List of article dictionaries with added 'type' field
+        list: Article dictionaries, newest first, with an added 'type' field
     """
-    # Get recent articles, optionally filtered by categories
-    articles = DatabaseHandler.get_recent_articles(limit, categories)
+    positions = store.most_recent(store.select(categories), limit)
     
-    if not articles:
+    if not positions:
         return []
     
-    # Get the user's survey responses
-    survey_responses = DatabaseHandler.get_survey_responses(email)
-    
     # Get combined political profile using both survey and likes
-    user_profile = SourceBiasService.get_combined_political_profile(email, survey_responses)
+    with span('profile'):
+        user_profile = _profile_in_time(inputs)
     
     # Default to neutral stance if no profile available
     user_stance = 0
     if user_profile:
         user_stance = user_profile['numeric_stance']
     
-    # Calculate scores and assign labels
-    labeled_articles = []
+    articles = store.rows(positions)
     
-    for article in articles:
-        # Store in feed table (without duplicates)
-        DatabaseHandler.insert_feed_without_duplicate(email, "all", article['id'])
-        
-        # Get source bias
-        source = article.get('source', '')
-        source_bias, confidence = SourceBiasService.get_source_bias(source)
-        
-        # Default to balanced type
-        article_type = "balanced"
-        
-        # If we have source bias with good confidence
-        if source_bias and confidence >= 0.5:
-            # Get numeric value for the source bias
-            source_stance = SourceBiasService.BIAS_VALUES.get(source_bias, 0)
-            
-            # Calculate distance between user and source stance (-4 to +4 range)
-            stance_distance = user_stance - source_stance
-            
-            # Normalize to 0-1 alignment score (1 = perfect alignment)
-            alignment = 1 - abs(stance_distance) / 4
-            
-            # Assign type based on alignment
-            if alignment > 0.7:  # High alignment
-                article_type = "comfort"
-            elif alignment < 0.3:  # Low alignment
-                article_type = "challenge"
-            else:  # Medium alignment
-                article_type = "balanced"
-        
-        # Add the type to the article
-        article_with_type = dict(article)
-        article_with_type['type'] = article_type
+    types = store.scan(positions, _stance_table(_article_type, user_stance), DEFAULT_TYPE, MIN_CONFIDENCE)
+    for article, article_type in zip(articles, types):
+        article['type'] = article_type
+    
+    return articles
+
+def get_labeled_articles(email, limit=20, categories=None):
+    """
+    Get recent articles with comfort/balanced/challenge labels based on 
+    user preferences from both survey and liked articles
+    
+    The article pool and the profile inputs are read in parallel. When
+    the profile cannot be computed within the request deadline, every
+    article is labeled from a neutral stance.
+    
+    Args:
+        email (str): User email
+        limit (int): Maximum number of articles to return
+        categories (list, optional): List of categories to filter by
         
-        labeled_articles.append(article_with_type)
+    Returns:
+        list: List of article dictionaries with added 'type' field
+    
+    Raises:
+        DeadlineExceeded: If the article query runs out of time
+    """
+    # Get today's articles together with the survey responses and liked
+    # and disliked sources
+    with span('db'):
+        store, inputs = _read_in_parallel(email, ArticlePool.get)
+    
+    articles = _label_recent(store, limit, categories, inputs)
+    
+    # Store in feed table (without duplicates)
+    log_impressions(email, "all", articles)
     
-    return labeled_articles
\ No newline at end of file
+    return articles
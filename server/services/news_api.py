@@ -1,5 +1,6 @@
 import requests
-from config import PUBLIC_NEWS_API_KEY
+from config import PUBLIC_NEWS_API_KEY, NEWS_API_TIMEOUT
+import deadline
 
 class NewsAPI:
     """
@@ -15,6 +16,9 @@ class NewsAPI:
             
         Returns:
             dict: JSON response from the news API
+            
+        Raises:
+            DeadlineExceeded: If the request deadline runs out first
         """
         # print(PUBLIC_NEWS_API_KEY)
         base_url = f"https://api.thenewsapi.com/v1/news/top?api_token={PUBLIC_NEWS_API_KEY}&locale=us&limit=3"
@@ -22,5 +26,13 @@ class NewsAPI:
         if category:
             base_url += f"&categories={category}"
             
-        response = requests.get(base_url)
+        # Never wait longer than the request deadline allows
+        deadline.check('news_api')
+        try:
+            response = requests.get(base_url, timeout=deadline.timeout(NEWS_API_TIMEOUT))
+        except requests.Timeout as e:
+            if deadline.expired():
+                deadline.record_exceeded('news_api')
+                raise deadline.DeadlineExceeded('news_api') from e
+            raise
         return response.json()
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Compiled form of the source bias table
+
+`data/source_bias.csv` is compiled into a binary artifact holding the
+table as SourceBiasService serves it: the normalized keys (deduplicated,
+in CSV order), their original names, bias labels and confidences. Loading
+it maps the file and decodes the columns, without parsing CSV or running
+the name normalization regexes.
+
+    [ header: magic, format, entries, labels, CSV sha256, payload crc32 ][ payload ]
+
+    payload: confidence (float64 x entries), label index (uint8 x entries),
+             key offsets, original name offsets (uint32 x entries + 1),
+             labels, keys, original names (UTF-8, \\n-separated labels)
+
+The artifact records the checksum of the CSV it was compiled from and is
+ignored, for the CSV to be parsed instead, when the CSV has changed since.
+The same bytes (encode_artifact) are the snapshot through which workers
+share the table (see shared_snapshot.py).
+
+Compile it after editing the CSV, from the server folder:
+    python -m services.source_bias_artifact
+"""
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+MAGIC = b'PRBIAS1\0'
+HEADER = struct.Struct('<8sIII32sI')
+
+def csv_checksum(csv_path):
+    """
+    SHA-256 of the CSV an artifact is compiled from
+
+    Args:
+        csv_path (str): Source bias CSV
+
+    Returns:
+        bytes: The digest
+    """
+    with open(csv_path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+def encode_artifact(checksum, bias_data, normalized_to_original):
+    """
+    Serialize the compiled table
+
+    Args:
+        checksum (bytes): csv_checksum() of the CSV the table was read from
+        bias_data (dict): Normalized source name -> (bias, confidence)
+        normalized_to_original (dict): Normalized source name -> original name
+
+    Returns:
+        bytes: Header and payload
+    """
+    labels = sorted({bias for bias, _ in bias_data.values()})
+    codes = {label: code for code, label in enumerate(labels)}
+
+    confidence = array('d')
+    label = array('B')
+    keys, key_offsets = [], array('I', [0])
+    originals, original_offsets = [], array('I', [0])
+    for key, (bias, score) in bias_data.items():
+        confidence.append(score)
+        label.append(codes[bias])
+        encoded = key.encode('utf-8')
+        keys.append(encoded)
+        key_offsets.append(key_offsets[-1] + len(encoded))
+        encoded = normalized_to_original.get(key, key).encode('utf-8')
+        originals.append(encoded)
+        original_offsets.append(original_offsets[-1] + len(encoded))
+
+    label_blob = '\n'.join(labels).encode('utf-8')
+    payload = b''.join([
+        confidence.tobytes(), label.tobytes(), key_offsets.tobytes(), original_offsets.tobytes(),
+        struct.pack('<I', len(label_blob)), label_blob, b''.join(keys), b''.join(originals)
+    ])
+    return HEADER.pack(MAGIC, 1, len(bias_data), len(labels), checksum, zlib.crc32(payload)) + payload
+
+def write_artifact(path, checksum, bias_data, normalized_to_original):
+    """
+    Write the compiled table
+
+    Args:
+        path (str): Artifact file
+        checksum (bytes): csv_checksum() of the CSV the table was read from
+        bias_data (dict): Normalized source name -> (bias, confidence)
+        normalized_to_original (dict): Normalized source name -> original name
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(encode_artifact(checksum, bias_data, normalized_to_original))
+    os.replace(temporary, path)
+
+def read_artifact(path, checksum):
+    """
+    Read the compiled table
+
+    Args:
+        path (str): Artifact file
+        checksum (bytes): csv_checksum() of the current CSV
+
+    Returns:
+        tuple: (bias_data, normalized_to_original) dicts, or None when the
+               artifact is missing, corrupt, or compiled from another CSV
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # ValueError: an empty file cannot be mapped
+        return None
+
+    with mapping, memoryview(mapping) as view:
+        decoded = decode_artifact(view)
+    if decoded is None or decoded[0] != checksum:
+        return None
+    return decoded[1:]
+
+def decode_artifact(buffer):
+    """
+    Deserialize a table written by encode_artifact
+
+    Args:
+        buffer (memoryview): Header and payload
+
+    Returns:
+        tuple: (checksum of the CSV it was compiled from, bias_data,
+               normalized_to_original), or None when the buffer is not a
+               valid artifact
+    """
+    if len(buffer) < HEADER.size:
+        return None
+    magic, _, count, _, compiled_from, crc = HEADER.unpack_from(buffer)
+    if magic != MAGIC or zlib.crc32(buffer[HEADER.size:]) != crc:
+        return None
+
+    offset = HEADER.size
+    def read(size):
+        nonlocal offset
+        if offset + size > len(buffer):
+            raise ValueError("truncated artifact")
+        data = bytes(buffer[offset:offset + size])
+        offset += size
+        return data
+
+    def column(typecode, items):
+        values = array(typecode)
+        values.frombytes(read(values.itemsize * items))
+        return values
+
+    try:
+        confidence = column('d', count)
+        label = column('B', count)
+        key_offsets = column('I', count + 1)
+        original_offsets = column('I', count + 1)
+        (length,) = struct.unpack('<I', read(4))
+        labels = read(length).decode('utf-8').split('\n')
+        keys = _split(read(key_offsets[-1]), key_offsets)
+        originals = _split(read(original_offsets[-1]), original_offsets)
+        bias = [labels[code] for code in label]
+    except (ValueError, IndexError):
+        # ValueError includes UnicodeDecodeError
+        return None
+
+    bias_data = dict(zip(keys, zip(bias, confidence)))
+    normalized_to_original = dict(zip(keys, originals))
+    return compiled_from, bias_data, normalized_to_original
+
+def _split(blob, offsets):
+    """
+    Strings of a UTF-8 blob, at byte offsets
+    """
+    text = blob.decode('utf-8')
+    if len(text) == len(blob):
+        # ASCII: character offsets are the byte offsets
+        return [text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+def main():
+    # Imported here: the service loads artifacts written by this module
+    from services.source_bias_service import SourceBiasService
+    path, count = SourceBiasService.compile_artifact()
+    print(f"Compiled {count} sources into {path}")
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,35 @@ import csv
 import re
 import logging
 import difflib
+import threading
+import time
+from concurrent.futures import Future, wait
+from types import MappingProxyType
 from services.database_handler import DatabaseHandler
+from config import (
+    SHARED_CACHE_ENABLED, SHARED_CACHE_CHECK_INTERVAL,
+    FUZZY_POOL_WORKERS, FUZZY_POOL_MAX_PENDING, FUZZY_MATCH_TIMEOUT
+)
+from fuzzy_pool import FuzzyPool
+from metrics import SOURCE_BIAS_RESOLUTIONS, SOURCE_BIAS_RESOLUTION_LATENCY, SOURCE_BIAS_FUZZY_OFFLOADS
+from shared_snapshot import SharedSnapshot, available as shared_snapshots_available, snapshot_path
+from services.source_bias_artifact import (
+    csv_checksum, decode_artifact, encode_artifact, read_artifact, write_artifact
+)
+import timing
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Patterns of _normalize_source_name
+_TLD_PATTERN = re.compile(r'\.com$|\.org$|\.net$|\.co\.uk$|\.co$|\.news$')
+_THE_PATTERN = re.compile(r'^the\s+')
+_NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9]')
+
+# Normalized names whose substring or fuzzy match is remembered, per table
+MATCH_CACHE_SIZE = 10000
+
 class SourceBiasService:
     """Service for handling source bias data and operations"""
     
@@ -16,6 +39,27 @@ class SourceBiasService:
     _source_bias_data = None
     _normalized_to_original = None
     
+    # Node-wide copy of the table (see shared_snapshot.py) and the version
+    # of it installed in this worker
+    _shared = None
+    _shared_version = None
+    
+    # Normalized name -> (matching path, (bias, confidence)) for the names
+    # that are not in the table
+    _matches = {}
+    
+    # Processes for fuzzy matching (see fuzzy_pool.py), for one table
+    FUZZY_POOL_WORKERS = FUZZY_POOL_WORKERS
+    _fuzzy_pool = None
+    _fuzzy_pool_table = None
+    _fuzzy_pool_pid = None
+    _fuzzy_pool_lock = threading.Lock()
+    
+    CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'data', 'source_bias.csv')
+    # Compiled from CSV_PATH (see services/source_bias_artifact.py)
+    ARTIFACT_PATH = os.path.join(os.path.dirname(CSV_PATH), 'source_bias.bin')
+    
     # Mapping of bias labels to numeric values
     BIAS_VALUES = {
         'left': -2,
@@ -52,62 +96,209 @@ class SourceBiasService:
         name = source_name.lower()
         
         # Remove common TLDs
-        name = re.sub(r'\.com$|\.org$|\.net$|\.co\.uk$|\.co$|\.news$', '', name)
+        name = _TLD_PATTERN.sub('', name)
         
         # Remove "the" prefix
-        name = re.sub(r'^the\s+', '', name)
+        name = _THE_PATTERN.sub('', name)
         
         # Remove spaces and special characters
-        name = re.sub(r'[^a-z0-9]', '', name)
+        name = _NON_ALNUM_PATTERN.sub('', name)
         
         return name
     
+    @staticmethod
+    def _shared_snapshot():
+        """
+        The node-wide snapshot of the table, or None when sharing is off
+        """
+        if SourceBiasService._shared is None and SHARED_CACHE_ENABLED and shared_snapshots_available():
+            SourceBiasService._shared = SharedSnapshot(
+                snapshot_path('source-bias', SourceBiasService.CSV_PATH),
+                decode_artifact,
+                check_interval=SHARED_CACHE_CHECK_INTERVAL
+            )
+        return SourceBiasService._shared
+    
+    @staticmethod
+    def _install_shared(snapshot):
+        """
+        Install the table published by another worker, if it is newer than
+        this worker's and was built from the current CSV
+        
+        Returns:
+            bool: True if the shared table is installed
+        """
+        value, _ = snapshot.get()
+        if value is None:
+            return False
+        if snapshot.version == SourceBiasService._shared_version:
+            return True
+        
+        checksum, bias_data, normalized_to_original = value
+        try:
+            if checksum != csv_checksum(SourceBiasService.CSV_PATH):
+                return False
+        except OSError:
+            return False
+        SourceBiasService.install_source_bias_data(bias_data, normalized_to_original)
+        SourceBiasService._shared_version = snapshot.version
+        return True
+    
     @staticmethod
     def load_source_bias_data(refresh=False):
         """
         Load source bias data from CSV
         
+        A worker first looks for the table published by another worker of
+        the node (SHARED_CACHE_ENABLED), and publishes the one it reads. The
+        table is read from its compiled artifact (ARTIFACT_PATH) unless the
+        CSV changed since it was compiled. A refresh re-reads the table and
+        publishes it to every worker.
+        
         Args:
             refresh (bool): Whether to refresh the cache
             
         Returns:
             dict: Normalized source name -> (bias, confidence)
         """
+        snapshot = SourceBiasService._shared_snapshot()
+        
         # Use cached data if available and refresh not requested
         if SourceBiasService._source_bias_data is not None and not refresh:
+            if snapshot is not None and SourceBiasService._shared_version is not None:
+                # Another worker may have published a newer table
+                SourceBiasService._install_shared(snapshot)
             return SourceBiasService._source_bias_data
-            
-        # Path to the CSV file (adjust as needed)
-        csv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                               'data', 'source_bias.csv')
         
-        bias_data = {}
-        normalized_to_original = {}
+        if snapshot is not None and not refresh and SourceBiasService._install_shared(snapshot):
+            return SourceBiasService._source_bias_data
         
         try:
-            with open(csv_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    original_name = row['source']
-                    normalized_name = SourceBiasService._normalize_source_name(original_name)
-                    
-                    if normalized_name:
-                        bias_data[normalized_name] = (
-                            row['bias'],
-                            float(row['confidence'])
-                        )
-                        # Keep track of the mapping from normalized to original names
-                        normalized_to_original[normalized_name] = original_name
-            
-            logger.info(f"Loaded {len(bias_data)} sources from bias database")
-            SourceBiasService._source_bias_data = bias_data
-            SourceBiasService._normalized_to_original = normalized_to_original
-            return bias_data
+            checksum = csv_checksum(SourceBiasService.CSV_PATH)
+            tables = read_artifact(SourceBiasService.ARTIFACT_PATH, checksum)
+            if tables is not None:
+                bias_data, normalized_to_original = tables
+                logger.info(f"Loaded {len(bias_data)} sources from the compiled bias database")
+            else:
+                if os.path.exists(SourceBiasService.ARTIFACT_PATH):
+                    logger.warning(f"{SourceBiasService.ARTIFACT_PATH} is stale or corrupt, reading the CSV; "
+                                   "recompile it with python -m services.source_bias_artifact")
+                bias_data, normalized_to_original = SourceBiasService._read_csv()
+                logger.info(f"Loaded {len(bias_data)} sources from bias database")
+            installed = SourceBiasService.install_source_bias_data(bias_data, normalized_to_original)
             
         except Exception as e:
             logger.error(f"Error loading source bias data: {e}")
             # Return empty dict in case of error
             return {}
+        
+        if snapshot is not None:
+            try:
+                payload = encode_artifact(checksum, bias_data, normalized_to_original)
+                SourceBiasService._shared_version = snapshot.publish(payload)
+            except OSError as e:
+                logger.warning(f"Could not share the source bias table with the other workers: {e}")
+        
+        return installed
+    
+    @staticmethod
+    def _read_csv():
+        """
+        Parse and normalize the source bias CSV
+        
+        Returns:
+            tuple: (normalized source name -> (bias, confidence),
+                    normalized source name -> original name)
+        """
+        bias_data = {}
+        normalized_to_original = {}
+        
+        with open(SourceBiasService.CSV_PATH, 'r', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                original_name = row['source']
+                normalized_name = SourceBiasService._normalize_source_name(original_name)
+                
+                if normalized_name:
+                    bias_data[normalized_name] = (
+                        row['bias'],
+                        float(row['confidence'])
+                    )
+                    # Keep track of the mapping from normalized to original names
+                    normalized_to_original[normalized_name] = original_name
+        
+        return bias_data, normalized_to_original
+    
+    @staticmethod
+    def compile_artifact():
+        """
+        Compile the source bias CSV into ARTIFACT_PATH
+        
+        Returns:
+            tuple: (artifact path, number of sources)
+        """
+        checksum = csv_checksum(SourceBiasService.CSV_PATH)
+        bias_data, normalized_to_original = SourceBiasService._read_csv()
+        write_artifact(SourceBiasService.ARTIFACT_PATH, checksum, bias_data, normalized_to_original)
+        return SourceBiasService.ARTIFACT_PATH, len(bias_data)
+    
+    @staticmethod
+    def install_source_bias_data(bias_data, normalized_to_original):
+        """
+        Replace the cached source bias table
+        
+        Used by load_source_bias_data, and by benchmarks to install
+        synthetic tables.
+        
+        Args:
+            bias_data (dict): Normalized source name -> (bias, confidence)
+            normalized_to_original (dict): Normalized source name -> original name
+            
+        Returns:
+            Mapping: Read-only view of bias_data
+        """
+        # Read-only views: the tables are shared by every request thread
+        # (and, when preloaded, by every forked worker)
+        SourceBiasService._normalized_to_original = MappingProxyType(dict(normalized_to_original))
+        SourceBiasService._source_bias_data = MappingProxyType(dict(bias_data))
+        SourceBiasService._matches = {}
+        # Not the shared table until the caller says so
+        SourceBiasService._shared_version = None
+        return SourceBiasService._source_bias_data
+    
+    @staticmethod
+    def warm():
+        """
+        Eagerly load the source bias table and its lookup indexes
+        
+        Called when the app is created so that a preforking server loads
+        them once in the parent and the workers share them copy-on-write.
+        
+        Returns:
+            bool: True if the data is loaded and ready to serve
+        """
+        SourceBiasService.load_source_bias_data()
+        return SourceBiasService.is_warm()
+    
+    @staticmethod
+    def is_warm():
+        """
+        Check whether the source bias data has been loaded
+        
+        Returns:
+            bool: True if the cache is populated
+        """
+        return SourceBiasService._source_bias_data is not None
+    
+    @staticmethod
+    def _record_resolution(path, start):
+        """
+        Account a source bias lookup by the matching path that answered it
+        """
+        elapsed = time.perf_counter() - start
+        SOURCE_BIAS_RESOLUTIONS.inc(path=path)
+        SOURCE_BIAS_RESOLUTION_LATENCY.observe(elapsed, path=path)
+        timing.record('bias', elapsed)
     
     @staticmethod
     def get_source_bias(source):
@@ -120,32 +311,193 @@ class SourceBiasService:
         Returns:
             tuple: (bias, confidence) or (None, None) if not found
         """
+        return SourceBiasService.resolve_many((source,))[source]
+    
+    @staticmethod
+    def resolve_many(sources):
+        """
+        Get bias information for many sources at once
+        
+        Each distinct source is normalized once. Those whose normalized name
+        is in the table are answered by a dict lookup; only the others go
+        through substring and fuzzy matching, and their answers are cached
+        until the table changes.
+        
+        Args:
+            sources (iterable): Source names
+            
+        Returns:
+            dict: Source name -> (bias, confidence), or (None, None) if not found
+        """
+        start = time.perf_counter()
         bias_data = SourceBiasService.load_source_bias_data()
-        normalized_source = SourceBiasService._normalize_source_name(source)
+        normalize = SourceBiasService._normalize_source_name
+        normalized = {source: normalize(source) for source in dict.fromkeys(sources)}
+        
+        resolved = {}
+        unknown = []
+        for source, name in normalized.items():
+            bias_info = bias_data.get(name)
+            if bias_info is None:
+                unknown.append(source)
+            else:
+                resolved[source] = bias_info
+        
+        if resolved:
+            elapsed = time.perf_counter() - start
+            # One latency sample for the whole join would misstate the
+            # per-lookup latency: exact hits are only counted
+            SOURCE_BIAS_RESOLUTIONS.inc(len(resolved), path='exact')
+            timing.record('bias', elapsed)
+        
+        deferred = {}
+        for source in unknown:
+            match = SourceBiasService._match(source, normalized[source], bias_data)
+            if isinstance(match, Future):
+                deferred[source] = match
+            else:
+                resolved[source] = match
+        
+        if deferred:
+            # One budget for all of the request's offloaded matches
+            wait_start = time.perf_counter()
+            done, _ = wait(set(deferred.values()), timeout=FUZZY_MATCH_TIMEOUT)
+            for source, future in deferred.items():
+                if future in done and not future.cancelled() and future.exception() is None:
+                    # Logged by _fuzzy_arrived
+                    path, bias_info = SourceBiasService._fuzzy_answer(
+                        source, normalized[source], future.result(), bias_data, log=False
+                    )
+                    SOURCE_BIAS_FUZZY_OFFLOADS.inc(outcome='answered')
+                else:
+                    # Unknown for now; _match caches the answer when it arrives
+                    path, bias_info = 'deferred', (None, None)
+                    SOURCE_BIAS_FUZZY_OFFLOADS.inc(outcome='deferred')
+                SourceBiasService._record_resolution(path, wait_start)
+                resolved[source] = bias_info
+        return resolved
+    
+    @staticmethod
+    def _match(source, normalized_source, bias_data):
+        """
+        Substring, then fuzzy, matching of a name that is not in the table
         
-        # Try direct match
-        if normalized_source in bias_data:
-            logger.debug(f"Direct match for '{source}': {SourceBiasService._normalized_to_original.get(normalized_source)}")
-            return bias_data[normalized_source]
+        Fuzzy matching runs in the fuzzy process pool when there is one:
+        the caller gets a future, and the answer is cached once it arrives.
+        When the pool is saturated the name is unknown for this call.
+        
+        Args:
+            source (str): Source name, for the logs
+            normalized_source (str): Its normalized name
+            bias_data (Mapping): Table to match against
             
-        # Try substring matching
+        Returns:
+            tuple: (bias, confidence) or (None, None) if not found, or a
+                   Future of the closest key of the table (FuzzyPool.submit)
+        """
+        start = time.perf_counter()
+        matches = SourceBiasService._matches
+        cached = matches.get(normalized_source)
+        if cached is not None:
+            SourceBiasService._record_resolution('cached', start)
+            return cached[1]
+        
+        path, bias_info = SourceBiasService._match_substring(source, normalized_source, bias_data)
+        
+        # Only try fuzzy matching for names of reasonable length
+        if path is None and len(normalized_source) > 3:
+            pool = SourceBiasService._get_fuzzy_pool(bias_data)
+            if pool is None:
+                matched = difflib.get_close_matches(normalized_source, bias_data.keys(), n=1, cutoff=0.6)
+                path, bias_info = SourceBiasService._fuzzy_answer(
+                    source, normalized_source, matched[0] if matched else None, bias_data
+                )
+            else:
+                future = pool.submit(normalized_source)
+                if future is None:
+                    SOURCE_BIAS_FUZZY_OFFLOADS.inc(outcome='rejected')
+                    SourceBiasService._record_resolution('deferred', start)
+                    return (None, None)
+                future.add_done_callback(lambda done: SourceBiasService._fuzzy_arrived(
+                    source, normalized_source, done, bias_data, matches
+                ))
+                return future
+        
+        if path is None:
+            logger.warning(f"No bias data found for source: {source}")
+            path, bias_info = 'miss', (None, None)
+        SourceBiasService._record_resolution(path, start)
+        SourceBiasService._remember(normalized_source, path, bias_info, bias_data, matches)
+        return bias_info
+    
+    @staticmethod
+    def _remember(normalized_source, path, bias_info, bias_data, matches):
+        # Only remember matches against the table that is still installed
+        if bias_data is SourceBiasService._source_bias_data and matches is SourceBiasService._matches:
+            if len(matches) >= MATCH_CACHE_SIZE:
+                matches.clear()
+            matches[normalized_source] = (path, bias_info)
+    
+    @staticmethod
+    def _match_substring(source, normalized_source, bias_data):
         for known_source, bias_info in bias_data.items():
             # Check if one is substring of the other
             if normalized_source in known_source or known_source in normalized_source:
                 logger.info(f"Substring matched '{source}' to '{SourceBiasService._normalized_to_original.get(known_source)}'")
-                return bias_info
-        
-        # Try fuzzy matching with difflib
-        if len(normalized_source) > 3:  # Only try fuzzy matching for names of reasonable length
-            matches = difflib.get_close_matches(normalized_source, bias_data.keys(), n=1, cutoff=0.6)
-            if matches:
-                best_match = matches[0]
-                logger.info(f"Fuzzy matched '{source}' to '{SourceBiasService._normalized_to_original.get(best_match)}' (score: {difflib.SequenceMatcher(None, normalized_source, best_match).ratio():.2f})")
-                return bias_data[best_match]
-        
-        logger.warning(f"No bias data found for source: {source}")
-        return (None, None)
+                return 'substring', bias_info
+        return None, None
+    
+    @staticmethod
+    def _fuzzy_answer(source, normalized_source, best_match, bias_data, log=True):
+        """
+        Matching path and answer for the closest key found by fuzzy matching
+        """
+        if best_match is None:
+            if log:
+                logger.warning(f"No bias data found for source: {source}")
+            return 'miss', (None, None)
+        if log:
+            logger.info(f"Fuzzy matched '{source}' to '{SourceBiasService._normalized_to_original.get(best_match)}' (score: {difflib.SequenceMatcher(None, normalized_source, best_match).ratio():.2f})")
+        return 'fuzzy', bias_data[best_match]
+    
+    @staticmethod
+    def _fuzzy_arrived(source, normalized_source, future, bias_data, matches):
+        """
+        Cache the answer of an offloaded fuzzy match for the next requests
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        path, bias_info = SourceBiasService._fuzzy_answer(source, normalized_source, future.result(), bias_data)
+        SourceBiasService._remember(normalized_source, path, bias_info, bias_data, matches)
+    
+    @staticmethod
+    def _get_fuzzy_pool(bias_data):
+        """
+        This worker's fuzzy process pool for a table, or None when fuzzy
+        matching runs on the request thread (FUZZY_POOL_WORKERS = 0)
+        """
+        if SourceBiasService.FUZZY_POOL_WORKERS <= 0:
+            return None
         
+        pool = SourceBiasService._fuzzy_pool
+        if (pool is not None and not pool.broken and SourceBiasService._fuzzy_pool_table is bias_data
+                and SourceBiasService._fuzzy_pool_pid == os.getpid()):
+            return pool
+        
+        with SourceBiasService._fuzzy_pool_lock:
+            pool = SourceBiasService._fuzzy_pool
+            if (pool is not None and not pool.broken and SourceBiasService._fuzzy_pool_table is bias_data
+                    and SourceBiasService._fuzzy_pool_pid == os.getpid()):
+                return pool
+            # The processes of a pool created before a fork belong to the parent
+            if pool is not None and SourceBiasService._fuzzy_pool_pid == os.getpid():
+                pool.shutdown()
+            pool = FuzzyPool(bias_data.keys(), SourceBiasService.FUZZY_POOL_WORKERS, FUZZY_POOL_MAX_PENDING)
+            SourceBiasService._fuzzy_pool = pool
+            SourceBiasService._fuzzy_pool_table = bias_data
+            SourceBiasService._fuzzy_pool_pid = os.getpid()
+            return pool
+    
     @staticmethod
     def find_closest_source_matches(source, n=3):
         """
@@ -227,6 +579,20 @@ class SourceBiasService:
         liked_sources = SourceBiasService.get_user_liked_sources(email)
         disliked_sources = SourceBiasService.get_user_disliked_sources(email)
         
+        return SourceBiasService.political_profile_from_sources(liked_sources, disliked_sources)
+    
+    @staticmethod
+    def political_profile_from_sources(liked_sources, disliked_sources):
+        """
+        Calculate a political profile from already fetched liked and disliked sources
+        
+        Args:
+            liked_sources (dict): Source name -> count of likes
+            disliked_sources (dict): Source name -> count of dislikes
+            
+        Returns:
+            dict: Political profile with bias scores and numeric stance
+        """
         if not liked_sources and not disliked_sources:
             return None
             
@@ -237,9 +603,11 @@ class SourceBiasService:
         # Running sum for calculating the weighted average stance
         weighted_stance_sum = 0
         
+        biases = SourceBiasService.resolve_many(list(liked_sources) + list(disliked_sources))
+        
         # Process liked sources - positive contribution to stance
         for source, like_count in liked_sources.items():
-            bias, confidence = SourceBiasService.get_source_bias(source)
+            bias, confidence = biases[source]
             
             # Skip sources with no bias data or low confidence
             if not bias or confidence < 0.35:
@@ -257,7 +625,7 @@ class SourceBiasService:
 
         # Process disliked sources - negative contribution to stance
         for source, dislike_count in disliked_sources.items():
-            bias, confidence = SourceBiasService.get_source_bias(source)
+            bias, confidence = biases[source]
             
             # Skip sources with no bias data or low confidence
             if not bias or confidence < 0.35:
@@ -357,6 +725,20 @@ class SourceBiasService:
         if survey_responses:
             survey_profile = SourceBiasService.get_political_stance_from_survey(survey_responses)
         
+        return SourceBiasService.combine_political_profiles(likes_profile, survey_profile)
+    
+    @staticmethod
+    def combine_political_profiles(likes_profile, survey_profile):
+        """
+        Combine the likes-based and survey-based profiles
+        
+        Args:
+            likes_profile (dict): Profile from liked sources, or None
+            survey_profile (dict): Profile from survey responses, or None
+            
+        Returns:
+            dict: Combined political profile, or None if both are missing
+        """
         # If we don't have either profile, return None
         if not likes_profile and not survey_profile:
             return None
@@ -0,0 +1,224 @@
+"""
+Immutable values shared by the workers of a node through memory-mapped files
+
+A snapshot is built by one worker, serialized once and published in a file
+under SHARED_CACHE_DIR (a tmpfs such as /dev/shm by default); every worker
+maps that file read-only and decodes its value from the mapping, so the
+bytes exist once per node and a new worker attaches in milliseconds
+instead of rebuilding the value.
+
+The files live in a directory of SHARED_CACHE_DIR private to the user the
+server runs as (mode 0700), and a file is only attached when that user
+owns it and nobody else can write it. Payloads are plain columns decoded
+by struct (see source_bias_artifact.py and ArticleStore.to_bytes), never
+pickles, so a snapshot cannot run code in the workers that attach it.
+
+    [ header: magic, version, payload length, publish time ][ payload ]
+
+Publishing writes a new file and renames it over the old one: workers
+still using the previous mapping keep a consistent view, and pick up the
+new version (a higher header version, in a new inode) the next time they
+check, at most every SHARED_CACHE_CHECK_INTERVAL seconds.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import stat
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from config import SHARED_CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    # Not on POSIX: every worker keeps its own copy
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PRSNAP1\0'
+HEADER = struct.Struct('<8sQQd')
+
+# Result of the check of the private directory, made once per process
+_directory_checked = None
+
+def _private(status):
+    """
+    Whether a file or directory is owned by this user and closed to the others
+    """
+    return status.st_uid == os.getuid() and not status.st_mode & 0o077
+
+def _directory():
+    return os.path.join(SHARED_CACHE_DIR, f"publicripple-{os.getuid()}")
+
+def available():
+    """
+    Check whether snapshots can be shared on this platform
+
+    Creates the private directory of this user in SHARED_CACHE_DIR; sharing
+    is off when it exists but is not a directory owned by this user with
+    mode 0700 (another user could otherwise plant or replace snapshots).
+    """
+    global _directory_checked
+    if fcntl is None:
+        return False
+    if _directory_checked is None:
+        directory = _directory()
+        try:
+            try:
+                os.mkdir(directory, 0o700)
+            except FileExistsError:
+                pass
+            # lstat: a symlink planted under the expected name is refused
+            status = os.lstat(directory)
+            _directory_checked = stat.S_ISDIR(status.st_mode) and _private(status)
+            if not _directory_checked:
+                logger.error(f"Not sharing caches between workers: {directory} must be a directory "
+                             "owned by the server's user with mode 0700")
+        except OSError as e:
+            logger.error(f"Not sharing caches between workers: {e}")
+            _directory_checked = False
+    return _directory_checked
+
+class SharedSnapshot:
+    """
+    One named value, published by any worker and attached by all of them
+    """
+
+    def __init__(self, path, decode, check_interval=1.0):
+        """
+        Args:
+            path (str): Snapshot file
+            decode (callable): Read-only payload memoryview -> value; the
+                               value may keep views of the payload
+            check_interval (float): Seconds between checks for a new version
+        """
+        self.path = path
+        self.decode = decode
+        self.check_interval = check_interval
+        self.version = 0
+        self.published_at = None
+        self._value = None
+        self._inode = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Get the current value, mapping a newer published version when there is one
+
+        Returns:
+            tuple: (value, publish time in epoch seconds), or (None, None)
+                   when nothing has been published
+        """
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.check_interval:
+                    self._attach()
+                    self._checked_at = time.monotonic()
+        return self._value, self.published_at
+
+    def refresh(self):
+        """
+        Check for a new version on the next get()
+        """
+        self._checked_at = float('-inf')
+
+    def _attach(self):
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            status = os.fstat(fd)
+            if status.st_ino == self._inode:
+                return
+            if not stat.S_ISREG(status.st_mode) or not _private(status):
+                logger.error(f"Ignoring snapshot {self.path}: not a file owned by the server's user "
+                             "and private to it")
+                return
+            mapping = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+        view = memoryview(mapping)
+        magic, version, length, published_at = HEADER.unpack_from(view)
+        if magic != MAGIC or HEADER.size + length > len(view):
+            # Written by another format version: rebuilt by the next publish
+            return
+        # The old mapping is released once nothing uses its value any more
+        self._value = self.decode(view[HEADER.size:HEADER.size + length])
+        self._inode, self.version, self.published_at = status.st_ino, version, published_at
+
+    def publish(self, payload):
+        """
+        Publish a new version of the value
+
+        Args:
+            payload (bytes): Serialized value
+
+        Returns:
+            int: The version published
+        """
+        version = self._published_version() + 1
+        temporary = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with os.fdopen(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+                f.write(HEADER.pack(MAGIC, version, len(payload), time.time()))
+                f.write(payload)
+            os.replace(temporary, self.path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        self.refresh()
+        return version
+
+    def _published_version(self):
+        try:
+            with open(self.path, 'rb') as f:
+                magic, version, _, _ = HEADER.unpack(f.read(HEADER.size))
+            return version if magic == MAGIC else 0
+        except (FileNotFoundError, struct.error):
+            return 0
+
+    @contextmanager
+    def build_lock(self, blocking=True):
+        """
+        Hold the node-wide lock for building this value
+
+        Args:
+            blocking (bool): Wait for the lock instead of giving up
+
+        Yields:
+            bool: True if the lock is held; False if another process holds it
+                  (only when not blocking)
+        """
+        with os.fdopen(os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def snapshot_path(name, key):
+    """
+    File of a snapshot, unique to the data it is built from
+
+    Args:
+        name (str): Kind of value ('source-bias', 'articles')
+        key (str): Identity of the data source, so that deployments sharing
+                   SHARED_CACHE_DIR do not read each other's values
+
+    Returns:
+        str: Path in this user's directory of SHARED_CACHE_DIR
+    """
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return os.path.join(_directory(), f"{name}-{digest}.snap")
@@ -0,0 +1,29 @@
+"""
+Storage backends behind DatabaseHandler
+
+STORAGE_BACKEND selects the implementation: 'postgres' (the default) or
+'sqlite', an embedded database at SQLITE_PATH for tests, benchmarks and
+single-node deployments.
+"""
+from storage.base import StorageBackend, INSERTED, UPDATED, UNCHANGED, NOT_FOUND, NO_USER
+from storage.registry import get_backend, set_backend
+
+def create_backend(name, **options):
+    """
+    Create a storage backend by name
+
+    Args:
+        name (str): 'postgres' or 'sqlite'
+        options: Backend settings (path for sqlite)
+
+    Returns:
+        StorageBackend: The backend
+    """
+    if name == 'postgres':
+        from storage.postgres import PostgresBackend
+        return PostgresBackend()
+    if name == 'sqlite':
+        from config import SQLITE_PATH
+        from storage.sqlite import SQLiteBackend
+        return SQLiteBackend(options.get('path', SQLITE_PATH))
+    raise ValueError(f"Unknown storage backend: {name}")
@@ -0,0 +1,310 @@
+"""
+Local read-through catalog of the recent articles
+
+Feed reads only touch the articles added in the last day or two, and those
+change only when articles are ingested. ArticleCatalog keeps a copy of them
+in a SQLite file on the node (ARTICLE_CATALOG_PATH, shared by the node's
+worker processes) and serves get_today_articles / get_recent_articles from
+it instead of the articles database.
+It holds the fields the source backend returns (`article_fields`).
+
+Sync is incremental. The source stamps every insert and content change in
+articles.updated_at (migrations/003_articles_updated_at.sql) and the catalog
+keeps the highest stamp it has copied as its high-water mark. A sync copies
+the rows stamped since the mark, minus ARTICLE_CATALOG_OVERLAP seconds: a
+stamp is taken before its transaction commits, so a slow writer can commit
+rows older than the mark. Every ARTICLE_CATALOG_RECONCILE_INTERVAL seconds
+the rows deleted from the source are dropped, and rows added more than
+ARTICLE_CATALOG_RETENTION_DAYS ago are pruned.
+
+Reads sync first once the last sync is ARTICLE_CATALOG_SYNC_INTERVAL old;
+one thread of one process does it while the others keep reading. They
+return None, for the caller to read the source instead, when the catalog
+has no matching rows or has not synced for ARTICLE_CATALOG_MAX_STALENESS
+seconds (before the first sync, or while the source is unreachable).
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+# Registers the datetime adapter and TIMESTAMP converter
+import storage.sqlite  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which a sync claimed by a process that died is taken over
+CLAIM_TIMEOUT = 300
+
+# Types of the article fields that are not TEXT
+COLUMN_TYPES = {
+    'id': 'TEXT PRIMARY KEY',
+    'article_date': 'TIMESTAMP',
+    'date_added': 'TIMESTAMP NOT NULL'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    {columns},
+    updated_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS articles_date_added_day_idx ON articles (date(date_added), date_added DESC);
+
+-- A single row: the high-water mark, and when (epoch seconds) the last sync
+-- and reconciliation completed and until when a process holds the sync
+CREATE TABLE IF NOT EXISTS sync_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    high_water TIMESTAMP,
+    synced_at REAL NOT NULL DEFAULT 0,
+    reconciled_at REAL NOT NULL DEFAULT 0,
+    claimed_until REAL NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO sync_state (id) VALUES (1);
+"""
+
+UPSERT = """
+    INSERT INTO articles ({columns}, updated_at)
+    VALUES ({placeholders})
+    ON CONFLICT (id) DO UPDATE SET
+        {updates},
+        updated_at = excluded.updated_at
+"""
+
+class ArticleCatalog:
+    """
+    SQLite copy of the recent articles, synced from a PostgresBackend
+    """
+
+    def __init__(self, path, source, sync_interval=5, max_staleness=60, overlap=60,
+                 retention_days=2, reconcile_interval=300, batch_size=1000):
+        """
+        Args:
+            path (str): SQLite file of the catalog
+            source (PostgresBackend): Backend the articles are copied from; the
+                                      catalog keeps its article_fields
+            sync_interval (float): Seconds between syncs
+            max_staleness (float): Seconds since the last sync after which reads fall back
+            overlap (float): Seconds before the high-water mark that every sync re-reads
+            retention_days (float): Age, by date_added, of the articles kept
+            reconcile_interval (float): Seconds between checks for deleted articles
+            batch_size (int): Articles fetched per query
+        """
+        self.path = path
+        self.source = source
+        self.columns = tuple(source.article_fields)
+        self.sync_interval = sync_interval
+        self.max_staleness = max_staleness
+        self.overlap = overlap
+        self.retention_days = retention_days
+        self.reconcile_interval = reconcile_interval
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._sync_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection must not be reused in a forked child
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA.format(columns=',\n    '.join(
+                        f"{column} {COLUMN_TYPES.get(column, 'TEXT')}" for column in self.columns
+                    )))
+                    self._schema_ready = True
+        return conn
+
+    def _state(self, conn):
+        return conn.execute(
+            "SELECT high_water, synced_at, reconciled_at FROM sync_state WHERE id = 1"
+        ).fetchone()
+
+    def sync(self, force=False):
+        """
+        Copy the articles changed since the last sync
+
+        Args:
+            force (bool): Sync even if the last sync is recent (after an ingest)
+
+        Returns:
+            int: Number of articles copied, or None if the sync was skipped
+                 (recent, running elsewhere) or failed
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return None
+        try:
+            conn = self._connect()
+            started = time.time()
+            # One process of the node syncs at a time; the claim expires
+            # in case that process dies
+            with conn:
+                claimed = conn.execute(
+                    "UPDATE sync_state SET claimed_until = ? "
+                    "WHERE id = 1 AND claimed_until <= ? AND synced_at <= ?",
+                    (started + CLAIM_TIMEOUT, started, started if force else started - self.sync_interval)
+                ).rowcount == 1
+            if not claimed:
+                return None
+
+            try:
+                copied = self._sync(conn, started)
+            except Exception as e:
+                # Retry after sync_interval rather than on every read
+                logger.warning(f"Article catalog sync failed: {e}")
+                with conn:
+                    conn.execute("UPDATE sync_state SET claimed_until = ? WHERE id = 1",
+                                 (time.time() + self.sync_interval,))
+                return None
+            with conn:
+                conn.execute("UPDATE sync_state SET claimed_until = 0 WHERE id = 1")
+            return copied
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self, conn, started):
+        high_water, _, reconciled_at = self._state(conn)
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        since = high_water - timedelta(seconds=self.overlap) if high_water else None
+        after_id = None
+        copied = 0
+
+        while True:
+            rows = self.source.get_article_changes(cutoff, since, after_id, self.batch_size)
+            if rows:
+                last = rows[-1]
+                since, after_id = last['updated_at'], last['id']
+                if high_water is None or last['updated_at'] > high_water:
+                    high_water = last['updated_at']
+                with conn:
+                    conn.executemany(self._upsert(), [
+                        tuple(row[column] for column in self.columns) + (row['updated_at'],) for row in rows
+                    ])
+                    conn.execute("UPDATE sync_state SET high_water = ? WHERE id = 1", (high_water,))
+                copied += len(rows)
+            if len(rows) < self.batch_size:
+                break
+
+        with conn:
+            conn.execute("DELETE FROM articles WHERE date_added < ?", (cutoff,))
+
+        if started - reconciled_at >= self.reconcile_interval:
+            source_ids = self.source.get_article_ids(cutoff)
+            deleted = [
+                (article_id,) for (article_id,) in conn.execute("SELECT id FROM articles")
+                if article_id not in source_ids
+            ]
+            with conn:
+                conn.executemany("DELETE FROM articles WHERE id = ?", deleted)
+                conn.execute("UPDATE sync_state SET reconciled_at = ? WHERE id = 1", (started,))
+            if deleted:
+                logger.info(f"Article catalog dropped {len(deleted)} articles deleted from the source")
+
+        with conn:
+            conn.execute("UPDATE sync_state SET synced_at = ? WHERE id = 1", (started,))
+        return copied
+
+    def _upsert(self):
+        return UPSERT.format(
+            columns=', '.join(self.columns),
+            placeholders=', '.join('?' * (len(self.columns) + 1)),
+            updates=', '.join(f'{column} = excluded.{column}' for column in self.columns[1:])
+        )
+
+    def _read(self, where, params, categories, order_limit='', order_params=()):
+        try:
+            conn = self._connect()
+            synced_at = self._state(conn)[1]
+            if time.time() - synced_at >= self.sync_interval:
+                self.sync()
+                synced_at = self._state(conn)[1]
+            if time.time() - synced_at > self.max_staleness:
+                return None
+
+            if categories:
+                where += f" AND category IN ({', '.join(['?'] * len(categories))})"
+                params = params + list(categories)
+            cursor = conn.execute(f"SELECT {', '.join(self.columns)} FROM articles WHERE {where} {order_limit}",
+                                  params + list(order_params))
+            rows = [dict(zip(self.columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.warning(f"Article catalog read failed: {e}")
+            return None
+        return rows or None
+
+    def get_today_articles(self, categories=None):
+        """
+        Get articles added today, optionally filtered by categories
+
+        Args:
+            categories (list, optional): List of categories to filter by
+
+        Returns:
+            list: List of article dictionaries, or None to read the source
+        """
+        today = datetime.now().date().isoformat()
+        return self._read("date(date_added) = ?", [today], categories)
+
+    def get_recent_articles(self, limit=20, categories=None):
+        """
+        Get recent articles, optionally filtered by categories, with limit
+
+        Args:
+            limit (int): Maximum number of articles to return
+            categories (list, optional): List of categories to filter by
+
+        Returns:
+            list: List of article dictionaries, or None to read the source
+        """
+        today = datetime.now().date().isoformat()
+        return self._read("date(date_added) = ?", [today], categories,
+                          "ORDER BY date_added DESC LIMIT ?", (limit,))
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """
+    Get the node's article catalog
+
+    Returns:
+        ArticleCatalog: The catalog, or None when ARTICLE_CATALOG_ENABLED is
+                        off or the storage backend is not PostgreSQL
+    """
+    global _catalog
+
+    from storage import get_backend
+    backend = get_backend()
+    if backend.name != 'postgres':
+        return None
+
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                from config import (
+                    ARTICLE_CATALOG_ENABLED, ARTICLE_CATALOG_PATH, ARTICLE_CATALOG_SYNC_INTERVAL,
+                    ARTICLE_CATALOG_MAX_STALENESS, ARTICLE_CATALOG_OVERLAP, ARTICLE_CATALOG_RETENTION_DAYS,
+                    ARTICLE_CATALOG_RECONCILE_INTERVAL, ARTICLE_CATALOG_BATCH_SIZE
+                )
+                _catalog = ArticleCatalog(
+                    ARTICLE_CATALOG_PATH, backend,
+                    sync_interval=ARTICLE_CATALOG_SYNC_INTERVAL,
+                    max_staleness=ARTICLE_CATALOG_MAX_STALENESS,
+                    overlap=ARTICLE_CATALOG_OVERLAP,
+                    retention_days=ARTICLE_CATALOG_RETENTION_DAYS,
+                    reconcile_interval=ARTICLE_CATALOG_RECONCILE_INTERVAL,
+                    batch_size=ARTICLE_CATALOG_BATCH_SIZE
+                ) if ARTICLE_CATALOG_ENABLED else False
+    return _catalog or None
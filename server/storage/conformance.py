@@ -0,0 +1,328 @@
+"""
+Conformance checks shared by the storage backends
+
+Runs the same scenarios against a backend and reports every difference
+from the behavior DatabaseHandler documents. Rows are created under a
+random prefix and removed afterwards, so the checks can run against a
+database that holds real data.
+
+A storage package that extends the backends lists the modules checking its
+extra methods in CONFORMANCE_EXTRAS; each has a CHECKS list and a
+cleanup(backend, scenario) function.
+
+Run from the server folder:
+    python -m storage.conformance --backend sqlite [--path /tmp/conformance.db]
+    python -m storage.conformance --backend postgres
+"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+import storage
+from storage import create_backend, StorageBackend, INSERTED, UPDATED, UNCHANGED, NOT_FOUND, NO_USER
+
+_checks = []
+
+def check(func):
+    _checks.append(func)
+    return func
+
+def _article(article_id, headline='Headline'):
+    return {
+        'id': article_id,
+        'headline': headline,
+        'url': f'https://example.com/{article_id}',
+        'source': 'Example News',
+        'abstract': 'Abstract',
+        'article_date': datetime(2024, 1, 1, 12, 0),
+        'image_url': None
+    }
+
+class Scenario:
+    """
+    Unique names for the rows one run creates
+    """
+
+    def __init__(self):
+        self.prefix = f"conformance-{uuid.uuid4().hex[:8]}"
+        self.emails = []
+        self.article_ids = []
+
+    def email(self):
+        email = f"{self.prefix}-{len(self.emails)}@conformance.local"
+        self.emails.append(email)
+        return email
+
+    def article_id(self):
+        article_id = f"{self.prefix}-article-{len(self.article_ids)}"
+        self.article_ids.append(article_id)
+        return article_id
+
+def _execute(backend, query, params):
+    # Raw write for data the backend API does not set
+    if backend.name == 'postgres':
+        from db import get_db_connection
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            conn.commit()
+            cursor.close()
+    elif backend.name == 'sqlite':
+        conn = backend._connect()
+        with conn:
+            conn.execute(query.replace('%s', '?'), params)
+
+def _fetchall(backend, query, params):
+    # Raw read of what the backend API does not return
+    if backend.name == 'postgres':
+        from db import get_db_connection
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = [tuple(row) for row in cursor.fetchall()]
+            conn.commit()
+            cursor.close()
+        return rows
+    return [tuple(row) for row in backend._connect().execute(query.replace('%s', '?'), params).fetchall()]
+
+@check
+def users(backend, scenario):
+    email = scenario.email()
+    assert not backend.email_exists(email)
+    assert backend.add_user(email, 'secret') is True
+    assert backend.email_exists(email)
+    assert backend.add_user(email, 'other') is False
+
+@check
+def survey_responses(backend, scenario):
+    email = scenario.email()
+    assert backend.get_survey_responses(email) is False
+    assert backend.insert_survey_responses(email, True, True, True, True, True) == NO_USER
+    assert backend.update_survey_responses(email, True, True, True, True, True) == NO_USER
+    assert backend.upsert_survey_responses(email, True, True, True, True, True) == NO_USER
+    backend.add_user(email, 'secret')
+    assert backend.get_survey_responses(email) is None
+    assert backend.update_survey_responses(email, True, True, True, True, True) == NOT_FOUND
+
+    assert backend.insert_survey_responses(email, True, False, True, False, True) == INSERTED
+    assert tuple(backend.get_survey_responses(email)) == (email, True, False, True, False, True)
+    assert backend.insert_survey_responses(email, True, True, True, True, True) == UNCHANGED
+    assert tuple(backend.get_survey_responses(email)) == (email, True, False, True, False, True)
+
+    assert backend.update_survey_responses(email, False, False, False, False, False) == UPDATED
+    assert tuple(backend.get_survey_responses(email)) == (email, False, False, False, False, False)
+
+    assert backend.upsert_survey_responses(email, True, True, False, False, True) == UPDATED
+    assert tuple(backend.get_survey_responses(email)) == (email, True, True, False, False, True)
+    other = scenario.email()
+    backend.add_user(other, 'secret')
+    assert backend.upsert_survey_responses(other, False, True, False, True, False) == INSERTED
+    assert tuple(backend.get_survey_responses(other)) == (other, False, True, False, True, False)
+
+@check
+def articles(backend, scenario):
+    first, second = scenario.article_id(), scenario.article_id()
+    assert backend.insert_articles([_article(first), _article(second)]) is True
+
+    today = {article['id']: article for article in backend.get_today_articles()}
+    assert first in today and second in today
+    assert today[first]['headline'] == 'Headline'
+    assert today[first]['source'] == 'Example News'
+    assert isinstance(today[first]['date_added'], datetime)
+    assert set(today[first]) == set(backend.article_fields)
+    versioned = 'row_version' in backend.article_fields
+    if versioned:
+        assert today[first]['row_version'] is not None
+
+    # An upsert replaces the content and changes the row version
+    backend.insert_articles([_article(first, 'Updated')])
+    updated = {article['id']: article for article in backend.get_today_articles()}
+    assert updated[first]['headline'] == 'Updated'
+    if versioned:
+        assert str(updated[first]['row_version']) != str(today[first]['row_version'])
+        assert str(updated[second]['row_version']) == str(today[second]['row_version'])
+
+    # insert_articles does not set a category
+    assert not any(article['id'] in (first, second)
+                   for article in backend.get_today_articles([f'{scenario.prefix}-category']))
+
+    recent = backend.get_recent_articles(limit=1)
+    assert len(recent) == 1
+    assert set(recent[0]) == set(today[first])
+
+@check
+def feed_and_likes(backend, scenario):
+    email = scenario.email()
+    backend.add_user(email, 'secret')
+    liked, disliked = scenario.article_id(), scenario.article_id()
+    backend.insert_articles([_article(liked), _article(disliked)])
+
+    assert backend.insert_feed(email, 'left', liked) is True
+    assert backend.insert_feed_without_duplicate(email, 'left', disliked) == INSERTED
+    assert backend.insert_feed_without_duplicate(email, 'left', disliked) == UNCHANGED
+    assert backend.insert_feed_without_duplicate(email, 'left', liked) == UNCHANGED
+    assert backend.get_liked_sources_by_email(email) == {}
+
+    assert backend.update_likes(email, liked, 'left', 1) == UPDATED
+    assert backend.update_likes(email, disliked, 'left', -1) == UPDATED
+    assert backend.update_likes(email, liked, 'right', 1) == NOT_FOUND
+    assert backend.get_liked_sources_by_email(email) == {'Example News': 1}
+    # A duplicate impression would count the dislike twice
+    assert backend.get_disliked_sources_by_email(email) == {'Example News': 1}
+
+    # One statement for several feeds; existing and repeated rows are skipped
+    assert backend.insert_feed_batch_without_duplicate(email, []) == 0
+    assert backend.insert_feed_batch_without_duplicate(
+        email, [(liked, 'left'), (liked, 'right'), (liked, 'right'), (disliked, 'center')]
+    ) == 2
+    assert backend.insert_feed_batch_without_duplicate(email, [(liked, 'right')]) == 0
+    # Each impression is stored under its own article and flag
+    assert set(_fetchall(backend, "SELECT article_id, flag FROM feed WHERE email = %s", (email,))) == {
+        (liked, 'left'), (liked, 'right'), (disliked, 'left'), (disliked, 'center')
+    }
+
+@check
+def concurrent_writes(backend, scenario):
+    email = scenario.email()
+    backend.add_user(email, 'secret')
+    article_id = scenario.article_id()
+    backend.insert_articles([_article(article_id)])
+
+    # Racing writers must not create duplicates, and exactly one of them
+    # reports the row as its own
+    results = []
+    barrier = threading.Barrier(8)
+
+    def write():
+        barrier.wait()
+        results.append(backend.insert_feed_without_duplicate(email, 'left', article_id))
+        results.append(backend.upsert_survey_responses(email, True, True, True, True, True))
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(INSERTED) == 2, results
+    assert results.count(UNCHANGED) == 7, results
+    assert results.count(UPDATED) == 7, results
+    backend.update_likes(email, article_id, 'left', 1)
+    assert backend.get_liked_sources_by_email(email) == {'Example News': 1}
+
+@check
+def article_catalog(backend, scenario):
+    # The local catalog copies from PostgreSQL only
+    if backend.name != 'postgres':
+        return
+    from storage.catalog import ArticleCatalog
+
+    catalog = ArticleCatalog(os.path.join(tempfile.mkdtemp(), 'catalog.db'), backend, reconcile_interval=0)
+    kept, deleted = scenario.article_id(), scenario.article_id()
+    backend.insert_articles([_article(kept), _article(deleted)])
+    assert catalog.sync() >= 2
+
+    # Served as the source serves them
+    source = {article['id']: article for article in backend.get_today_articles()}
+    local = {article['id']: article for article in catalog.get_today_articles()}
+    assert local[kept] == source[kept]
+
+    # Changes and deletions are picked up by the next sync
+    backend.insert_articles([_article(kept, 'Updated')])
+    _execute(backend, "DELETE FROM articles WHERE id = %s", (deleted,))
+    assert catalog.sync() is None
+    assert catalog.sync(force=True) >= 1
+    local = {article['id']: article for article in catalog.get_recent_articles(limit=100000)}
+    assert local[kept]['headline'] == 'Updated'
+    assert local[kept] == {article['id']: article for article in backend.get_today_articles()}[kept]
+    assert deleted not in local
+
+    # A catalog that cannot sync sends reads to the source
+    class Unreachable(StorageBackend):
+        def get_article_changes(self, *args):
+            raise ConnectionError('source unreachable')
+
+    assert ArticleCatalog(os.path.join(tempfile.mkdtemp(), 'catalog.db'), Unreachable()).get_today_articles() is None
+
+def _cleanup(backend, scenario):
+    if backend.name == 'postgres':
+        from db import get_db_connection
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM feed WHERE email = ANY(%s) OR article_id = ANY(%s)",
+                           (scenario.emails, scenario.article_ids))
+            cursor.execute("DELETE FROM survey_responses WHERE email = ANY(%s)", (scenario.emails,))
+            cursor.execute("DELETE FROM userdata WHERE email = ANY(%s)", (scenario.emails,))
+            cursor.execute("DELETE FROM articles WHERE id = ANY(%s)", (scenario.article_ids,))
+            conn.commit()
+            cursor.close()
+    elif backend.name == 'sqlite':
+        conn = backend._connect()
+        emails = ', '.join('?' * len(scenario.emails))
+        ids = ', '.join('?' * len(scenario.article_ids))
+        with conn:
+            conn.execute(f"DELETE FROM feed WHERE email IN ({emails}) OR article_id IN ({ids})",
+                         scenario.emails + scenario.article_ids)
+            conn.execute(f"DELETE FROM survey_responses WHERE email IN ({emails})", scenario.emails)
+            conn.execute(f"DELETE FROM userdata WHERE email IN ({emails})", scenario.emails)
+            conn.execute(f"DELETE FROM articles WHERE id IN ({ids})", scenario.article_ids)
+
+def _extras():
+    return [importlib.import_module(name) for name in getattr(storage, 'CONFORMANCE_EXTRAS', ())]
+
+def checks():
+    """
+    Get the checks run against every backend, extras included
+    """
+    return _checks + [func for module in _extras() for func in module.CHECKS]
+
+def run(backend):
+    """
+    Run every check against a backend
+
+    Args:
+        backend (StorageBackend): Backend to check
+
+    Returns:
+        list: (check name, error) tuples for the failed checks
+    """
+    failures = []
+    scenario = Scenario()
+    try:
+        for func in checks():
+            try:
+                func(backend, scenario)
+            except Exception as e:
+                failures.append((func.__name__, e))
+    finally:
+        _cleanup(backend, scenario)
+        for module in _extras():
+            module.cleanup(backend, scenario)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backend', choices=['sqlite', 'postgres'], required=True)
+    parser.add_argument('--path', help='SQLite database file (default: a temporary file)')
+    args = parser.parse_args()
+
+    if args.backend == 'sqlite':
+        path = args.path or os.path.join(tempfile.mkdtemp(), 'conformance.db')
+        backend = create_backend('sqlite', path=path)
+    else:
+        backend = create_backend('postgres')
+
+    failures = run(backend)
+    for name, error in failures:
+        print(f"FAIL {name}: {type(error).__name__} {error}")
+    total = len(checks())
+    print(f"{backend.name}: {total - len(failures)}/{total} checks passed")
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
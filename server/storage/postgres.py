@@ -0,0 +1,604 @@
+import psycopg2
+import psycopg2.errors
+import psycopg2.extras
+from datetime import datetime
+from db import get_db_connection
+from storage.base import StorageBackend, INSERTED, UPDATED, UNCHANGED, NOT_FOUND, NO_USER
+
+# Statements also run by the async data path (services/async_database_handler.py)
+EMAIL_EXISTS = "SELECT 1 FROM userdata WHERE email = %s"
+SURVEY_RESPONSES = "SELECT * FROM survey_responses WHERE email = %s"
+_SOURCES_BY_LIKES = """
+    SELECT a.source, COUNT(*) as like_count
+    FROM feed f
+    JOIN articles a ON f.article_id = a.id
+    WHERE f.email = %s AND {condition}
+    GROUP BY a.source
+    ORDER BY like_count DESC
+"""
+LIKED_SOURCES = _SOURCES_BY_LIKES.format(condition="f.likes > 0")
+DISLIKED_SOURCES = _SOURCES_BY_LIKES.format(condition="f.likes < 0")
+INSERT_FEED_BATCH = """
+    INSERT INTO feed (email, article_id, flag, access_date, likes)
+    SELECT DISTINCT %s, impression.article_id, impression.flag, %s::timestamp, 0
+    FROM unnest(%s::text[], %s::text[]) AS impression (article_id, flag)
+    ON CONFLICT (email, article_id, flag) DO NOTHING
+"""
+
+def feed_batch_params(email, impressions):
+    """
+    Parameters of INSERT_FEED_BATCH
+
+    Args:
+        email (str): User email
+        impressions (list): (article ID, flag) tuples
+
+    Returns:
+        tuple: The parameters
+    """
+    return (email, datetime.now(), [article_id for article_id, _ in impressions],
+            [flag for _, flag in impressions])
+
+class PostgresBackend(StorageBackend):
+    """
+    PostgreSQL storage, through the per-process pool in db.py
+    """
+    name = 'postgres'
+    # Explicit list, so that bookkeeping columns (updated_at) stay out of the API
+    article_columns = "id, headline, url, source, abstract, article_date, date_added, image_url, category, xmin::text AS row_version"
+    
+    def _articles_connection(self):
+        """
+        Get a connection for the article reads
+        """
+        return get_db_connection()
+    
+    def _articles_written(self, conn):
+        """
+        Called with the connection that wrote articles, once it has committed
+        """
+    
+    def email_exists(self, email):
+        """
+        Check if an email exists in the userdata table
+        
+        Args:
+            email (str): Email to check
+            
+        Returns:
+            bool: True if email exists, False otherwise
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(EMAIL_EXISTS, (email,))
+            result = cursor.fetchone() is not None
+            
+            cursor.close()
+        
+        return result
+
+    def get_survey_responses(self, email):
+        """
+        Get survey responses for a specific email
+        
+        Args:
+            email (str): Email to get survey responses for
+            
+        Returns:
+            tuple: Survey responses or False if email doesn't exist
+        """
+        if not self.email_exists(email):
+            return False
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(SURVEY_RESPONSES, (email,))
+            result = cursor.fetchone()
+            
+            cursor.close()
+        
+        return result
+
+    def insert_articles(self, articles):
+        """
+        Insert multiple articles into the articles table
+        
+        Args:
+            articles (list): List of article dictionaries
+            
+        Returns:
+            bool: True if insert was successful
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            for article in articles:
+                cursor.execute(
+                    """
+                    INSERT INTO articles (id, headline, url, source, abstract, article_date, date_added, image_url)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (id) DO UPDATE SET
+                        headline = EXCLUDED.headline,
+                        url = EXCLUDED.url,
+                        source = EXCLUDED.source,
+                        abstract = EXCLUDED.abstract,
+                        article_date = EXCLUDED.article_date
+                    """,
+                    (
+                        article['id'],
+                        article['headline'],
+                        article['url'],
+                        article['source'],
+                        article['abstract'],
+                        article['article_date'],
+                        datetime.now(),
+                        article['image_url']
+                    )
+                )
+            
+            conn.commit()
+            cursor.close()
+            self._articles_written(conn)
+        
+        return True
+
+    def insert_feed(self, email, flag, article_id):
+        """
+        Insert a record into the feed table
+        
+        Args:
+            email (str): User email
+            flag (str): Feed flag
+            article_id (str): Article ID
+            
+        Returns:
+            bool: True if insert was successful
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                INSERT INTO feed (email, article_id, flag, access_date, likes)
+                VALUES (%s, %s, %s, %s, 0)
+                """,
+                (email, article_id, flag, datetime.now())
+            )
+            
+            conn.commit()
+            cursor.close()
+        
+        return True
+
+    def update_likes(self, email, article_id, flag, value):
+        """
+        Update the likes count for a feed item
+        
+        Args:
+            email (str): User's Email
+            article_id (str): Article ID
+            flag (str): Feed type
+            value (str): New likes value
+            
+        Returns:
+            str: UPDATED, or NOT_FOUND if the article is not in the user's feed
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                UPDATE feed
+                SET likes = %s
+                WHERE email = %s
+                AND flag = %s
+                AND article_id = %s
+                """,
+                (value, email, flag, article_id)
+            )
+            
+            rows_updated = cursor.rowcount
+            
+            conn.commit()
+            cursor.close()
+        
+        return UPDATED if rows_updated > 0 else NOT_FOUND
+
+    def add_user(self, email, password):
+        """
+        Add a new user to the database
+        
+        Args:
+            email (str): User email
+            password (str): User password
+            
+        Returns:
+            bool: True if user was added, False if email already exists
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                INSERT INTO userdata (email, password)
+                VALUES (%s, %s)
+                ON CONFLICT (email) DO NOTHING
+                """,
+                (email, password)
+            )
+            
+            result = cursor.rowcount > 0
+            
+            conn.commit()
+            cursor.close()
+        
+        return result
+
+    def insert_survey_responses(self, email, q1, q2, q3, q4, q5):
+        """
+        Insert survey responses for a user
+        
+        Args:
+            email (str): User email
+            q1-q5 (bool): Survey responses
+            
+        Returns:
+            str: INSERTED, UNCHANGED if responses already exist, or NO_USER
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                cursor.execute(
+                    """
+                    INSERT INTO survey_responses (email, q1, q2, q3, q4, q5)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (email) DO NOTHING
+                    """,
+                    (email, q1, q2, q3, q4, q5)
+                )
+                
+                result = INSERTED if cursor.rowcount > 0 else UNCHANGED
+                conn.commit()
+            except psycopg2.errors.ForeignKeyViolation:
+                # No such user
+                conn.rollback()
+                result = NO_USER
+            
+            cursor.close()
+        
+        return result
+
+    def update_survey_responses(self, email, q1, q2, q3, q4, q5):
+        """
+        Update survey responses for a user
+        
+        Args:
+            email (str): User email
+            q1-q5 (bool): Survey responses
+            
+        Returns:
+            str: UPDATED, NOT_FOUND if no responses exist, or NO_USER
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            # The user lookup rides along in the same statement, so telling the
+            # two misses apart costs no extra round-trip
+            cursor.execute(
+                """
+                WITH updated AS (
+                    UPDATE survey_responses
+                    SET q1 = %s, q2 = %s, q3 = %s, q4 = %s, q5 = %s
+                    WHERE email = %s
+                    RETURNING 1
+                )
+                SELECT EXISTS (SELECT 1 FROM updated),
+                       EXISTS (SELECT 1 FROM userdata WHERE email = %s)
+                """,
+                (q1, q2, q3, q4, q5, email, email)
+            )
+            
+            updated, user_exists = cursor.fetchone()
+            
+            conn.commit()
+            cursor.close()
+        
+        if updated:
+            return UPDATED
+        return NOT_FOUND if user_exists else NO_USER
+
+    def upsert_survey_responses(self, email, q1, q2, q3, q4, q5):
+        """
+        Insert or replace survey responses for a user
+        
+        Args:
+            email (str): User email
+            q1-q5 (bool): Survey responses
+            
+        Returns:
+            str: INSERTED, UPDATED, or NO_USER
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                # xmax is 0 on a freshly inserted row version, and set on one
+                # written by the DO UPDATE branch
+                cursor.execute(
+                    """
+                    INSERT INTO survey_responses (email, q1, q2, q3, q4, q5)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (email) DO UPDATE SET
+                        q1 = EXCLUDED.q1,
+                        q2 = EXCLUDED.q2,
+                        q3 = EXCLUDED.q3,
+                        q4 = EXCLUDED.q4,
+                        q5 = EXCLUDED.q5
+                    RETURNING (xmax = 0) AS inserted
+                    """,
+                    (email, q1, q2, q3, q4, q5)
+                )
+                
+                result = INSERTED if cursor.fetchone()[0] else UPDATED
+                conn.commit()
+            except psycopg2.errors.ForeignKeyViolation:
+                # No such user
+                conn.rollback()
+                result = NO_USER
+            
+            cursor.close()
+        
+        return result
+
+    def get_today_articles(self, categories=None):
+        """
+        Get articles added today, optionally filtered by categories
+        
+        Args:
+            categories (list, optional): List of categories to filter by
+            
+        Returns:
+            list: List of article dictionaries, including the row_version
+                  used by ArticleFragmentCache
+        """
+        with self._articles_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            
+            today = datetime.now().date()
+            
+            if categories:
+                # Assuming articles table has a 'category' column
+                placeholders = ', '.join(['%s'] * len(categories))
+                query = f"""
+                    SELECT {self.article_columns} FROM articles 
+                    WHERE DATE(date_added) = %s 
+                    AND category IN ({placeholders})
+                """
+                params = [today] + categories
+            else:
+                query = f"SELECT {self.article_columns} FROM articles WHERE DATE(date_added) = %s"
+                params = [today]
+                
+            cursor.execute(query, params)
+            result = [dict(row) for row in cursor.fetchall()]
+            
+            cursor.close()
+        
+        return result
+
+    def get_liked_sources_by_email(self, email):
+        """
+        Get sources liked by a user
+        
+        Args:
+            email (str): User email
+            
+        Returns:
+            dict: Source name -> count of likes
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get sources from articles liked by the user
+            cursor.execute(LIKED_SOURCES, (email,))
+            
+            sources = {row[0]: row[1] for row in cursor.fetchall()}
+            
+            cursor.close()
+        
+        return sources
+
+    def get_disliked_sources_by_email(self, email):
+        """
+        Get sources liked by a user
+        
+        Args:
+            email (str): User email
+            
+        Returns:
+            dict: Source name -> count of likes
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(DISLIKED_SOURCES, (email,))
+            
+            sources = {row[0]: row[1] for row in cursor.fetchall()}
+            
+            cursor.close()
+        
+        return sources
+
+    def insert_feed_without_duplicate(self, email, flag, article_id):
+        """
+        Insert article to feed table, avoiding duplicates
+        
+        Args:
+            email (str): User email
+            flag (str): Feed flag
+            article_id (str): Article ID
+            
+        Returns:
+            str: INSERTED, or UNCHANGED if the article is already in the
+                 feed; False if the insert failed
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                # Relies on the unique (email, article_id, flag) index, so
+                # concurrent requests cannot insert the same impression twice
+                cursor.execute(
+                    """
+                    INSERT INTO feed (email, article_id, flag, access_date, likes)
+                    VALUES (%s, %s, %s, %s, 0)
+                    ON CONFLICT (email, article_id, flag) DO NOTHING
+                    """,
+                    (email, article_id, flag, datetime.now())
+                )
+                
+                result = INSERTED if cursor.rowcount > 0 else UNCHANGED
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                result = False
+            
+            cursor.close()
+        
+        return result
+
+    def insert_feed_batch_without_duplicate(self, email, impressions):
+        """
+        Insert several impressions into the feed in one statement, skipping
+        the ones already there
+        
+        Args:
+            email (str): User email
+            impressions (list): (article ID, flag) tuples
+            
+        Returns:
+            int: Number of rows inserted, or False if the insert failed
+        """
+        if not impressions:
+            return 0
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                cursor.execute(INSERT_FEED_BATCH, feed_batch_params(email, impressions))
+                
+                result = cursor.rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                result = False
+            
+            cursor.close()
+        
+        return result
+
+    def get_recent_articles(self, limit=20, categories=None):
+        """
+        Get recent articles, optionally filtered by categories, with limit
+        
+        Args:
+            limit (int): Maximum number of articles to return
+            categories (list, optional): List of categories to filter by
+            
+        Returns:
+            list: List of article dictionaries, including the row_version
+                  used by ArticleFragmentCache
+        """
+        with self._articles_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            
+            today = datetime.now().date()
+            
+            if categories:
+                # Assuming articles table has a 'category' column
+                placeholders = ', '.join(['%s'] * len(categories))
+                query = f"""
+                    SELECT {self.article_columns} FROM articles 
+                    WHERE DATE(date_added) = %s 
+                    AND category IN ({placeholders})
+                    ORDER BY date_added DESC
+                    LIMIT %s
+                """
+                params = [today] + categories + [limit]
+            else:
+                query = f"""
+                    SELECT {self.article_columns} FROM articles 
+                    WHERE DATE(date_added) = %s
+                    ORDER BY date_added DESC
+                    LIMIT %s
+                """
+                params = [today, limit]
+                
+            cursor.execute(query, params)
+            result = [dict(row) for row in cursor.fetchall()]
+            
+            cursor.close()
+        
+        return result
+
+    def get_article_changes(self, cutoff, since=None, after_id=None, limit=1000):
+        """
+        Get the articles changed since a point, for the local article
+        catalog (see storage/catalog.py)
+        
+        Args:
+            cutoff (datetime): Only articles added at or after this
+            since (datetime, optional): Only articles changed at or after this
+            after_id (str, optional): With since, resume strictly after the
+                                      (since, after_id) position of the previous page
+            limit (int): Maximum number of articles to return
+            
+        Returns:
+            list: Article dictionaries with row_version and updated_at,
+                  in (updated_at, id) order
+        """
+        with self._articles_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            
+            if since is None:
+                condition, params = "", [cutoff]
+            elif after_id is None:
+                condition, params = "AND updated_at >= %s", [cutoff, since]
+            else:
+                condition, params = "AND (updated_at, id) > (%s, %s)", [cutoff, since, after_id]
+            
+            cursor.execute(f"""
+                SELECT {self.article_columns}, updated_at FROM articles
+                WHERE date_added >= %s {condition}
+                ORDER BY updated_at, id
+                LIMIT %s
+            """, params + [limit])
+            result = [dict(row) for row in cursor.fetchall()]
+            
+            cursor.close()
+        
+        return result
+
+    def get_article_ids(self, cutoff):
+        """
+        Get the ids of the articles added since a point
+        
+        Args:
+            cutoff (datetime): Only articles added at or after this
+            
+        Returns:
+            set: Article IDs
+        """
+        with self._articles_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT id FROM articles WHERE date_added >= %s", (cutoff,))
+            result = {row[0] for row in cursor.fetchall()}
+            
+            cursor.close()
+        
+        return result
@@ -0,0 +1,36 @@
+"""
+The storage backend of the process
+
+get_backend() creates it on first use with the create_backend() of the
+storage package, which picks the backend classes.
+"""
+import threading
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """
+    Get the configured storage backend, creating it on first use
+    """
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                import storage
+                from config import STORAGE_BACKEND
+                _backend = storage.create_backend(STORAGE_BACKEND)
+    return _backend
+
+def set_backend(backend):
+    """
+    Replace the storage backend (for tests and benchmarks)
+
+    Args:
+        backend (StorageBackend): The backend to use, or None to go back to the configured one
+    """
+    global _backend
+
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,131 @@
+"""
+Lightweight timing spans reported through the Server-Timing header
+
+Services wrap their stages in `span(name)`. Nothing is recorded unless the
+current request opted in (see init_app), in which case the durations of
+spans sharing a name are summed and sent back as, for example:
+
+    Server-Timing: db;dur=12.4, profile;dur=3.1, bias;dur=1.7;desc="n=40"
+
+Spans may nest (e.g. bias resolution inside profile computation); each
+name is reported on its own.
+"""
+import contextvars
+import time
+from flask import current_app, g, request
+
+_recorder = contextvars.ContextVar('server_timing', default=None)
+
+class TimingRecorder:
+    """
+    Accumulated span durations for one request
+    """
+    __slots__ = ('spans',)
+
+    def __init__(self):
+        self.spans = {}
+
+    def add(self, name, seconds):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def header_value(self):
+        parts = []
+        for name, (seconds, count) in self.spans.items():
+            part = f"{name};dur={seconds * 1000:.2f}"
+            if count > 1:
+                part += f';desc="n={count}"'
+            parts.append(part)
+        return ', '.join(parts)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('_recorder', '_name', '_start')
+
+    def __init__(self, recorder, name):
+        self._recorder = recorder
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._recorder.add(self._name, time.perf_counter() - self._start)
+        return False
+
+def span(name):
+    """
+    Time a block of code as part of the current request's Server-Timing
+
+    Args:
+        name (str): Span name, e.g. 'db' or 'profile'
+
+    Returns:
+        A context manager; a shared no-op one when timing is off
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name)
+
+def record(name, seconds):
+    """
+    Add an already measured duration to the current request's Server-Timing
+
+    Args:
+        name (str): Span name
+        seconds (float): Duration
+    """
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add(name, seconds)
+
+def timing_enabled():
+    """
+    Check whether the current request is recording spans
+    """
+    return _recorder.get() is not None
+
+def _before_request():
+    if request.endpoint in current_app.config.get('SERVER_TIMING_ENDPOINTS', ()):
+        g._server_timing_token = _recorder.set(TimingRecorder())
+
+def _after_request(response):
+    token = g.pop('_server_timing_token', None)
+    if token is None:
+        return response
+
+    recorder = _recorder.get()
+    if recorder is not None and recorder.spans:
+        response.headers['Server-Timing'] = recorder.header_value()
+    _recorder.reset(token)
+    return response
+
+def init_app(app):
+    """
+    Register the Server-Timing hooks if SERVER_TIMING_ENABLED is set
+
+    When disabled no hook is installed and span() returns a shared no-op.
+
+    Args:
+        app (Flask): The app to instrument
+    """
+    if not app.config.get('SERVER_TIMING_ENABLED'):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
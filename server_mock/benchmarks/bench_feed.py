@@ -0,0 +1,184 @@
+"""
+Benchmark of /api/article/feed flag assignment and impression writes
+
+Compares the former per-article path (if/elif lean scoring, one
+insert_feed_without_duplicate call per article) with LeanScorer and the
+bulk insert, for several `limit` values, and times the whole route.
+
+Run from the server_mock folder:
+    python -m benchmarks.bench_feed [--limits 20 100 1000 10000] [--backend sqlite|postgres] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from services.lean_scorer import LEANS, LeanScorer
+from storage import create_backend, set_backend
+
+def _legacy_flags(articles, avg_score):
+    # The scoring loop retrieve_feed used before LeanScorer
+    flags = []
+    for article in articles:
+        if article['lean'] == 'Right':
+            lean_score = -1
+        elif article['lean'] == 'Lean Right':
+            lean_score = -0.5
+        elif article['lean'] == 'Center':
+            lean_score = 0
+        elif article['lean'] == 'Lean Left':
+            lean_score = 0.5
+        elif article['lean'] == 'Left':
+            lean_score = 1
+        else:
+            lean_score = 0
+        diff = abs(lean_score - avg_score)
+        if diff <= 0.5:
+            flags.append('comfort')
+        elif diff <= 1:
+            flags.append('balanced')
+        else:
+            flags.append('challenge')
+    return flags
+
+def _best_ms(func, repeat):
+    """
+    Best wall time of func over `repeat` runs, in ms
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def _set_leans(backend, leans_by_id):
+    rows = [(lean, article_id) for article_id, lean in leans_by_id.items()]
+    if backend.name == 'postgres':
+        from db import get_db_connection
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("UPDATE articles SET lean = %s WHERE id = %s", rows)
+            conn.commit()
+            cursor.close()
+    else:
+        conn = backend._connect()
+        with conn:
+            conn.executemany("UPDATE articles SET lean = ? WHERE id = ?", rows)
+
+def _cleanup(backend, emails, article_ids):
+    if backend.name == 'postgres':
+        from db import get_db_connection
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM feed WHERE email = ANY(%s)", (emails,))
+            cursor.execute("DELETE FROM feed_lean_counts WHERE email = ANY(%s)", (emails,))
+            cursor.execute("DELETE FROM userdata WHERE email = ANY(%s)", (emails,))
+            cursor.execute("DELETE FROM articles WHERE id = ANY(%s)", (article_ids,))
+            conn.commit()
+            cursor.close()
+
+def run(backend, limits, repeat, seed=0):
+    rng = random.Random(seed)
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    emails = []
+
+    def new_user():
+        email = f"{prefix}-{len(emails)}@bench.local"
+        backend.add_user(email, 'secret')
+        emails.append(email)
+        return email
+
+    # Today's articles, a fifth of them without a lean
+    count = max(limits)
+    articles = [
+        {
+            'id': f"{prefix}-{i}",
+            'headline': f"Headline {i}",
+            'url': f"https://example.com/{i}",
+            'source': 'Example News',
+            'abstract': 'Abstract',
+            'article_date': None,
+            'image_url': None
+        }
+        for i in range(count)
+    ]
+    article_ids = [article['id'] for article in articles]
+    backend.insert_articles(articles)
+    _set_leans(backend, {
+        article_id: lean for article_id in article_ids
+        if (lean := rng.choice(LEANS + (None,))) is not None
+    })
+
+    from app import app
+    client = app.test_client()
+
+    results = []
+    try:
+        for limit in limits:
+            batch = backend.get_recent_articles(limit)
+            leans = [article['lean'] for article in batch]
+            avg_score = LeanScorer.average_score((3, 1, 2, 5, 8))
+            assert LeanScorer.flags(leans, avg_score) == _legacy_flags(batch, avg_score)
+            flags = LeanScorer.flags(leans, avg_score)
+            impressions = [(article['id'], flag) for article, flag in zip(batch, flags)]
+
+            def legacy_writes():
+                email = new_user()
+                for article_id, flag in impressions:
+                    backend.insert_feed_without_duplicate(email, flag, article_id)
+
+            def bulk_write():
+                backend.insert_feed_batch_without_duplicate(new_user(), impressions)
+
+            def route():
+                response = client.get('/api/article/feed', query_string={'email': new_user(), 'limit': limit})
+                assert response.status_code == 200 and len(response.get_json()['articles']) == len(batch)
+
+            # The per-row writes are slow enough that fewer runs suffice
+            write_repeat = max(1, min(repeat, 20_000 // max(limit, 1)))
+            results.append({
+                'limit': limit,
+                'articles': len(batch),
+                'legacy_flags_ms': _best_ms(lambda: _legacy_flags(batch, avg_score), repeat),
+                'scorer_flags_ms': _best_ms(lambda: LeanScorer.flags(leans, avg_score), repeat),
+                'per_row_write_ms': _best_ms(legacy_writes, write_repeat),
+                'bulk_write_ms': _best_ms(bulk_write, write_repeat),
+                'route_ms': _best_ms(route, write_repeat)
+            })
+    finally:
+        _cleanup(backend, emails, article_ids)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--limits', type=int, nargs='+', default=[20, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--backend', choices=['sqlite', 'postgres'], default='sqlite')
+    parser.add_argument('--path', help='SQLite database file (default: a temporary file)')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    if args.backend == 'sqlite':
+        backend = create_backend('sqlite', path=args.path or os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    else:
+        backend = create_backend('postgres')
+    set_backend(backend)
+
+    results = run(backend, args.limits, args.repeat)
+
+    print(f"backend: {backend.name}")
+    print(f"{'limit':>6} {'legacy flags ms':>15} {'scorer ms':>9} {'per-row write ms':>16} {'bulk write ms':>13} {'route ms':>9}")
+    for row in results:
+        print(f"{row['limit']:>6} {row['legacy_flags_ms']:>15.3f} {row['scorer_flags_ms']:>9.3f} "
+              f"{row['per_row_write_ms']:>16.1f} {row['bulk_write_ms']:>13.1f} {row['route_ms']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
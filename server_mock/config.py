@@ -17,12 +17,50 @@ DB_NAME = os.getenv('DB_NAME')
 DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 
-# Articles DB configuration
+# Connection pool sizing for the primary (per process)
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+
+# Storage backend behind DatabaseHandler: 'postgres' or 'sqlite'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'postgres').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'publicripple.db'))
+
+# Local article catalog (see storage/catalog.py): a SQLite copy of the
+# recent articles on each node, synced incrementally from PostgreSQL, that
+# serves the article reads of DatabaseHandler. Reads fall back to
+# PostgreSQL when the catalog has not synced for
+# ARTICLE_CATALOG_MAX_STALENESS seconds or has no matching rows.
+ARTICLE_CATALOG_ENABLED = os.getenv('ARTICLE_CATALOG_ENABLED', 'false').lower() == 'true'
+ARTICLE_CATALOG_PATH = os.getenv('ARTICLE_CATALOG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'article_catalog.db'))
+ARTICLE_CATALOG_SYNC_INTERVAL = float(os.getenv('ARTICLE_CATALOG_SYNC_INTERVAL', 5))
+ARTICLE_CATALOG_MAX_STALENESS = float(os.getenv('ARTICLE_CATALOG_MAX_STALENESS', 60))
+ARTICLE_CATALOG_OVERLAP = float(os.getenv('ARTICLE_CATALOG_OVERLAP', 60))
+ARTICLE_CATALOG_RETENTION_DAYS = float(os.getenv('ARTICLE_CATALOG_RETENTION_DAYS', 2))
+ARTICLE_CATALOG_RECONCILE_INTERVAL = float(os.getenv('ARTICLE_CATALOG_RECONCILE_INTERVAL', 300))
+ARTICLE_CATALOG_BATCH_SIZE = int(os.getenv('ARTICLE_CATALOG_BATCH_SIZE', 1000))
+
+# Articles DB configuration: a read replica of the primary that serves the
+# article reads (see db.py). Without ARTICLES_HOST, articles are read from
+# the primary; the other settings default to the primary's.
 ARTICLES_HOST = os.getenv('ARTICLES_HOST')
-ARTICLES_PORT = os.getenv('ARICLES_PORT')
-ARTICLES_NAME = os.getenv('ARTICLES_NAME')
-ARTICLES_USER = os.getenv('ARTICLES_USER')
-ARTICLES_PASSWORD = os.getenv('ARTICLES_PASSWORD')
+# ARICLES_PORT is the misspelled name earlier versions read
+ARTICLES_PORT = os.getenv('ARTICLES_PORT', os.getenv('ARICLES_PORT', DB_PORT))
+ARTICLES_NAME = os.getenv('ARTICLES_NAME', DB_NAME)
+ARTICLES_USER = os.getenv('ARTICLES_USER', DB_USER)
+ARTICLES_PASSWORD = os.getenv('ARTICLES_PASSWORD', DB_PASSWORD)
+ARTICLES_POOL_MIN = int(os.getenv('ARTICLES_POOL_MIN', 2))
+ARTICLES_POOL_MAX = int(os.getenv('ARTICLES_POOL_MAX', 20))
+
+# Replica-lag policy (see replica.py): article reads fall back to the
+# primary while the replica lags more than ARTICLES_MAX_LAG seconds, hasn't
+# replayed this process' article writes yet, or failed in the last
+# ARTICLES_RETRY_INTERVAL seconds. The lag is measured at most once per
+# ARTICLES_LAG_CHECK_INTERVAL seconds.
+ARTICLES_MAX_LAG = float(os.getenv('ARTICLES_MAX_LAG', 5))
+ARTICLES_LAG_CHECK_INTERVAL = float(os.getenv('ARTICLES_LAG_CHECK_INTERVAL', 1))
+ARTICLES_RETRY_INTERVAL = float(os.getenv('ARTICLES_RETRY_INTERVAL', 30))
 
 # Log configuration status (without exposing sensitive values)
 logger.info("Configuration loaded:")
@@ -30,4 +68,7 @@ logger.info(f"DB_HOST: {'Set' if DB_HOST else 'Not set'}")
 logger.info(f"DB_PORT: {'Set' if DB_PORT else 'Not set'}")
 logger.info(f"DB_NAME: {'Set' if DB_NAME else 'Not set'}")
 logger.info(f"DB_USER: {'Set' if DB_USER else 'Not set'}")
-logger.info(f"DB_PASSWORD: {'Set (value hidden)' if DB_PASSWORD else 'Not set'}")
\ No newline at end of file
+logger.info(f"DB_PASSWORD: {'Set (value hidden)' if DB_PASSWORD else 'Not set'}")
+logger.info(f"STORAGE_BACKEND: {STORAGE_BACKEND}")
+logger.info(f"ARTICLE_CATALOG_ENABLED: {ARTICLE_CATALOG_ENABLED}")
+logger.info(f"ARTICLES_HOST: {ARTICLES_HOST if ARTICLES_HOST else 'Not set (articles read from the primary)'}")
\ No newline at end of file
@@ -1,25 +1,173 @@
+import logging
+import os
+import threading
 import psycopg2
-import psycopg2.extras
-from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, ARTICLES_HOST, ARTICLES_PORT, ARTICLES_NAME, ARTICLES_USER, ARTICLES_PASSWORD
+import psycopg2.extensions
+import psycopg2.pool
+from config import (
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT,
+    ARTICLES_HOST, ARTICLES_PORT, ARTICLES_NAME, ARTICLES_USER, ARTICLES_PASSWORD,
+    ARTICLES_POOL_MIN, ARTICLES_POOL_MAX,
+    ARTICLES_MAX_LAG, ARTICLES_LAG_CHECK_INTERVAL, ARTICLES_RETRY_INTERVAL
+)
+from replica import LAG_QUERY, ReplicaLagPolicy
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'primary'
+ARTICLES = 'articles'
+
+# Per-process pools by database, opened lazily in the process that uses
+# them so that no connection crosses a fork: role -> (pool, slots, pid)
+_pools = {}
+_pools_lock = threading.Lock()
+
+class PooledConnection:
+    """
+    Thin proxy around a pooled psycopg2 connection.
+
+    Callers keep using the plain connection API; close() hands the
+    connection back to the pool instead of closing the socket. As a
+    context manager it is handed back on exit, rolling back what was not
+    committed, so that an exception never keeps it out of the pool:
+
+        with get_db_connection() as conn:
+            ...
+    """
+
+    def __init__(self, pool, slots, conn, role):
+        self._pool = pool
+        self._slots = slots
+        self._conn = conn
+        self.role = role
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            if not conn.closed and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            # Broken connection, let the pool discard it
+            self._pool.putconn(conn, close=True)
+        else:
+            self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+def articles_db_configured():
+    """
+    Check whether article reads have a database of their own (ARTICLES_HOST)
+    """
+    return bool(ARTICLES_HOST)
+
+def _settings(role):
+    if role == ARTICLES:
+        return dict(host=ARTICLES_HOST, port=ARTICLES_PORT, dbname=ARTICLES_NAME,
+                    user=ARTICLES_USER, password=ARTICLES_PASSWORD), ARTICLES_POOL_MIN, ARTICLES_POOL_MAX
+    return dict(host=DB_HOST, port=DB_PORT, dbname=DB_NAME,
+                user=DB_USER, password=DB_PASSWORD), DB_POOL_MIN, DB_POOL_MAX
+
+def _get_pool(role):
+    entry = _pools.get(role)
+    if entry is not None and entry[2] == os.getpid():
+        return entry
+    with _pools_lock:
+        entry = _pools.get(role)
+        if entry is None or entry[2] != os.getpid():
+            # A pool inherited from the parent is dropped without closing
+            # it, since its sockets still belong to the parent
+            params, minconn, maxconn = _settings(role)
+            pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **params)
+            # ThreadedConnectionPool raises instead of blocking when exhausted
+            entry = _pools[role] = (pool, threading.BoundedSemaphore(maxconn), os.getpid())
+        return entry
+
+def _checkout(role):
+    pool, slots, _ = _get_pool(role)
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise psycopg2.pool.PoolError(f"No free {role} database connection after {DB_POOL_TIMEOUT:g}s")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        slots.release()
+        raise
+    return PooledConnection(pool, slots, conn, role)
+
+def _probe_articles():
+    with _checkout(ARTICLES) as conn:
+        cursor = conn.cursor()
+        cursor.execute(LAG_QUERY)
+        row = cursor.fetchone()
+        cursor.close()
+        conn.commit()
+        return row
+
+articles_policy = ReplicaLagPolicy(
+    _probe_articles,
+    max_lag=ARTICLES_MAX_LAG,
+    check_interval=ARTICLES_LAG_CHECK_INTERVAL,
+    retry_interval=ARTICLES_RETRY_INTERVAL
+)
 
 def get_db_connection(type=""):
     """
-    Create and return a connection to the PostgreSQL database
-    """
-    if type == 'articles':
-        conn = psycopg2.connect(
-            host=ARTICLES_HOST,
-            port=ARTICLES_PORT,
-            dbname=ARTICLES_NAME,
-            user=ARTICLES_USER,
-            password=ARTICLES_PASSWORD
-        )
-    else:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-    return conn
\ No newline at end of file
+    Get a pooled connection to the PostgreSQL database
+
+    User, feed and survey data (and every write) use the primary. With
+    type='articles' the connection is for article reads: it goes to the
+    articles database when one is configured and the replica-lag policy
+    allows it (see replica.py), to the primary otherwise. close(), or the
+    end of a `with` block, returns the connection to its pool; waiting
+    more than DB_POOL_TIMEOUT seconds for one raises PoolError.
+
+    Args:
+        type (str): '' for the primary, 'articles' for article reads
+
+    Returns:
+        PooledConnection: The connection; its `role` tells which database it is
+    """
+    if type == 'articles' and articles_db_configured() and articles_policy.use_replica():
+        try:
+            return _checkout(ARTICLES)
+        except psycopg2.OperationalError as e:
+            articles_policy.mark_unavailable(e)
+    return _checkout(PRIMARY)
+
+def record_articles_write(conn):
+    """
+    Keep article reads on the primary until the replica has this write
+
+    Call after committing an article write on a primary connection.
+
+    Args:
+        conn (PooledConnection): The primary connection that wrote
+    """
+    if not articles_db_configured():
+        return
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_current_wal_lsn()::text")
+    lsn = cursor.fetchone()[0]
+    cursor.close()
+    conn.commit()
+    articles_policy.record_write(lsn)
+
+def close_db_pools():
+    """
+    Close every connection held by this process' pools
+    """
+    with _pools_lock:
+        for pool, _, pid in _pools.values():
+            if pid == os.getpid():
+                pool.closeall()
+        _pools.clear()
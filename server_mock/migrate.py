@@ -0,0 +1,82 @@
+"""
+Apply the SQL migrations in migrations/ that have not been applied yet
+
+Usage (from the server_mock folder):
+    python migrate.py
+"""
+import os
+import logging
+from db import get_db_connection
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# server_mock may share its database with server, whose migrations are
+# tracked in schema_migrations
+MIGRATIONS_TABLE = 'mock_schema_migrations'
+
+def pending_migrations(applied, directory=MIGRATIONS_DIR):
+    """
+    List the migration files not applied yet, in order
+    
+    Args:
+        applied (set): Versions already applied
+        directory (str): Folder holding the NNN_name.sql files
+        
+    Returns:
+        list: (version, path) tuples
+    """
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.sql'))
+    return [
+        (name[:-len('.sql')], os.path.join(directory, name))
+        for name in files
+        if name[:-len('.sql')] not in applied
+    ]
+
+def apply_migrations(directory=MIGRATIONS_DIR):
+    """
+    Apply every pending migration, each in its own transaction
+    
+    Args:
+        directory (str): Folder holding the NNN_name.sql files
+        
+    Returns:
+        list: Versions applied by this call
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+    conn.commit()
+    
+    cursor.execute(f"SELECT version FROM {MIGRATIONS_TABLE}")
+    applied = {row[0] for row in cursor.fetchall()}
+    
+    newly_applied = []
+    try:
+        for version, path in pending_migrations(applied, directory):
+            with open(path, 'r', encoding='utf-8') as f:
+                cursor.execute(f.read())
+            cursor.execute(f"INSERT INTO {MIGRATIONS_TABLE} (version) VALUES (%s)", (version,))
+            conn.commit()
+            logger.info(f"Applied migration {version}")
+            newly_applied.append(version)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return newly_applied
+
+if __name__ == '__main__':
+    applied = apply_migrations()
+    logger.info(f"{len(applied)} migration(s) applied")
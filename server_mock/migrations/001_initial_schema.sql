@@ -0,0 +1,56 @@
+-- Reference schema for the tables used by server_mock's DatabaseHandler:
+-- the server schema plus a political lean per article
+CREATE TABLE IF NOT EXISTS userdata (
+    email TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS survey_responses (
+    email TEXT PRIMARY KEY REFERENCES userdata (email),
+    q1 BOOLEAN,
+    q2 BOOLEAN,
+    q3 BOOLEAN,
+    q4 BOOLEAN,
+    q5 BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    headline TEXT,
+    url TEXT,
+    source TEXT,
+    abstract TEXT,
+    article_date TIMESTAMP,
+    date_added TIMESTAMP NOT NULL DEFAULT NOW(),
+    image_url TEXT,
+    category TEXT,
+    lean TEXT
+);
+
+-- For databases created before the lean column existed
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS lean TEXT;
+
+CREATE INDEX IF NOT EXISTS articles_date_added_day_idx ON articles ((DATE(date_added)), date_added DESC);
+
+CREATE TABLE IF NOT EXISTS feed (
+    email TEXT NOT NULL REFERENCES userdata (email),
+    article_id TEXT NOT NULL REFERENCES articles (id),
+    flag TEXT NOT NULL,
+    access_date TIMESTAMP NOT NULL DEFAULT NOW(),
+    likes INTEGER NOT NULL DEFAULT 0
+);
+
+-- One feed row per (email, article_id, flag), for the INSERT ... ON CONFLICT
+-- writes; duplicates from before the constraint are removed first
+DELETE FROM feed f
+USING (
+    SELECT ctid, row_number() OVER (
+        PARTITION BY email, article_id, flag
+        ORDER BY (likes <> 0) DESC, access_date DESC
+    ) AS rn
+    FROM feed
+) d
+WHERE f.ctid = d.ctid AND d.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS feed_email_article_flag_key ON feed (email, article_id, flag);
+DROP INDEX IF EXISTS feed_email_idx;
@@ -0,0 +1,96 @@
+-- Per-user impression counts by article lean, kept up to date by triggers,
+-- so that get_feed_counts reads a handful of rows by primary key instead of
+-- aggregating the user's whole feed history. Counts follow the lean of each
+-- article, including later changes to it. Rebuild them with
+-- `python rebuild_feed_counts.py` if they are ever suspected to drift.
+CREATE TABLE IF NOT EXISTS feed_lean_counts (
+    email TEXT NOT NULL,
+    lean TEXT NOT NULL,
+    impressions BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, lean)
+);
+
+-- Finds the impressions of an article whose lean changes
+CREATE INDEX IF NOT EXISTS feed_article_idx ON feed (article_id);
+
+-- Statement-level, so a bulk insert updates each counter once
+CREATE OR REPLACE FUNCTION feed_lean_counts_on_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO feed_lean_counts AS c (email, lean, impressions)
+    SELECT n.email, a.lean, COUNT(*)
+    FROM new_rows n
+    JOIN articles a ON a.id = n.article_id
+    WHERE a.lean IS NOT NULL
+    GROUP BY n.email, a.lean
+    -- A fixed lock order keeps concurrent batches of one user from deadlocking
+    ORDER BY n.email, a.lean
+    ON CONFLICT (email, lean) DO UPDATE SET impressions = c.impressions + EXCLUDED.impressions;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION feed_lean_counts_on_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE feed_lean_counts c
+    SET impressions = c.impressions - d.removed
+    FROM (
+        SELECT o.email, a.lean, COUNT(*) AS removed
+        FROM old_rows o
+        JOIN articles a ON a.id = o.article_id
+        WHERE a.lean IS NOT NULL
+        GROUP BY o.email, a.lean
+    ) d
+    WHERE c.email = d.email AND c.lean = d.lean;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION feed_lean_counts_on_lean_change() RETURNS trigger AS $$
+BEGIN
+    IF OLD.lean IS NOT NULL THEN
+        UPDATE feed_lean_counts c
+        SET impressions = c.impressions - f.moved
+        FROM (SELECT email, COUNT(*) AS moved FROM feed WHERE article_id = NEW.id GROUP BY email) f
+        WHERE c.email = f.email AND c.lean = OLD.lean;
+    END IF;
+    IF NEW.lean IS NOT NULL THEN
+        INSERT INTO feed_lean_counts AS c (email, lean, impressions)
+        SELECT email, NEW.lean, COUNT(*)
+        FROM feed
+        WHERE article_id = NEW.id
+        GROUP BY email
+        ORDER BY email
+        ON CONFLICT (email, lean) DO UPDATE SET impressions = c.impressions + EXCLUDED.impressions;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS feed_lean_counts_insert ON feed;
+CREATE TRIGGER feed_lean_counts_insert
+    AFTER INSERT ON feed
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION feed_lean_counts_on_insert();
+
+DROP TRIGGER IF EXISTS feed_lean_counts_delete ON feed;
+CREATE TRIGGER feed_lean_counts_delete
+    AFTER DELETE ON feed
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION feed_lean_counts_on_delete();
+
+DROP TRIGGER IF EXISTS feed_lean_counts_lean_change ON articles;
+CREATE TRIGGER feed_lean_counts_lean_change
+    AFTER UPDATE OF lean ON articles
+    FOR EACH ROW WHEN (OLD.lean IS DISTINCT FROM NEW.lean)
+    EXECUTE FUNCTION feed_lean_counts_on_lean_change();
+
+-- Backfill from the existing history; the lock keeps impressions written
+-- meanwhile from being missed or counted twice
+LOCK TABLE feed, articles IN SHARE MODE;
+DELETE FROM feed_lean_counts;
+INSERT INTO feed_lean_counts (email, lean, impressions)
+SELECT f.email, a.lean, COUNT(*)
+FROM feed f
+JOIN articles a ON a.id = f.article_id
+WHERE a.lean IS NOT NULL
+GROUP BY f.email, a.lean;
@@ -0,0 +1,25 @@
+-- Change marker for the local article catalog (storage/catalog.py), which
+-- copies the rows changed since its last sync. Set on insert and whenever
+-- a row's content changes; an upsert that rewrites the same values keeps it.
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+UPDATE articles SET updated_at = date_added WHERE updated_at IS NULL;
+ALTER TABLE articles
+    ALTER COLUMN updated_at SET DEFAULT clock_timestamp(),
+    ALTER COLUMN updated_at SET NOT NULL;
+
+CREATE OR REPLACE FUNCTION articles_set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS articles_set_updated_at ON articles;
+CREATE TRIGGER articles_set_updated_at
+    BEFORE UPDATE ON articles
+    FOR EACH ROW
+    WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION articles_set_updated_at();
+
+-- Incremental sync reads pages in (updated_at, id) order
+CREATE INDEX IF NOT EXISTS articles_updated_at_idx ON articles (updated_at, id);
@@ -0,0 +1,25 @@
+"""
+Rebuild the per-user lean counts behind /api/article/feed from the feed history
+
+The counts are kept up to date by triggers (migrations/002_feed_lean_counts.sql);
+run this to repair them after restoring data or bulk-editing the feed table
+with the triggers disabled.
+
+Usage (from the server_mock folder):
+    python rebuild_feed_counts.py [--email user@example.com]
+"""
+import argparse
+import logging
+from services.database_handler import DatabaseHandler
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--email', help='Only rebuild this user\'s counts')
+    args = parser.parse_args()
+    
+    rows = DatabaseHandler.rebuild_feed_counts(args.email)
+    logger.info(f"Rebuilt {rows} lean count row(s)" + (f" for {args.email}" if args.email else ""))
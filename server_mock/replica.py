@@ -0,0 +1,151 @@
+"""
+Replica-lag policy for the articles database
+
+Article reads go to the articles database (a streaming replica of the
+primary, see ARTICLES_HOST) only while the policy allows it:
+
+- the replica's lag, measured at most once per ARTICLES_LAG_CHECK_INTERVAL,
+  is at most ARTICLES_MAX_LAG seconds. A replica that has replayed all the
+  WAL it received counts as caught up, however old its last transaction.
+- it has replayed this process' own article writes (their primary LSN), so
+  a read right after an ingest sees the new rows
+- it answered the last probe: after a connection error, reads stay on the
+  primary for ARTICLES_RETRY_INTERVAL seconds
+
+A database that is not in recovery (e.g. a logically replicated copy) has
+no lag to measure and is always used while it is reachable.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LAG_QUERY = """
+    SELECT pg_is_in_recovery(),
+           CASE
+               WHEN NOT pg_is_in_recovery() THEN 0
+               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END,
+           pg_last_wal_replay_lsn()::text
+"""
+
+def parse_lsn(text):
+    """
+    Convert a pg_lsn in its text form ('16/B374D848') to an int
+
+    Args:
+        text (str): LSN, or None
+
+    Returns:
+        int: Comparable position, or None
+    """
+    if not text:
+        return None
+    high, low = text.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+class ReplicaLagPolicy:
+    """
+    Decides whether reads may go to a replica
+    """
+
+    def __init__(self, probe, max_lag, check_interval, retry_interval):
+        """
+        Args:
+            probe (callable): Runs LAG_QUERY on the replica and returns its row
+            max_lag (float): Largest acceptable lag in seconds
+            check_interval (float): Seconds a probe result is reused
+            retry_interval (float): Seconds to avoid the replica after an error
+        """
+        self.probe = probe
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.lag = None
+        self.replayed_lsn = None
+        self.in_recovery = None
+        self._required_lsn = None
+        self._usable = True
+        self._lag_ok = True
+        self._checked_at = None
+        self._unavailable_until = 0.0
+        self._probe_lock = threading.Lock()
+
+    def use_replica(self):
+        """
+        Check whether the next read may go to the replica
+
+        Returns:
+            bool: True to read the replica, False to read the primary
+        """
+        now = time.monotonic()
+        if now < self._unavailable_until:
+            return False
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            # One thread probes; the others keep the previous decision meanwhile
+            if self._probe_lock.acquire(blocking=self._checked_at is None):
+                try:
+                    if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                        self._refresh(now)
+                finally:
+                    self._probe_lock.release()
+        return self._usable and time.monotonic() >= self._unavailable_until
+
+    def _refresh(self, now):
+        try:
+            in_recovery, lag, replayed = self.probe()
+        except Exception as e:
+            self.mark_unavailable(e)
+            return
+
+        self.in_recovery = in_recovery
+        self.lag = float(lag)
+        self.replayed_lsn = parse_lsn(replayed)
+        self._checked_at = now
+
+        lag_ok = self.lag <= self.max_lag
+        if lag_ok != self._lag_ok:
+            if lag_ok:
+                logger.info(f"Articles replica caught up (lag {self.lag:.1f}s), reading from it again")
+            else:
+                logger.warning(f"Articles replica behind (lag {self.lag:.1f}s), reading from the primary")
+        self._lag_ok = lag_ok
+
+        replayed_ok = True
+        if in_recovery and self._required_lsn is not None:
+            replayed_ok = self.replayed_lsn is not None and self.replayed_lsn >= self._required_lsn
+            if replayed_ok:
+                self._required_lsn = None
+        self._usable = lag_ok and replayed_ok
+
+    def record_write(self, lsn):
+        """
+        Keep reads on the primary until the replica has replayed a write
+
+        Args:
+            lsn (str): Primary WAL position after the write committed
+        """
+        position = parse_lsn(lsn)
+        if position is None:
+            return
+        with self._probe_lock:
+            if self._required_lsn is None or position > self._required_lsn:
+                self._required_lsn = position
+            # Re-check before the next read instead of trusting the last probe
+            self._usable = False
+            self._checked_at = None
+
+    def mark_unavailable(self, error):
+        """
+        Send reads to the primary for retry_interval seconds
+
+        Args:
+            error (Exception): Why the replica could not be used
+        """
+        if time.monotonic() >= self._unavailable_until:
+            logger.warning(f"Articles replica unavailable, reading from the primary for "
+                           f"{self.retry_interval:.0f}s: {error}")
+        self._unavailable_until = time.monotonic() + self.retry_interval
+        self._checked_at = None
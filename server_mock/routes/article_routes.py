@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from services.database_handler import DatabaseHandler
+from services.lean_scorer import LeanScorer
 
 article_bp = Blueprint('article', __name__, url_prefix='/api/article')
 
@@ -25,52 +26,20 @@ def retrieve_feed():
     articles = DatabaseHandler.get_recent_articles(limit)
     
     # Step 2: Get feed counts
-    right_count, lean_right_count, center_count, lean_left_count, left_count = DatabaseHandler.get_feed_counts(email)
+    feed_counts = DatabaseHandler.get_feed_counts(email)
+    right_count, lean_right_count, center_count, lean_left_count, left_count = feed_counts
     
-    # Step 3: Calculate average lean score
-    total_articles = right_count + lean_right_count + center_count + lean_left_count + left_count
+    # Step 3: Calculate average lean score (center if no articles)
+    avg_score = LeanScorer.average_score(feed_counts)
     
-    if total_articles > 0:
-        avg_score = (
-            (right_count * -1) + 
-            (lean_right_count * -0.5) + 
-            (center_count * 0) + 
-            (lean_left_count * 0.5) + 
-            (left_count * 1)
-        ) / total_articles
-    else:
-        avg_score = 0  # Default to center if no articles
+    # Step 4: Flag every article by its lean, and insert them into the feed
+    # table in one statement (without duplicates)
+    flags = LeanScorer.flags([article['lean'] for article in articles], avg_score)
+    DatabaseHandler.insert_feed_batch_without_duplicate(
+        email, [(article['id'], flag) for article, flag in zip(articles, flags)]
+    )
     
-    # Step 4: Add flag field based on lean score and insert into feed table
-    for article in articles:
-        # Convert lean to numeric score
-        if article['lean'] == 'Right':
-            lean_score = -1
-        elif article['lean'] == 'Lean Right':
-            lean_score = -0.5
-        elif article['lean'] == 'Center':
-            lean_score = 0
-        elif article['lean'] == 'Lean Left':
-            lean_score = 0.5
-        elif article['lean'] == 'Left':
-            lean_score = 1
-        else:
-            lean_score = 0  # Default
-        
-        # Calculate difference from average
-        diff = abs(lean_score - avg_score)
-        
-        # Set flag based on difference
-        if diff <= 0.5:
-            flag = 'comfort'
-        elif diff <= 1:
-            flag = 'balanced'
-        else:
-            flag = 'challenge'
-        
-        # Insert article into feed table without duplicates
-        DatabaseHandler.insert_feed_without_duplicate(email, flag, article['id'])
-        
+    for article, flag in zip(articles, flags):
         # Add flag to article for response
         article['flag'] = flag
         
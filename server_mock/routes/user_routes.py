@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from services.database_handler import DatabaseHandler
+from storage import INSERTED, UPDATED, NO_USER
 
 user_bp = Blueprint('user', __name__, url_prefix='/api/user')
 
@@ -62,17 +63,14 @@ def update_survey_responses():
     q4 = data['q4']
     q5 = data['q5']
     
-    # Check if survey responses exist for this email
-    if DatabaseHandler.check_survey_responses(email):
-        # Update existing responses
-        result = DatabaseHandler.update_survey_responses(email, q1, q2, q3, q4, q5)
-        message = 'Survey responses updated successfully'
-    else:
-        # Insert new responses
-        result = DatabaseHandler.insert_survey_responses(email, q1, q2, q3, q4, q5)
-        message = 'Survey responses added successfully'
+    # Insert or update in one statement
+    result = DatabaseHandler.upsert_survey_responses(email, q1, q2, q3, q4, q5)
     
-    if result:
-        return jsonify({'success': True, 'message': message})
+    if result == INSERTED:
+        return jsonify({'success': True, 'message': 'Survey responses added successfully'})
+    elif result == UPDATED:
+        return jsonify({'success': True, 'message': 'Survey responses updated successfully'})
+    elif result == NO_USER:
+        return jsonify({'success': False, 'message': 'User not found'}), 404
     else:
         return jsonify({'success': False, 'message': 'Failed to save survey responses'}), 500
\ No newline at end of file
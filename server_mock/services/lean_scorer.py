@@ -0,0 +1,72 @@
+"""
+Lean scores and feed flags for a batch of articles
+
+An article's flag only depends on its lean and the user's average lean
+score, so the thresholds are applied once per request to the five lean
+scores, and every article of the batch is then flagged with one table
+lookup.
+"""
+from bisect import bisect_left
+
+# In the order of DatabaseHandler.get_feed_counts
+LEANS = ('Right', 'Lean Right', 'Center', 'Lean Left', 'Left')
+LEAN_SCORES = (-1, -0.5, 0, 0.5, 1)
+# Score of articles with a missing or unknown lean
+DEFAULT_SCORE = 0
+
+# An article within FLAG_THRESHOLDS[i] of the user's average gets FLAGS[i];
+# further away than the last threshold, it gets the last flag
+FLAG_THRESHOLDS = (0.5, 1)
+FLAGS = ('comfort', 'balanced', 'challenge')
+
+class LeanScorer:
+    """
+    Scores leans and assigns feed flags over whole batches
+    """
+
+    @staticmethod
+    def average_score(counts):
+        """
+        Average lean score of a user's feed history
+
+        Args:
+            counts (tuple): Article counts in LEANS order
+
+        Returns:
+            float: Average score, or 0 (center) without any history
+        """
+        total = sum(counts)
+        if total == 0:
+            return 0
+        return sum(count * score for count, score in zip(counts, LEAN_SCORES)) / total
+
+    @staticmethod
+    def _flag_table(avg_score):
+        """
+        Flag of each lean for a user with the given average score
+
+        Args:
+            avg_score (float): The user's average lean score
+
+        Returns:
+            tuple: (dict of lean -> flag, flag of unknown leans)
+        """
+        def flag(score):
+            return FLAGS[bisect_left(FLAG_THRESHOLDS, abs(score - avg_score))]
+
+        return {lean: flag(score) for lean, score in zip(LEANS, LEAN_SCORES)}, flag(DEFAULT_SCORE)
+
+    @staticmethod
+    def flags(leans, avg_score):
+        """
+        Feed flags of a batch of articles
+
+        Args:
+            leans (list): Lean labels of the articles
+            avg_score (float): The user's average lean score
+
+        Returns:
+            list: 'comfort', 'balanced' or 'challenge' per article, in order
+        """
+        table, default = LeanScorer._flag_table(avg_score)
+        return [table.get(lean, default) for lean in leans]
@@ -0,0 +1,35 @@
+"""
+Storage backends behind DatabaseHandler
+
+postgres.py and sqlite.py are the backends of server's API (server/storage
+keeps its own copy); lean_counts.py extends them with what server_mock
+adds (article leans, per-user lean counts, the articles replica).
+
+STORAGE_BACKEND selects the implementation: 'postgres' (the default) or
+'sqlite', an embedded database at SQLITE_PATH.
+"""
+from storage.base import StorageBackend, INSERTED, UPDATED, UNCHANGED, NOT_FOUND, NO_USER
+from storage.registry import get_backend, set_backend
+
+# Checks of the lean count methods, run by storage.conformance
+CONFORMANCE_EXTRAS = ('storage.lean_counts_checks',)
+
+def create_backend(name, **options):
+    """
+    Create a storage backend by name
+
+    Args:
+        name (str): 'postgres' or 'sqlite'
+        options: Backend settings (path for sqlite)
+
+    Returns:
+        StorageBackend: The backend
+    """
+    if name == 'postgres':
+        from storage.lean_counts import PostgresLeanCountsBackend
+        return PostgresLeanCountsBackend()
+    if name == 'sqlite':
+        from config import SQLITE_PATH
+        from storage.lean_counts import SQLiteLeanCountsBackend
+        return SQLiteLeanCountsBackend(options.get('path', SQLITE_PATH))
+    raise ValueError(f"Unknown storage backend: {name}")
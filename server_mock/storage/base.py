@@ -0,0 +1,71 @@
+# Outcomes reported by the single-statement writes
+INSERTED = 'inserted'
+UPDATED = 'updated'
+# The row was already there; nothing was written
+UNCHANGED = 'unchanged'
+# The row to update does not exist
+NOT_FOUND = 'not_found'
+# The user the row belongs to does not exist
+NO_USER = 'no_user'
+
+class StorageBackend:
+    """
+    Interface of the storage backends behind DatabaseHandler
+    
+    Each method has the semantics documented on the DatabaseHandler method
+    of the same name. Article rows are returned as dictionaries with the
+    keys in `article_fields`: the articles columns plus `row_version`, a
+    value that changes whenever the row is updated.
+    
+    Writes are single atomic statements (INSERT ... ON CONFLICT, UPDATE
+    with the row count) that report what happened with one of the outcome
+    constants above, instead of reading the row first.
+    """
+    name = None
+    article_fields = ('id', 'headline', 'url', 'source', 'abstract', 'article_date',
+                      'date_added', 'image_url', 'category', 'row_version')
+    
+    def email_exists(self, email):
+        raise NotImplementedError
+    
+    def get_survey_responses(self, email):
+        raise NotImplementedError
+    
+    def insert_articles(self, articles):
+        raise NotImplementedError
+    
+    def insert_feed(self, email, flag, article_id):
+        raise NotImplementedError
+    
+    def update_likes(self, email, article_id, flag, value):
+        raise NotImplementedError
+    
+    def add_user(self, email, password):
+        raise NotImplementedError
+    
+    def insert_survey_responses(self, email, q1, q2, q3, q4, q5):
+        raise NotImplementedError
+    
+    def update_survey_responses(self, email, q1, q2, q3, q4, q5):
+        raise NotImplementedError
+    
+    def upsert_survey_responses(self, email, q1, q2, q3, q4, q5):
+        raise NotImplementedError
+    
+    def get_today_articles(self, categories=None):
+        raise NotImplementedError
+    
+    def get_liked_sources_by_email(self, email):
+        raise NotImplementedError
+    
+    def get_disliked_sources_by_email(self, email):
+        raise NotImplementedError
+    
+    def insert_feed_without_duplicate(self, email, flag, article_id):
+        raise NotImplementedError
+    
+    def insert_feed_batch_without_duplicate(self, email, impressions):
+        raise NotImplementedError
+    
+    def get_recent_articles(self, limit=20, categories=None):
+        raise NotImplementedError
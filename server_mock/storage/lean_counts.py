@@ -0,0 +1,243 @@
+"""
+server_mock's extensions of the storage backends
+
+Articles carry the `lean` label instead of a row version, each user's
+impressions are counted by article lean (feed_lean_counts, kept up to date
+by triggers, see migrations/002_feed_lean_counts.sql), and PostgreSQL
+article reads go to the articles replica when one is configured (see
+db.py).
+"""
+import sqlite3
+from db import get_db_connection, record_articles_write
+from storage.base import StorageBackend
+from storage.postgres import PostgresBackend
+from storage.sqlite import SQLiteBackend
+
+ARTICLE_FIELDS = StorageBackend.article_fields[:-1] + ('lean',)
+
+LEAN_COUNTS_SCHEMA = """
+CREATE INDEX IF NOT EXISTS feed_article_idx ON feed (article_id);
+
+-- Per-user impression counts by article lean, kept up to date by triggers
+-- (see migrations/002_feed_lean_counts.sql)
+BEGIN IMMEDIATE;
+
+CREATE TABLE IF NOT EXISTS feed_lean_counts (
+    email TEXT NOT NULL,
+    lean TEXT NOT NULL,
+    impressions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, lean)
+) WITHOUT ROWID;
+
+-- Backfill a database created before the counters existed
+INSERT INTO feed_lean_counts (email, lean, impressions)
+SELECT f.email, a.lean, COUNT(*)
+FROM feed f
+JOIN articles a ON a.id = f.article_id
+WHERE a.lean IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'feed_lean_counts_insert')
+GROUP BY f.email, a.lean;
+
+CREATE TRIGGER IF NOT EXISTS feed_lean_counts_insert AFTER INSERT ON feed
+BEGIN
+    INSERT INTO feed_lean_counts (email, lean, impressions)
+    SELECT NEW.email, lean, 1 FROM articles WHERE id = NEW.article_id AND lean IS NOT NULL
+    ON CONFLICT (email, lean) DO UPDATE SET impressions = impressions + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_lean_counts_delete AFTER DELETE ON feed
+BEGIN
+    UPDATE feed_lean_counts SET impressions = impressions - 1
+    WHERE email = OLD.email AND lean = (SELECT lean FROM articles WHERE id = OLD.article_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_lean_counts_lean_change AFTER UPDATE OF lean ON articles
+WHEN OLD.lean IS NOT NEW.lean
+BEGIN
+    UPDATE feed_lean_counts
+    SET impressions = impressions - (
+        SELECT COUNT(*) FROM feed WHERE article_id = NEW.id AND email = feed_lean_counts.email
+    )
+    WHERE lean = OLD.lean AND email IN (SELECT email FROM feed WHERE article_id = NEW.id);
+
+    INSERT INTO feed_lean_counts (email, lean, impressions)
+    SELECT email, NEW.lean, COUNT(*) FROM feed WHERE article_id = NEW.id AND NEW.lean IS NOT NULL GROUP BY email
+    ON CONFLICT (email, lean) DO UPDATE SET impressions = impressions + excluded.impressions;
+END;
+
+COMMIT;
+"""
+
+class PostgresLeanCountsBackend(PostgresBackend):
+    """
+    PostgreSQL storage, with the articles replica and the lean counts
+    """
+    article_fields = ARTICLE_FIELDS
+    article_columns = "id, headline, url, source, abstract, article_date, date_added, image_url, category, lean"
+    
+    def _articles_connection(self):
+        return get_db_connection('articles')
+    
+    def _articles_written(self, conn):
+        # Reads of these articles stay on the primary until the replica has them
+        record_articles_write(conn)
+
+    def check_survey_responses(self, email):
+        """
+        Check if survey responses exist for a specific email
+        
+        Args:
+            email (str): Email to check
+            
+        Returns:
+            bool: True if survey responses exist, False otherwise
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT 1 FROM survey_responses WHERE email = %s", (email,))
+            result = cursor.fetchone() is not None
+            
+            cursor.close()
+        
+        return result
+
+    def get_feed_counts(self, email):
+        """
+        Get counts of articles by political leaning in a user's feed
+        
+        Args:
+            email (str): User email
+            
+        Returns:
+            tuple: Counts of (Right, Lean Right, Center, Lean Left, Left) articles
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Maintained by the feed_lean_counts triggers (migrations/002)
+            cursor.execute("""
+                SELECT lean, impressions
+                FROM feed_lean_counts
+                WHERE email = %s
+            """, (email,))
+            
+            # Initialize counts
+            right_count = 0
+            lean_right_count = 0
+            center_count = 0
+            lean_left_count = 0
+            left_count = 0
+            
+            # Process results
+            for row in cursor.fetchall():
+                lean = row[0]
+                count = row[1]
+                
+                if lean == 'Right':
+                    right_count = count
+                elif lean == 'Lean Right':
+                    lean_right_count = count
+                elif lean == 'Center':
+                    center_count = count
+                elif lean == 'Lean Left':
+                    lean_left_count = count
+                elif lean == 'Left':
+                    left_count = count
+            
+            cursor.close()
+        
+        return (right_count, lean_right_count, center_count, lean_left_count, left_count)
+
+    def rebuild_feed_counts(self, email=None):
+        """
+        Recompute the per-user lean counts from the feed history
+        
+        Writes to feed and articles wait until the rebuild commits, so that
+        no impression is missed or counted twice.
+        
+        Args:
+            email (str, optional): Only rebuild this user's counts
+            
+        Returns:
+            int: Number of counter rows written
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            user_filter = "AND f.email = %s" if email else ""
+            params = (email,) if email else ()
+            
+            try:
+                cursor.execute("LOCK TABLE feed, articles IN SHARE MODE")
+                cursor.execute(
+                    "DELETE FROM feed_lean_counts" + (" WHERE email = %s" if email else ""),
+                    params
+                )
+                cursor.execute(f"""
+                    INSERT INTO feed_lean_counts (email, lean, impressions)
+                    SELECT f.email, a.lean, COUNT(*)
+                    FROM feed f
+                    JOIN articles a ON a.id = f.article_id
+                    WHERE a.lean IS NOT NULL {user_filter}
+                    GROUP BY f.email, a.lean
+                """, params)
+                rows = cursor.rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        
+        return rows
+
+class SQLiteLeanCountsBackend(SQLiteBackend):
+    """
+    Embedded SQLite storage, with the lean counts
+    """
+    article_fields = ARTICLE_FIELDS
+    article_columns = "id, headline, url, source, abstract, article_date, date_added, image_url, category, lean"
+
+    def _create_schema(self, conn):
+        super()._create_schema(conn)
+        # Databases created by an older schema miss one of the columns
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+        for column, definition in (('lean', 'TEXT'), ('version', 'INTEGER NOT NULL DEFAULT 1')):
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE articles ADD COLUMN {column} {definition}")
+                except sqlite3.OperationalError:
+                    # Added by another process in the meantime
+                    if column not in {row[1] for row in conn.execute("PRAGMA table_info(articles)")}:
+                        raise
+        conn.executescript(LEAN_COUNTS_SCHEMA)
+
+    def check_survey_responses(self, email):
+        row = self._connect().execute("SELECT 1 FROM survey_responses WHERE email = ?", (email,)).fetchone()
+        return row is not None
+
+    def get_feed_counts(self, email):
+        cursor = self._connect().execute(
+            "SELECT lean, impressions FROM feed_lean_counts WHERE email = ?", (email,)
+        )
+        counts = dict(cursor.fetchall())
+        return tuple(counts.get(lean, 0) for lean in ('Right', 'Lean Right', 'Center', 'Lean Left', 'Left'))
+
+    def rebuild_feed_counts(self, email=None):
+        user_filter = "AND f.email = ?" if email else ""
+        params = (email,) if email else ()
+        conn = self._connect()
+        with conn:
+            # One write transaction, so no impression is missed or counted twice
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM feed_lean_counts" + (" WHERE email = ?" if email else ""), params)
+            cursor = conn.execute(f"""
+                INSERT INTO feed_lean_counts (email, lean, impressions)
+                SELECT f.email, a.lean, COUNT(*)
+                FROM feed f
+                JOIN articles a ON a.id = f.article_id
+                WHERE a.lean IS NOT NULL {user_filter}
+                GROUP BY f.email, a.lean
+            """, params)
+        return cursor.rowcount
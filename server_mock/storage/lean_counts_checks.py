@@ -0,0 +1,70 @@
+"""
+Conformance checks of the methods server_mock's backends add (see
+lean_counts.py), run by storage.conformance after the common ones
+"""
+import os
+import tempfile
+from storage.conformance import _article, _execute
+
+def survey_exists(backend, scenario):
+    email = scenario.email()
+    backend.add_user(email, 'secret')
+    assert backend.check_survey_responses(email) is False
+    backend.insert_survey_responses(email, True, False, True, False, True)
+    assert backend.check_survey_responses(email) is True
+
+def lean_counts(backend, scenario):
+    email = scenario.email()
+    backend.add_user(email, 'secret')
+    assert tuple(backend.get_feed_counts(email)) == (0, 0, 0, 0, 0)
+
+    left, right, unlabeled = scenario.article_id(), scenario.article_id(), scenario.article_id()
+    backend.insert_articles([_article(left), _article(right), _article(unlabeled)])
+    _execute(backend, "UPDATE articles SET lean = %s WHERE id = %s", ('Left', left))
+    _execute(backend, "UPDATE articles SET lean = %s WHERE id = %s", ('Right', right))
+
+    backend.insert_feed_without_duplicate(email, 'comfort', left)
+    # The batch skips the impression already there and its own duplicate
+    assert backend.insert_feed_batch_without_duplicate(
+        email, [(left, 'comfort'), (left, 'balanced'), (right, 'comfort'), (unlabeled, 'comfort'), (right, 'comfort')]
+    ) == 3
+    assert backend.insert_feed_batch_without_duplicate(email, []) == 0
+    assert tuple(backend.get_feed_counts(email)) == (1, 0, 0, 0, 2)
+
+    # Counts follow the article's lean when it is set or changed later
+    _execute(backend, "UPDATE articles SET lean = %s WHERE id = %s", ('Center', unlabeled))
+    _execute(backend, "UPDATE articles SET lean = %s WHERE id = %s", ('Lean Left', left))
+    assert tuple(backend.get_feed_counts(email)) == (1, 0, 1, 2, 0)
+
+    _execute(backend, "DELETE FROM feed WHERE email = %s AND article_id = %s", (email, right))
+    assert tuple(backend.get_feed_counts(email)) == (0, 0, 1, 2, 0)
+
+    # The repair job restores drifted counters from the history
+    _execute(backend, "UPDATE feed_lean_counts SET impressions = 99 WHERE email = %s", (email,))
+    assert backend.rebuild_feed_counts(email) == 2
+    assert tuple(backend.get_feed_counts(email)) == (0, 0, 1, 2, 0)
+
+def catalog_leans(backend, scenario):
+    # The local catalog copies from PostgreSQL only
+    if backend.name != 'postgres':
+        return
+    from storage.catalog import ArticleCatalog
+
+    catalog = ArticleCatalog(os.path.join(tempfile.mkdtemp(), 'catalog.db'), backend)
+    article_id = scenario.article_id()
+    backend.insert_articles([_article(article_id)])
+    catalog.sync(force=True)
+
+    # A lean label set later is picked up by the next sync
+    _execute(backend, "UPDATE articles SET lean = %s WHERE id = %s", ('Center', article_id))
+    catalog.sync(force=True)
+    local = {article['id']: article for article in catalog.get_recent_articles(limit=100000)}
+    assert local[article_id]['lean'] == 'Center'
+
+CHECKS = [survey_exists, lean_counts, catalog_leans]
+
+def cleanup(backend, scenario):
+    # The triggers leave the counters of the deleted impressions at zero
+    if scenario.emails:
+        placeholders = ', '.join(['%s'] * len(scenario.emails))
+        _execute(backend, f"DELETE FROM feed_lean_counts WHERE email IN ({placeholders})", scenario.emails)
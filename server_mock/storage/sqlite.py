@@ -0,0 +1,305 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from storage.base import StorageBackend, INSERTED, UPDATED, UNCHANGED, NOT_FOUND, NO_USER
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS userdata (
+    email TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS survey_responses (
+    email TEXT PRIMARY KEY REFERENCES userdata (email),
+    q1 BOOLEAN,
+    q2 BOOLEAN,
+    q3 BOOLEAN,
+    q4 BOOLEAN,
+    q5 BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    headline TEXT,
+    url TEXT,
+    source TEXT,
+    abstract TEXT,
+    article_date TIMESTAMP,
+    date_added TIMESTAMP NOT NULL,
+    image_url TEXT,
+    category TEXT,
+    version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS articles_date_added_day_idx ON articles (date(date_added), date_added DESC);
+
+CREATE TABLE IF NOT EXISTS feed (
+    email TEXT NOT NULL REFERENCES userdata (email),
+    article_id TEXT NOT NULL REFERENCES articles (id),
+    flag TEXT NOT NULL,
+    access_date TIMESTAMP NOT NULL,
+    likes INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS feed_email_article_flag_key ON feed (email, article_id, flag);
+DROP INDEX IF EXISTS feed_email_idx;
+"""
+
+def _to_bool(value):
+    return None if value is None else bool(value)
+
+def _convert_timestamp(value):
+    # Timestamps are stored as ISO 8601 text; anything else is returned as is
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+# Explicit adapters (the sqlite3 defaults are deprecated since Python 3.12)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+
+class SQLiteBackend(StorageBackend):
+    """
+    Embedded SQLite storage for tests, benchmarks and single-node deployments
+
+    The database runs in WAL mode so readers never block the writer. Each
+    thread gets its own connection; writes of several rows are batched in
+    one transaction.
+    """
+    name = 'sqlite'
+    article_columns = "id, headline, url, source, abstract, article_date, date_added, image_url, category, version AS row_version"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection must not be reused in a forked child
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+        return conn
+
+    def _create_schema(self, conn):
+        conn.executescript(SCHEMA)
+
+    def _articles_query(self, where, params, categories, order_limit='', order_params=()):
+        if categories:
+            placeholders = ', '.join(['?'] * len(categories))
+            where += f" AND category IN ({placeholders})"
+            params = params + list(categories)
+
+        conn = self._connect()
+        cursor = conn.execute(f"SELECT {self.article_columns} FROM articles WHERE {where} {order_limit}",
+                              params + list(order_params))
+        columns = [column[0] for column in cursor.description]
+        return columns, cursor
+
+    def email_exists(self, email):
+        row = self._connect().execute("SELECT 1 FROM userdata WHERE email = ?", (email,)).fetchone()
+        return row is not None
+
+    def get_survey_responses(self, email):
+        if not self.email_exists(email):
+            return False
+
+        row = self._connect().execute(
+            "SELECT email, q1, q2, q3, q4, q5 FROM survey_responses WHERE email = ?", (email,)
+        ).fetchone()
+        if row is None:
+            return None
+        return (row[0],) + tuple(_to_bool(value) for value in row[1:])
+
+    def insert_articles(self, articles):
+        conn = self._connect()
+        now = datetime.now()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO articles (id, headline, url, source, abstract, article_date, date_added, image_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    headline = excluded.headline,
+                    url = excluded.url,
+                    source = excluded.source,
+                    abstract = excluded.abstract,
+                    article_date = excluded.article_date,
+                    version = articles.version + 1
+                """,
+                [
+                    (
+                        article['id'],
+                        article['headline'],
+                        article['url'],
+                        article['source'],
+                        article['abstract'],
+                        article['article_date'],
+                        now,
+                        article['image_url']
+                    )
+                    for article in articles
+                ]
+            )
+        return True
+
+    def insert_feed(self, email, flag, article_id):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO feed (email, article_id, flag, access_date, likes) VALUES (?, ?, ?, ?, 0)",
+                (email, article_id, flag, datetime.now())
+            )
+        return True
+
+    def update_likes(self, email, article_id, flag, value):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE feed SET likes = ? WHERE email = ? AND flag = ? AND article_id = ?",
+                (value, email, flag, article_id)
+            )
+        return UPDATED if cursor.rowcount > 0 else NOT_FOUND
+
+    def add_user(self, email, password):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO userdata (email, password) VALUES (?, ?) ON CONFLICT (email) DO NOTHING",
+                (email, password)
+            )
+        return cursor.rowcount > 0
+
+    def insert_survey_responses(self, email, q1, q2, q3, q4, q5):
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    """
+                    INSERT INTO survey_responses (email, q1, q2, q3, q4, q5) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (email) DO NOTHING
+                    """,
+                    (email, q1, q2, q3, q4, q5)
+                )
+            return INSERTED if cursor.rowcount > 0 else UNCHANGED
+        except sqlite3.IntegrityError:
+            # Foreign key: no such user
+            return NO_USER
+
+    def update_survey_responses(self, email, q1, q2, q3, q4, q5):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE survey_responses SET q1 = ?, q2 = ?, q3 = ?, q4 = ?, q5 = ? WHERE email = ?",
+                (q1, q2, q3, q4, q5, email)
+            )
+        if cursor.rowcount > 0:
+            return UPDATED
+        return NOT_FOUND if self.email_exists(email) else NO_USER
+
+    def upsert_survey_responses(self, email, q1, q2, q3, q4, q5):
+        conn = self._connect()
+        try:
+            with conn:
+                # SQLite cannot tell an upsert's insert from its update, so
+                # both statements run in one write transaction instead
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.execute(
+                    """
+                    INSERT INTO survey_responses (email, q1, q2, q3, q4, q5) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (email) DO NOTHING
+                    """,
+                    (email, q1, q2, q3, q4, q5)
+                )
+                if cursor.rowcount > 0:
+                    return INSERTED
+                conn.execute(
+                    "UPDATE survey_responses SET q1 = ?, q2 = ?, q3 = ?, q4 = ?, q5 = ? WHERE email = ?",
+                    (q1, q2, q3, q4, q5, email)
+                )
+            return UPDATED
+        except sqlite3.IntegrityError:
+            # Foreign key: no such user
+            return NO_USER
+
+    def get_today_articles(self, categories=None):
+        today = datetime.now().date().isoformat()
+        columns, cursor = self._articles_query("date(date_added) = ?", [today], categories)
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _sources_by_email(self, email, likes_condition):
+        cursor = self._connect().execute(f"""
+            SELECT a.source, COUNT(*) AS like_count
+            FROM feed f
+            JOIN articles a ON f.article_id = a.id
+            WHERE f.email = ? AND {likes_condition}
+            GROUP BY a.source
+            ORDER BY like_count DESC
+        """, (email,))
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def get_liked_sources_by_email(self, email):
+        return self._sources_by_email(email, "f.likes > 0")
+
+    def get_disliked_sources_by_email(self, email):
+        return self._sources_by_email(email, "f.likes < 0")
+
+    def insert_feed_without_duplicate(self, email, flag, article_id):
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    """
+                    INSERT INTO feed (email, article_id, flag, access_date, likes) VALUES (?, ?, ?, ?, 0)
+                    ON CONFLICT (email, article_id, flag) DO NOTHING
+                    """,
+                    (email, article_id, flag, datetime.now())
+                )
+            return INSERTED if cursor.rowcount > 0 else UNCHANGED
+        except sqlite3.Error:
+            return False
+
+    def insert_feed_batch_without_duplicate(self, email, impressions):
+        if not impressions:
+            return 0
+        conn = self._connect()
+        now = datetime.now()
+        try:
+            with conn:
+                cursor = conn.executemany(
+                    """
+                    INSERT INTO feed (email, article_id, flag, access_date, likes) VALUES (?, ?, ?, ?, 0)
+                    ON CONFLICT (email, article_id, flag) DO NOTHING
+                    """,
+                    [(email, article_id, flag, now) for article_id, flag in impressions]
+                )
+            # Rows inserted by the statements, not counting what triggers write
+            return max(cursor.rowcount, 0)
+        except sqlite3.Error:
+            return False
+
+    def get_recent_articles(self, limit=20, categories=None):
+        today = datetime.now().date().isoformat()
+        columns, cursor = self._articles_query(
+            "date(date_added) = ?", [today], categories,
+            order_params=[limit],
+            order_limit="ORDER BY date_added DESC LIMIT ?"
+        )
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]